@@ -62,7 +62,9 @@ export default function ComplianceScannerPage() {
       setError("")
       const result = await ComplianceAPI.runScan()
       setRiskScore(result.data.risk_score)
-      setAudits(result.data.audit_records || [])
+      // Scan jobs return counts only; the audit list comes from the dashboard summary
+      const latest = await ComplianceAPI.getScanResults()
+      setAudits(latest.audits || [])
       setStatistics({
         total_violations: result.data.total_violations,
         critical_count: result.data.critical_count,
@@ -0,0 +1,148 @@
+"""
+Archival of closed compliance records
+Moves resolved audits and violation reports older than the archive horizon
+into the monthly archive tables in short batches, keeping the hot tables
+small enough for dashboard queries to stay in cache
+"""
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from organization.signals import deferred_version_bumps
+from organization.versioning import bump_data_version
+from .models import ComplianceAudit, ViolationReport, ComplianceAuditArchive, ViolationReportArchive
+
+
+CLOSED_AUDIT_STATUSES = ['RESOLVED', 'IGNORED']
+
+
+def archive_horizon_days() -> int:
+    return getattr(settings, 'COMPLIANCE_ARCHIVE_HORIZON_DAYS', 180)
+
+
+def archive_cutoff(now=None, horizon_days: int = None):
+    """Records detected before this moment are eligible for the archive"""
+    days = archive_horizon_days() if horizon_days is None else horizon_days
+    return (now or timezone.now()) - timedelta(days=days)
+
+
+def window_reaches_archive(organization, window_start) -> bool:
+    """
+    Whether a detected_at window starting at window_start holds archived
+    records of the organization. Decided from the archive tables themselves,
+    so records archived with a shorter --horizon-days are still found.
+    """
+    archived = Q(organization=organization, detected_at__gte=window_start)
+    return ComplianceAuditArchive.objects.filter(archived).values('id').union(
+        ViolationReportArchive.objects.filter(archived).values('id'),
+    ).exists()
+
+
+def _month(value):
+    return value.date().replace(day=1)
+
+
+def archivable_reports(cutoff):
+    return ViolationReport.objects.filter(resolved=True, detected_at__lt=cutoff)
+
+
+def archivable_audits(cutoff):
+    """Closed audits whose violation reports are all archivable too"""
+    blocking_reports = ViolationReport.objects.filter(related_audit=OuterRef('pk')).filter(
+        Q(resolved=False) | Q(detected_at__gte=cutoff)
+    )
+    return ComplianceAudit.objects.filter(
+        status__in=CLOSED_AUDIT_STATUSES,
+        detected_at__lt=cutoff,
+    ).exclude(Exists(blocking_reports))
+
+
+def _delete_archived(model, ids):
+    """
+    Delete archived rows with their usual cascades, skipping the per-row
+    version bumps; archive_batch bumps each organization once per batch
+    """
+    with deferred_version_bumps():
+        model.objects.filter(pk__in=ids).delete()
+
+
+def _archive_reports(reports) -> int:
+    ViolationReportArchive.objects.bulk_create([
+        ViolationReportArchive(
+            id=report.id,
+            organization_id=report.organization_id,
+            archive_month=_month(report.detected_at),
+            violation_type=report.violation_type,
+            description=report.description,
+            affected_users_count=report.affected_users_count,
+            detected_at=report.detected_at,
+            reported_to_dpo=report.reported_to_dpo,
+            resolved=report.resolved,
+            resolution_notes=report.resolution_notes,
+            related_audit_id=report.related_audit_id,
+            related_audit_name=report.related_audit.rule_name if report.related_audit else '',
+        )
+        for report in reports
+    ], ignore_conflicts=True)
+    _delete_archived(ViolationReport, [report.id for report in reports])
+    return len(reports)
+
+
+def archive_batch(cutoff, batch_size: int = 500) -> tuple:
+    """
+    Archive one batch of audits (with their reports), or failing that one
+    batch of standalone reports, in a single short transaction.
+    Returns (audits_archived, reports_archived).
+    """
+    with transaction.atomic():
+        audits = list(archivable_audits(cutoff).order_by('detected_at')[:batch_size])
+        if audits:
+            reports = list(
+                ViolationReport.objects.filter(related_audit__in=audits).select_related('related_audit')
+            )
+            reports_archived = _archive_reports(reports) if reports else 0
+            ComplianceAuditArchive.objects.bulk_create([
+                ComplianceAuditArchive(
+                    id=audit.id,
+                    organization_id=audit.organization_id,
+                    archive_month=_month(audit.detected_at),
+                    rule_name=audit.rule_name,
+                    rule_description=audit.rule_description,
+                    severity=audit.severity,
+                    status=audit.status,
+                    detected_at=audit.detected_at,
+                    resolved_at=audit.resolved_at,
+                    details=audit.details,
+                    recommendation=audit.recommendation,
+                    fingerprint=audit.fingerprint,
+                )
+                for audit in audits
+            ], ignore_conflicts=True)
+            _delete_archived(ComplianceAudit, [audit.id for audit in audits])
+            # Per-row bumps were deferred; invalidate each organization's cached results once
+            bump_data_version(*{audit.organization_id for audit in audits})
+            return len(audits), reports_archived
+
+        reports = list(archivable_reports(cutoff).select_related('related_audit').order_by('detected_at')[:batch_size])
+        if not reports:
+            return 0, 0
+        reports_archived = _archive_reports(reports)
+        bump_data_version(*{report.organization_id for report in reports})
+        return 0, reports_archived
+
+
+def archive_records(cutoff, batch_size: int = 500, pause: float = 0, max_batches: int = None) -> dict:
+    """Archive batches until nothing eligible is left, pausing between batches to yield locks"""
+    totals = {'audits': 0, 'reports': 0, 'batches': 0}
+    while max_batches is None or totals['batches'] < max_batches:
+        audits, reports = archive_batch(cutoff, batch_size)
+        if not audits and not reports:
+            break
+        totals['audits'] += audits
+        totals['reports'] += reports
+        totals['batches'] += 1
+        if pause:
+            time.sleep(pause)
+    return totals
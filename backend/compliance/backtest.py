@@ -0,0 +1,195 @@
+"""
+Historical compliance backtesting
+Replays an organization's access request status changes and consent history
+in one time-ordered streaming pass, keeping incremental rule state so the
+risk score can be read off at every day boundary without reloading data
+"""
+import heapq
+from bisect import bisect_left, insort
+from collections import Counter
+from datetime import datetime, time, timedelta
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from organization.models import Org, AccessRequest, AccessRequestStatusHistory, OrgRequestRateState
+from organization.request_rate import in_burst, observe
+from consents.models import ConsentHistory
+from .rules_engine import NDPRRulesEngine
+
+
+REQUEST_EVENT = 0
+CONSENT_EVENT = 1
+STREAM_CHUNK_SIZE = 2000
+
+
+class BacktestState:
+    """
+    Rule inputs as of a point in time, updated one event at a time.
+    Each access request is unique per (user, consent) within an organization,
+    so consent changes map to at most one request.
+    """
+
+    def __init__(self, engine=NDPRRulesEngine):
+        self.engine = engine
+        self.requests = {}                  # request id -> [status, user_id, consent_id, requested_at]
+        self.request_by_pair = {}           # (user_id, consent_id) -> request id
+        self.consent_state = {}             # user consent id -> granted
+        self.active_pairs = Counter()       # (user_id, consent_id) -> granted user consents
+        self.status_counts = Counter()
+        self.approved_by_user = Counter()
+        self.breadth = Counter()             # consent types approved per user -> users
+        self.approved_dates = []            # sorted requested_at of approved requests
+        self.request_rate = OrgRequestRateState()
+        self.unconsented = 0
+        self.vague_purposes = 0
+        self.missing_purposes = 0
+
+    # -------------------- Events --------------------
+
+    def apply_request(self, request_id, user_id, consent_id, purpose, requested_at, new_status):
+        request = self.requests.get(request_id)
+        if request is None:
+            request = [None, user_id, consent_id, requested_at]
+            self.requests[request_id] = request
+            self.request_by_pair[(user_id, consent_id)] = request_id
+            observe(self.request_rate, requested_at)
+            self.vague_purposes += self.engine.is_vague_purpose(purpose)
+            self.missing_purposes += purpose is None
+        old_status = request[0]
+        if old_status == new_status:
+            return
+        if old_status is not None:
+            self.status_counts[old_status] -= 1
+        self.status_counts[new_status] += 1
+        request[0] = new_status
+        if old_status == 'APPROVED':
+            self._set_approved(request, False)
+        elif new_status == 'APPROVED':
+            self._set_approved(request, True)
+
+    def apply_consent(self, user_consent_id, user_id, consent_id, granted):
+        was_granted = self.consent_state.get(user_consent_id, False)
+        self.consent_state[user_consent_id] = granted
+        if was_granted == granted:
+            return
+        pair = (user_id, consent_id)
+        was_active = self.active_pairs[pair] > 0
+        self.active_pairs[pair] += 1 if granted else -1
+        is_active = self.active_pairs[pair] > 0
+        request_id = self.request_by_pair.get(pair)
+        if was_active != is_active and request_id is not None and self.requests[request_id][0] == 'APPROVED':
+            self.unconsented += -1 if is_active else 1
+
+    def _set_approved(self, request, approved):
+        _, user_id, consent_id, requested_at = request
+        delta = 1 if approved else -1
+        self.breadth[self.approved_by_user[user_id]] -= 1
+        self.approved_by_user[user_id] += delta
+        self.breadth[self.approved_by_user[user_id]] += 1
+        if self.approved_by_user[user_id] == 0:
+            del self.approved_by_user[user_id]
+        if approved:
+            insort(self.approved_dates, requested_at)
+        else:
+            self.approved_dates.pop(bisect_left(self.approved_dates, requested_at))
+        if self.active_pairs[(user_id, consent_id)] <= 0:
+            self.unconsented += delta
+
+    # -------------------- Rules --------------------
+
+    def findings(self, as_of) -> dict:
+        """Findings per rule as a scan at as_of would report them"""
+        engine = self.engine
+        breadth = engine.consent_breadth_stats({k: v for k, v in self.breadth.items() if k > 0 and v > 0})
+        retention_cutoff = as_of - timedelta(days=engine.RETENTION_DAYS)
+        return {
+            'CONSENT_VALIDITY': self.unconsented,
+            'PURPOSE_LIMITATION': self.vague_purposes,
+            'DATA_MINIMIZATION': int(engine.breadth_exceeds_threshold(breadth)),
+            'RETENTION_POLICY': int(bisect_left(self.approved_dates, retention_cutoff) > 0),
+            'ACCESS_CONTROL': int(self.status_counts['REVOKED'] > engine.REVOKED_REQUEST_THRESHOLD),
+            'AUDIT_TRAIL': int(self.missing_purposes > 0),
+            'REVOCATION_HANDLING': self.unconsented,
+            'EXCESSIVE_REQUESTS': int(in_burst(self.request_rate, as_of)),
+        }
+
+    def score(self, as_of) -> dict:
+        findings = self.findings(as_of)
+        severity_counts = Counter()
+        for rule, count in findings.items():
+            severity_counts[self.engine.RULES.severity(rule)] += count
+        return {
+            'risk_score': self.engine.calculate_risk_score_from_counts(severity_counts),
+            'total_violations': sum(findings.values()),
+            'critical_count': severity_counts['CRITICAL'],
+            'high_count': severity_counts['HIGH'],
+            'medium_count': severity_counts['MEDIUM'],
+        }
+
+
+def _request_events(organization: Org, until):
+    rows = (
+        AccessRequestStatusHistory.objects.filter(organization=organization, changed_at__lt=until)
+        .order_by('changed_at', 'id')
+        .values_list(
+            'changed_at', 'access_request_id', 'access_request__user_id', 'access_request__consent_id',
+            'access_request__purpose', 'access_request__requested_at', 'new_status',
+        )
+    )
+    for changed_at, *event in rows.iterator(chunk_size=STREAM_CHUNK_SIZE):
+        yield changed_at, REQUEST_EVENT, event
+
+
+def _consent_events(organization: Org, until):
+    requested = AccessRequest.objects.filter(
+        organization=organization,
+        user=OuterRef('user_consent__user'),
+        consent=OuterRef('user_consent__consent'),
+    )
+    rows = (
+        ConsentHistory.objects.filter(changed_at__lt=until)
+        .filter(Exists(requested))
+        .order_by('changed_at', 'id')
+        .values_list('changed_at', 'user_consent_id', 'user_consent__user_id', 'user_consent__consent_id',
+                     'action', 'new_value')
+    )
+    for changed_at, user_consent_id, user_id, consent_id, action, new_value in rows.iterator(chunk_size=STREAM_CHUNK_SIZE):
+        granted = new_value if new_value is not None else action == 'GRANTED'
+        yield changed_at, CONSENT_EVENT, (user_consent_id, user_id, consent_id, granted)
+
+
+def _day_end(day):
+    return timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+
+
+def backtest(organization: Org, start, end) -> list:
+    """
+    Daily risk series for start..end (dates, inclusive). Every event before
+    the end of the range is replayed once, in time order; each point reflects
+    the state at the end of its day.
+    """
+    state = BacktestState()
+    until = _day_end(end)
+    events = heapq.merge(
+        _request_events(organization, until),
+        _consent_events(organization, until),
+        key=lambda event: (event[0], event[1]),
+    )
+
+    series = []
+    day = start
+    boundary = _day_end(day)
+    for changed_at, kind, event in events:
+        while changed_at >= boundary:
+            series.append({'date': day.isoformat(), **state.score(boundary)})
+            day += timedelta(days=1)
+            boundary = _day_end(day)
+        if kind == REQUEST_EVENT:
+            state.apply_request(*event)
+        else:
+            state.apply_consent(*event)
+
+    while day <= end:
+        series.append({'date': day.isoformat(), **state.score(boundary)})
+        day += timedelta(days=1)
+        boundary = _day_end(day)
+    return series
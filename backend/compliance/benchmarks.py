@@ -0,0 +1,148 @@
+"""
+Scale benchmarks for the compliance and trust engines
+Seeds synthetic organizations with bulk inserts and measures wall time,
+query count and peak Python memory for each engine entry point
+"""
+import platform
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import timedelta
+
+import django
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from consents.models import Consent, UserConsent
+from organization.models import Org, AccessRequest
+from organization.counters import rebuild_counters, rebuild_rollups
+from organization.request_rate import rebuild_request_rates
+
+
+PURPOSES = [
+    'Identity verification for account opening',
+    'general',
+    'Fraud screening on card transactions',
+    'testing',
+    'Delivery address confirmation',
+]
+STATUSES = ['APPROVED', 'APPROVED', 'APPROVED', 'PENDING', 'REVOKED']
+
+
+@contextmanager
+def _explicit_requested_at():
+    """Let bulk inserts keep the synthetic requested_at values"""
+    field = AccessRequest._meta.get_field('requested_at')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def seed_organization(n_requests: int, consent_types: int = 10, batch_size: int = 5000, label: str = None) -> Org:
+    """
+    Create an organization with n_requests access requests spread over two
+    years, one citizen per consent_types requests, and a user consent per
+    request (every seventh revoked).
+    """
+    label = label or f'bench-{n_requests}-{time.time_ns()}'
+    now = timezone.now()
+    org_user = CustomUser.objects.create(email=f'{label}@bench.local', user_role='ORGANIZATION', password='!')
+    organization = Org.objects.create(user=org_user, name=label, email=f'{label}@bench.local', address='Benchmark')
+
+    consents = Consent.objects.bulk_create([Consent(name=f'{label}-consent-{i}') for i in range(consent_types)])
+    n_users = -(-n_requests // consent_types)
+
+    with _explicit_requested_at():
+        for start in range(0, n_users, batch_size):
+            users = CustomUser.objects.bulk_create([
+                CustomUser(email=f'{label}-{i}@bench.local', password='!')
+                for i in range(start, min(start + batch_size, n_users))
+            ])
+            user_consents = []
+            requests = []
+            for offset, user in enumerate(users):
+                user_index = start + offset
+                for c, consent in enumerate(consents):
+                    i = user_index * consent_types + c
+                    if i >= n_requests:
+                        break
+                    user_consents.append(UserConsent(user=user, consent=consent, access=i % 7 != 0, granted_at=now))
+                    requests.append(AccessRequest(
+                        organization=organization,
+                        user=user,
+                        consent=consent,
+                        status=STATUSES[i % len(STATUSES)],
+                        purpose=PURPOSES[i % len(PURPOSES)],
+                        requested_at=now - timedelta(days=i % 730),
+                    ))
+            UserConsent.objects.bulk_create(user_consents, batch_size=batch_size)
+            AccessRequest.objects.bulk_create(requests, batch_size=batch_size)
+    # bulk_create bypasses AccessRequest.save, so build the counters, rollups and rates once at the end
+    rebuild_counters([organization.pk])
+    rebuild_rollups([organization.pk])
+    rebuild_request_rates([organization.pk])
+    return organization
+
+
+def measure(fn, *args) -> dict:
+    """Run fn once and record wall time, query count and peak traced memory"""
+    queries = 0
+
+    def count_queries(execute, sql, params, many, context):
+        nonlocal queries
+        queries += 1
+        return execute(sql, params, many, context)
+
+    cache.clear()
+    tracemalloc.start()
+    started = time.perf_counter()
+    with connection.execute_wrapper(count_queries):
+        fn(*args)
+    wall_time = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'wall_time_s': round(wall_time, 4),
+        'queries': queries,
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def entry_points() -> dict:
+    """Engine entry points benchmarked against each seeded organization"""
+    from compliance.rules_engine import NDPRRulesEngine
+    from organization.trust_engine import TrustScoreEngine
+    from organization.integrity import DataIntegrityChecker
+    return {
+        'NDPRRulesEngine.run_all_checks': NDPRRulesEngine.run_all_checks,
+        'TrustScoreEngine.calculate_trust_score': TrustScoreEngine.calculate_trust_score,
+        'DataIntegrityChecker.verify_organization_data_integrity': DataIntegrityChecker.verify_organization_data_integrity,
+    }
+
+
+def run_benchmarks(sizes, consent_types: int = 10, log=None) -> dict:
+    """Seed one organization per size and benchmark every entry point against it"""
+    results = []
+    for size in sizes:
+        started = time.perf_counter()
+        organization = seed_organization(size, consent_types=consent_types)
+        if log:
+            log(f'Seeded {size} access requests in {time.perf_counter() - started:.1f}s')
+        for name, fn in entry_points().items():
+            result = {'size': size, 'entry_point': name, **measure(fn, organization)}
+            results.append(result)
+            if log:
+                log(f"  {name}: {result['wall_time_s']}s, {result['queries']} queries, {result['peak_memory_kb']} KB")
+    return {
+        'generated_at': timezone.now().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+        },
+        'results': results,
+    }
@@ -0,0 +1,20 @@
+"""
+Version-keyed caching of compliance results
+Entries are keyed by (organization, data version); a data change bumps the
+version so stale entries are never read and age out through LRU eviction
+"""
+from django.conf import settings
+from django.core.cache import cache
+from organization.models import Org
+from organization.versioning import get_data_version
+
+
+def cached_for_version(kind: str, organization: Org, compute):
+    """Return the cached value for the organization's current data version, computing it on a miss"""
+    version = get_data_version(organization.id)
+    key = f'compliance:{kind}:{organization.id}:v{version}'
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, getattr(settings, 'COMPLIANCE_RESULT_CACHE_TIMEOUT', 3600))
+    return value
@@ -0,0 +1,32 @@
+"""
+Streaming violation export
+Yields a scan's violations as newline-delimited JSON while the rules
+evaluate, so memory stays bounded however many violations an
+organization has
+"""
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from organization.models import Org
+from .rules_engine import NDPRRulesEngine
+from .scan_context import ScanContext
+
+
+def violation_lines(organization: Org, now=None):
+    """
+    Yield one JSON line per violation, then a final summary line.
+    Only running severity counts are kept between lines.
+    """
+    severity_counts = {}
+    context = ScanContext.stream(organization, now=now)
+    for violation in NDPRRulesEngine.iter_violations(organization, context):
+        severity = NDPRRulesEngine.RULES.severity(violation['rule'])
+        severity_counts[severity] = severity_counts.get(severity, 0) + 1
+        yield json.dumps({**violation, 'severity': severity}, cls=DjangoJSONEncoder) + '\n'
+
+    yield json.dumps({'summary': {
+        'risk_score': NDPRRulesEngine.calculate_risk_score_from_counts(severity_counts),
+        'total_violations': sum(severity_counts.values()),
+        'critical_count': severity_counts.get('CRITICAL', 0),
+        'high_count': severity_counts.get('HIGH', 0),
+        'medium_count': severity_counts.get('MEDIUM', 0),
+    }}) + '\n'
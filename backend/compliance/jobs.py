@@ -0,0 +1,121 @@
+"""
+Asynchronous compliance scan jobs
+Scans are queued as ComplianceScanJob rows and executed by the
+run_scan_worker management command, or in-process when
+COMPLIANCE_SCAN_JOBS_EAGER is enabled (local development and tests)
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from organization.models import Org
+from .models import ComplianceScanJob
+from .profiling import ScanProfiler
+from .rules_engine import NDPRRulesEngine
+from .serializers import ComplianceScanResultSerializer, ComplianceScanSerializer
+
+
+def execute_scan(organization: Org, incremental: bool = False, profile: bool = False) -> dict:
+    """
+    Run a scan, persist its audit records and return the serialized summary:
+    counts and the recorded scan diff, whose id pages the changed audits
+    through scan/diff/ and reports/. Audits themselves are not copied into
+    the job, so job rows and status polls stay small for large organizations.
+    With profile (or COMPLIANCE_PROFILE_SCANS) per-rule costs are logged and
+    returned in a profile block.
+    """
+    profile = profile or getattr(settings, 'COMPLIANCE_PROFILE_SCANS', False)
+    profiler = ScanProfiler() if profile else None
+    scan_result = NDPRRulesEngine.run_incremental_checks(organization, force=not incremental, profiler=profiler)
+    scan = NDPRRulesEngine.record_scan(organization, scan_result, incremental=incremental)
+
+    result_data = {
+        'risk_score': scan_result.get('risk_score', 0),
+        'total_violations': scan_result.get('total_violations', 0),
+        'critical_count': scan_result.get('critical_count', 0),
+        'high_count': scan_result.get('high_count', 0),
+        'medium_count': scan_result.get('medium_count', 0),
+        'evaluated_rules': scan_result.get('evaluated_rules', []),
+        'carried_forward_rules': scan_result.get('carried_forward_rules', []),
+        'diff': ComplianceScanSerializer(scan).data,
+    }
+    if profiler is not None:
+        profiler.log(organization, incremental=incremental)
+        result_data['profile'] = profiler.as_dict()
+    return ComplianceScanResultSerializer(result_data).data
+
+
+def enqueue_scan(organization: Org, requested_by=None, incremental: bool = False, profile: bool = False):
+    """
+    Queue a scan for an organization.
+    Returns (job, created); when a scan is already queued or running for the
+    organization the in-flight job is returned instead of starting a duplicate.
+    """
+    try:
+        with transaction.atomic():
+            job = ComplianceScanJob.objects.create(
+                organization=organization,
+                requested_by=requested_by,
+                incremental=incremental,
+                profile=profile,
+            )
+    except IntegrityError:
+        job = ComplianceScanJob.objects.filter(
+            organization=organization,
+            status__in=ComplianceScanJob.ACTIVE_STATUSES,
+        ).first()
+        if job is None:
+            # The in-flight job finished between the insert and the lookup
+            return enqueue_scan(organization, requested_by, incremental, profile)
+        return job, False
+
+    if getattr(settings, 'COMPLIANCE_SCAN_JOBS_EAGER', False):
+        if claim_job(job):
+            run_job(job)
+    return job, True
+
+
+def claim_job(job: ComplianceScanJob) -> bool:
+    """Atomically move a queued job to RUNNING; False if another worker won"""
+    now = timezone.now()
+    claimed = ComplianceScanJob.objects.filter(pk=job.pk, status='QUEUED').update(
+        status='RUNNING',
+        started_at=now,
+    )
+    if claimed:
+        job.status = 'RUNNING'
+        job.started_at = now
+    return bool(claimed)
+
+
+def claim_next_job():
+    """Claim the oldest queued job, or return None when the queue is empty"""
+    for job in ComplianceScanJob.objects.filter(status='QUEUED').order_by('created_at')[:10]:
+        if claim_job(job):
+            return job
+    return None
+
+
+def run_job(job: ComplianceScanJob) -> ComplianceScanJob:
+    """Execute a claimed job and record its outcome"""
+    try:
+        job.result = execute_scan(job.organization, incremental=job.incremental, profile=job.profile)
+        job.status = 'COMPLETED'
+    except Exception as e:
+        job.error = str(e)
+        job.status = 'FAILED'
+    job.finished_at = timezone.now()
+    job.save(update_fields=['result', 'error', 'status', 'finished_at'])
+    return job
+
+
+def fail_stale_jobs(max_runtime: timedelta) -> int:
+    """Fail RUNNING jobs whose worker died, so the organization can be scanned again"""
+    return ComplianceScanJob.objects.filter(
+        status='RUNNING',
+        started_at__lt=timezone.now() - max_runtime,
+    ).update(
+        status='FAILED',
+        finished_at=timezone.now(),
+        error='Scan worker stopped before the job finished',
+    )
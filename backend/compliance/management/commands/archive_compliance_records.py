@@ -0,0 +1,46 @@
+"""
+Archive closed compliance records
+Moves resolved audits and violation reports older than the archive horizon
+into the monthly archive tables, one short transaction per batch
+Run: python manage.py archive_compliance_records [--horizon-days 180] [--dry-run]
+"""
+from django.core.management.base import BaseCommand
+
+from compliance.archive import archive_cutoff, archive_records, archivable_audits, archivable_reports
+
+
+class Command(BaseCommand):
+    help = 'Move closed compliance audits and violation reports into the archive tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horizon-days', type=int, default=None,
+                            help='Archive records detected more than this many days ago '
+                                 '(default: COMPLIANCE_ARCHIVE_HORIZON_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Records moved per transaction')
+        parser.add_argument('--pause', type=float, default=0,
+                            help='Seconds to sleep between batches')
+        parser.add_argument('--max-batches', type=int, default=None,
+                            help='Stop after this many batches')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report what would be archived without moving anything')
+
+    def handle(self, *args, **options):
+        cutoff = archive_cutoff(horizon_days=options['horizon_days'])
+        if options['dry_run']:
+            self.stdout.write(
+                f'Would archive {archivable_audits(cutoff).count()} audit(s) and '
+                f'{archivable_reports(cutoff).count()} violation report(s) detected before {cutoff:%Y-%m-%d}'
+            )
+            return
+
+        totals = archive_records(
+            cutoff,
+            batch_size=options['batch_size'],
+            pause=options['pause'],
+            max_batches=options['max_batches'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {totals['audits']} audit(s) and {totals['reports']} violation report(s) "
+            f"in {totals['batches']} batch(es)"
+        ))
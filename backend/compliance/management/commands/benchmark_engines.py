@@ -0,0 +1,39 @@
+"""
+Scale benchmark for the rules, trust and integrity engines
+Run against SQLite or a local Postgres (never production):
+python manage.py benchmark_engines --sizes 1000 100000 1000000 --output benchmark.json
+"""
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from compliance.benchmarks import run_benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Benchmark engine entry points against synthetic organizations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000, 1000000],
+                            help='Access requests (and user consents) to seed per organization')
+        parser.add_argument('--consent-types', type=int, default=10,
+                            help='Consent types requested from each synthetic citizen')
+        parser.add_argument('--output', default=None,
+                            help='Write machine-readable results to this JSON file')
+        parser.add_argument('--keep', action='store_true',
+                            help='Keep the seeded data instead of rolling it back')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            report = run_benchmarks(options['sizes'], consent_types=options['consent_types'], log=self.stdout.write)
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+        payload = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(payload)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+        else:
+            self.stdout.write(payload)
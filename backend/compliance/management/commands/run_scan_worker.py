@@ -0,0 +1,46 @@
+"""
+Compliance scan job worker
+Executes queued ComplianceScanJob rows outside the web process
+Run: python manage.py run_scan_worker [--once]
+"""
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from compliance.jobs import claim_next_job, run_job, fail_stale_jobs
+
+
+class Command(BaseCommand):
+    help = 'Process queued compliance scan jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Drain the queue once and exit instead of polling')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--stale-after', type=int, default=900,
+                            help='Seconds after which a RUNNING job is considered abandoned')
+
+    def handle(self, *args, **options):
+        stale_after = timedelta(seconds=options['stale_after'])
+        processed = 0
+        while True:
+            close_old_connections()
+            failed = fail_stale_jobs(stale_after)
+            if failed:
+                self.stderr.write(f'Failed {failed} abandoned scan job(s)')
+
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            job = run_job(job)
+            processed += 1
+            self.stdout.write(f'Scan job {job.id} for org {job.organization_id}: {job.status}')
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} scan job(s)'))
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-18 01:19
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compliance', '0002_rename_compliance_organiz_0_idx_compliance__organiz_61397a_idx_and_more'),
+        ('organization', '0007_alter_org_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplianceRuleWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rule', models.CharField(max_length=50)),
+                ('evaluated_at', models.DateTimeField()),
+                ('access_request_count', models.IntegerField(default=0)),
+                ('violations', models.JSONField(blank=True, default=list, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='compliance_watermarks', to='organization.org')),
+            ],
+            options={
+                'unique_together': {('organization', 'rule')},
+            },
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.7 on 2026-10-18 01:22
+
+import django.core.serializers.json
+import hashlib
+import json
+
+from django.db import migrations, models
+
+# Rule display names and identity keys as of this migration
+RULE_KEYS = {
+    'Consent Validity Check': ('CONSENT_VALIDITY', ('access_request_id',)),
+    'Purpose Limitation': ('PURPOSE_LIMITATION', ('access_request_id',)),
+    'Data Minimization': ('DATA_MINIMIZATION', ()),
+    'Data Retention Policy': ('RETENTION_POLICY', ()),
+    'Access Control': ('ACCESS_CONTROL', ()),
+    'Audit Trail Completeness': ('AUDIT_TRAIL', ()),
+    'Consent Revocation Handling': ('REVOCATION_HANDLING', ('access_request_id',)),
+    'Excessive Data Requests': ('EXCESSIVE_REQUESTS', ()),
+}
+
+
+def backfill_fingerprints(apps, schema_editor):
+    """Fingerprint audits created before fingerprints existed"""
+    ComplianceAudit = apps.get_model('compliance', 'ComplianceAudit')
+    for audit in ComplianceAudit.objects.filter(fingerprint='').iterator():
+        rule, identity_keys = RULE_KEYS.get(audit.rule_name, (audit.rule_name, ()))
+        details = audit.details or {}
+        identity = {key: str(details.get(key)) for key in identity_keys}
+        payload = json.dumps({'organization': audit.organization_id, 'rule': rule, 'identity': identity}, sort_keys=True)
+        audit.fingerprint = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+        audit.save(update_fields=['fingerprint'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compliance', '0003_compliancerulewatermark'),
+        ('organization', '0008_accessrequest_updated_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complianceaudit',
+            name='fingerprint',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='complianceaudit',
+            name='last_seen_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='complianceaudit',
+            name='details',
+            field=models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder),
+        ),
+        migrations.AddIndex(
+            model_name='complianceaudit',
+            index=models.Index(fields=['organization', 'fingerprint'], name='compliance__organiz_7d9532_idx'),
+        ),
+        migrations.RunPython(backfill_fingerprints, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.7 on 2026-10-18 02:00
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compliance', '0005_compliancescanjob'),
+        ('organization', '0011_orgdailyrequestrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplianceAuditArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('archive_month', models.DateField()),
+                ('rule_name', models.CharField(max_length=200)),
+                ('rule_description', models.TextField()),
+                ('severity', models.CharField(choices=[('LOW', 'Low'), ('MEDIUM', 'Medium'), ('HIGH', 'High'), ('CRITICAL', 'Critical')], max_length=10)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending Review'), ('RESOLVED', 'Resolved'), ('INVESTIGATING', 'Under Investigation'), ('IGNORED', 'False Positive')], max_length=15)),
+                ('detected_at', models.DateTimeField()),
+                ('resolved_at', models.DateTimeField(blank=True, null=True)),
+                ('details', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('recommendation', models.TextField(blank=True)),
+                ('fingerprint', models.CharField(blank=True, max_length=64)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_compliance_audits', to='organization.org')),
+            ],
+            options={
+                'ordering': ['-detected_at'],
+                'indexes': [models.Index(fields=['organization', '-detected_at'], name='compliance__organiz_4b195d_idx'), models.Index(fields=['archive_month'], name='compliance__archive_b0a045_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ViolationReportArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('archive_month', models.DateField()),
+                ('violation_type', models.CharField(choices=[('CONSENT_VIOLATION', 'Consent Violation'), ('DATA_RETENTION', 'Data Retention Policy Violation'), ('ACCESS_CONTROL', 'Unauthorized Access'), ('PRIVACY_BREACH', 'Privacy Breach'), ('AUDIT_FAILURE', 'Audit Trail Failure'), ('PURPOSE_LIMITATION', 'Purpose Limitation Violation')], max_length=50)),
+                ('description', models.TextField()),
+                ('affected_users_count', models.IntegerField(default=0)),
+                ('detected_at', models.DateTimeField()),
+                ('reported_to_dpo', models.BooleanField(default=False)),
+                ('resolved', models.BooleanField(default=True)),
+                ('resolution_notes', models.TextField(blank=True)),
+                ('related_audit_id', models.BigIntegerField(blank=True, null=True)),
+                ('related_audit_name', models.CharField(blank=True, max_length=200)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_violation_reports', to='organization.org')),
+            ],
+            options={
+                'ordering': ['-detected_at'],
+                'indexes': [models.Index(fields=['organization', '-detected_at'], name='compliance__organiz_6be474_idx'), models.Index(fields=['archive_month'], name='compliance__archive_a1097e_idx')],
+            },
+        ),
+    ]
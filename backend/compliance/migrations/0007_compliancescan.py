@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-18 02:04
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compliance', '0006_compliance_archives'),
+        ('organization', '0011_orgdailyrequestrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplianceScan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('incremental', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('risk_score', models.IntegerField(default=0)),
+                ('total_violations', models.IntegerField(default=0)),
+                ('new_count', models.IntegerField(default=0)),
+                ('persisting_count', models.IntegerField(default=0)),
+                ('resolved_count', models.IntegerField(default=0)),
+                ('new_audit_ids', models.JSONField(blank=True, default=list)),
+                ('resolved_audit_ids', models.JSONField(blank=True, default=list)),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='compliance_scans', to='organization.org')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['organization', '-created_at'], name='compliance__organiz_0a84a2_idx')],
+            },
+        ),
+    ]
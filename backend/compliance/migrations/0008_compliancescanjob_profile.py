@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 02:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compliance', '0007_compliancescan'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='compliancescanjob',
+            name='profile',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:08
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compliance', '0008_compliancescanjob_profile'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='complianceaudit',
+            name='last_seen_at',
+        ),
+    ]
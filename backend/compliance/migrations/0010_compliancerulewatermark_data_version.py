@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compliance', '0009_remove_complianceaudit_last_seen_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='compliancerulewatermark',
+            name='data_version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
@@ -1,5 +1,7 @@
+import uuid
 from django.db import models
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from organization.models import Org, AccessRequest
 from django.utils import timezone
 from datetime import timedelta
@@ -28,14 +30,16 @@ class ComplianceAudit(models.Model):
     status = models.CharField(max_length=15, choices=STATUS_CHOICES, default='PENDING')
     detected_at = models.DateTimeField(auto_now_add=True)
     resolved_at = models.DateTimeField(null=True, blank=True)
-    details = models.JSONField(default=dict, blank=True)  # Store rule-specific details
+    details = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)  # Store rule-specific details
     recommendation = models.TextField(blank=True)
+    fingerprint = models.CharField(max_length=64, blank=True)  # SHA-256 of rule + violation identity
     
     class Meta:
         ordering = ['-detected_at']
         indexes = [
             models.Index(fields=['organization', '-detected_at']),
             models.Index(fields=['status', 'severity']),
+            models.Index(fields=['organization', 'fingerprint']),
         ]
     
     def __str__(self):
@@ -73,3 +77,150 @@ class ViolationReport(models.Model):
     def __str__(self):
         return f"{self.organization.name} - {self.get_violation_type_display()} ({self.detected_at.date()})"
 
+
+
+
+class ComplianceRuleWatermark(models.Model):
+    """Last evaluation of one rule for an organization, used by incremental scans"""
+    organization = models.ForeignKey(Org, on_delete=models.CASCADE, related_name='compliance_watermarks')
+    rule = models.CharField(max_length=50)
+    evaluated_at = models.DateTimeField()
+    access_request_count = models.IntegerField(default=0)  # Detects deleted access requests
+    data_version = models.PositiveBigIntegerField(default=0)  # OrgDataVersion at evaluation; detects consent changes
+    violations = models.JSONField(default=list, blank=True, encoder=DjangoJSONEncoder)
+
+    class Meta:
+        unique_together = ('organization', 'rule')
+
+    def __str__(self):
+        return f"{self.organization.name} - {self.rule} ({self.evaluated_at})"
+
+
+
+class ComplianceScanJob(models.Model):
+    """Queued compliance scan executed outside the request cycle"""
+    STATUS_CHOICES = [
+        ('QUEUED', 'Queued'),
+        ('RUNNING', 'Running'),
+        ('COMPLETED', 'Completed'),
+        ('FAILED', 'Failed'),
+    ]
+    ACTIVE_STATUSES = ['QUEUED', 'RUNNING']
+
+    id = models.UUIDField(default=uuid.uuid4, primary_key=True, editable=False)
+    organization = models.ForeignKey(Org, on_delete=models.CASCADE, related_name='compliance_scan_jobs')
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    incremental = models.BooleanField(default=False)
+    profile = models.BooleanField(default=False)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='QUEUED')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+        constraints = [
+            # At most one queued or running scan per organization
+            models.UniqueConstraint(
+                fields=['organization'],
+                condition=models.Q(status__in=['QUEUED', 'RUNNING']),
+                name='unique_active_scan_job_per_org',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.organization.name} - scan {self.id} ({self.status})"
+
+
+class ComplianceAuditArchive(models.Model):
+    """
+    Closed audits moved out of ComplianceAudit by archive_compliance_records.
+    The primary key is the original audit id; archive_month (first day of the
+    detection month) is the partition key archives are grouped and pruned by.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    organization = models.ForeignKey(Org, on_delete=models.CASCADE, related_name='archived_compliance_audits')
+    archive_month = models.DateField()
+    rule_name = models.CharField(max_length=200)
+    rule_description = models.TextField()
+    severity = models.CharField(max_length=10, choices=ComplianceAudit.SEVERITY_CHOICES)
+    status = models.CharField(max_length=15, choices=ComplianceAudit.STATUS_CHOICES)
+    detected_at = models.DateTimeField()
+    resolved_at = models.DateTimeField(null=True, blank=True)
+    details = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    recommendation = models.TextField(blank=True)
+    fingerprint = models.CharField(max_length=64, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    archived = True
+
+    class Meta:
+        ordering = ['-detected_at']
+        indexes = [
+            models.Index(fields=['organization', '-detected_at']),
+            models.Index(fields=['archive_month']),
+        ]
+
+    def __str__(self):
+        return f"{self.organization.name} - {self.rule_name} ({self.archive_month:%Y-%m})"
+
+
+class ViolationReportArchive(models.Model):
+    """Resolved violation reports moved out of ViolationReport; the primary key is the original report id"""
+    id = models.BigIntegerField(primary_key=True)
+    organization = models.ForeignKey(Org, on_delete=models.CASCADE, related_name='archived_violation_reports')
+    archive_month = models.DateField()
+    violation_type = models.CharField(max_length=50, choices=ViolationReport.VIOLATION_TYPE_CHOICES)
+    description = models.TextField()
+    affected_users_count = models.IntegerField(default=0)
+    detected_at = models.DateTimeField()
+    reported_to_dpo = models.BooleanField(default=False)
+    resolved = models.BooleanField(default=True)
+    resolution_notes = models.TextField(blank=True)
+    related_audit_id = models.BigIntegerField(null=True, blank=True)  # Hot or archived audit id
+    related_audit_name = models.CharField(max_length=200, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    archived = True
+
+    class Meta:
+        ordering = ['-detected_at']
+        indexes = [
+            models.Index(fields=['organization', '-detected_at']),
+            models.Index(fields=['archive_month']),
+        ]
+
+    def __str__(self):
+        return f"{self.organization.name} - {self.get_violation_type_display()} ({self.archive_month:%Y-%m})"
+
+
+class ComplianceScan(models.Model):
+    """
+    One persisted compliance scan, stored as a diff against the open audits
+    the previous scan left behind. Only deltas are recorded, so a scan of an
+    unchanged organization writes a single row.
+    """
+    organization = models.ForeignKey(Org, on_delete=models.CASCADE, related_name='compliance_scans')
+    incremental = models.BooleanField(default=False)
+    created_at = models.DateTimeField(default=timezone.now)
+    risk_score = models.IntegerField(default=0)
+    total_violations = models.IntegerField(default=0)
+    new_count = models.IntegerField(default=0)
+    persisting_count = models.IntegerField(default=0)
+    resolved_count = models.IntegerField(default=0)
+    new_audit_ids = models.JSONField(default=list, blank=True)
+    resolved_audit_ids = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['organization', '-created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.organization.name} - scan {self.id} (+{self.new_count} / -{self.resolved_count})"
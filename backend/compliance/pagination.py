@@ -0,0 +1,54 @@
+"""
+Keyset (cursor) pagination for compliance records
+Pages are ordered by (-detected_at, id) and continue from the last row seen,
+so fetching a deep page costs the same as fetching the first one
+"""
+import base64
+import heapq
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+def encode_cursor(detected_at, pk) -> str:
+    """Opaque cursor pointing just after the given row"""
+    raw = f'{detected_at.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str):
+    """Return (detected_at, pk) from a cursor; raises ValueError when malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        timestamp, pk = raw.rsplit('|', 1)
+        detected_at = parse_datetime(timestamp)
+    except (UnicodeError, ValueError, TypeError) as e:
+        raise ValueError('Invalid cursor') from e
+    if detected_at is None:
+        raise ValueError('Invalid cursor')
+    return detected_at, int(pk)
+
+
+def _after_cursor(queryset, cursor: str = None):
+    queryset = queryset.order_by('-detected_at', 'id')
+    if cursor:
+        detected_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(detected_at__lt=detected_at) | Q(detected_at=detected_at, id__gt=pk))
+    return queryset
+
+
+def merged_keyset_page(querysets, cursor: str = None, page_size: int = 50):
+    """
+    Keyset page over several tables that share ids and ordering, such as a
+    hot table and its archive. Each source contributes at most page_size + 1
+    rows, which are merged in (-detected_at, id) order.
+    """
+    sources = [list(_after_cursor(queryset, cursor)[:page_size + 1]) for queryset in querysets]
+    if len(sources) == 1:
+        rows = sources[0]
+    else:
+        rows = list(heapq.merge(*sources, key=lambda row: (-row.detected_at.timestamp(), row.id)))
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(rows[-1].detected_at, rows[-1].id)
+    return rows, next_cursor
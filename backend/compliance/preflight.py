@@ -0,0 +1,140 @@
+"""
+Pre-flight compliance checks for proposed access requests
+Predicts which NDPR rules a request (or batch of requests) would violate
+if it were filed and approved, using the organization's materialized
+counters and request rate state. Nothing is written.
+"""
+from collections import Counter
+from django.db.models import Count
+from django.utils import timezone
+from organization.counters import compute_counters, shift_breadth
+from organization.request_rate import advance, decayed_rates, get_rate_state, is_burst
+from organization.models import Org, AccessRequest, OrgRequestCounters
+from consents.models import UserConsent
+from .rules_engine import NDPRRulesEngine
+
+
+def _violation(rule: str, details: dict, recommendation: str) -> dict:
+    return {
+        'rule': rule,
+        'severity': NDPRRulesEngine.RULES[rule]['severity'],
+        'details': details,
+        'recommendation': recommendation,
+    }
+
+
+def _current_counters(organization: Org) -> dict:
+    """Stored counters when present, otherwise computed without persisting them"""
+    stored = OrgRequestCounters.objects.filter(pk=organization.pk).values(
+        'total_requests', 'approved_breadth_histogram',
+    ).first()
+    if stored is not None:
+        return stored
+    return compute_counters([organization.pk]).get(organization.pk, {
+        'total_requests': 0, 'approved_breadth_histogram': {},
+    })
+
+
+def preflight(organization: Org, proposals: list) -> dict:
+    """
+    Evaluate proposed requests, each a dict with user_id, consent_id and purpose.
+    Runs a fixed number of queries however many requests are proposed.
+    """
+    engine = NDPRRulesEngine
+    user_ids = {p['user_id'] for p in proposals}
+    consent_ids = {p['consent_id'] for p in proposals}
+
+    counters = _current_counters(organization)
+    short_rate, long_rate = decayed_rates(get_rate_state(organization.pk), timezone.now())
+    org_requests = AccessRequest.objects.filter(organization=organization)
+    existing = {}
+    already_approved = set()
+    for user_id, consent_id, pk, request_status in org_requests.filter(
+        user_id__in=user_ids,
+        consent_id__in=consent_ids,
+    ).values_list('user_id', 'consent_id', 'id', 'status'):
+        existing[(user_id, consent_id)] = pk
+        if request_status == 'APPROVED':
+            already_approved.add((user_id, consent_id))
+    approved_breadth = dict(
+        org_requests.filter(status='APPROVED', user_id__in=user_ids)
+        .values('user_id')
+        .annotate(consent_types=Count('id'))
+        .values_list('user_id', 'consent_types')
+        .order_by()
+    )
+    active_consents = set(UserConsent.objects.filter(
+        user_id__in=user_ids,
+        consent_id__in=consent_ids,
+        access=True,
+    ).values_list('user_id', 'consent_id'))
+
+    results = []
+    seen = set()
+    new_requests = 0
+    for index, proposal in enumerate(proposals):
+        key = (proposal['user_id'], proposal['consent_id'])
+        existing_id = existing.get(key)
+        is_new = existing_id is None and key not in seen
+        seen.add(key)
+
+        violations = []
+        if engine.is_vague_purpose(proposal.get('purpose')):
+            violations.append(_violation('PURPOSE_LIMITATION', {
+                'purpose': proposal.get('purpose'),
+                'issue': 'Purpose is too vague or insufficient',
+            }, 'Specify clear, specific purpose for data access (minimum 10 characters)'))
+        if key not in active_consents:
+            violations.append(_violation('CONSENT_VALIDITY', {
+                'user_id': proposal['user_id'],
+                'consent_id': proposal['consent_id'],
+                'issue': 'User has not granted this consent',
+            }, 'Only request data the user has consented to share'))
+        if is_new:
+            new_requests += 1
+            projected_short, projected_long = advance(short_rate, long_rate, 0, new_requests)
+            if is_burst(projected_short, projected_long):
+                violations.append(_violation('EXCESSIVE_REQUESTS', {
+                    'short_term_rate': round(projected_short, 2),
+                    'baseline_rate': round(projected_long, 2),
+                    'issue': 'This request would push the request rate into a burst',
+                }, 'Review if all requests are necessary and legitimate'))
+
+        results.append({
+            'index': index,
+            'user_id': proposal['user_id'],
+            'consent_id': proposal['consent_id'],
+            'existing_request_id': existing_id,
+            'allowed': not violations,
+            'violations': violations,
+        })
+
+    projected_short, projected_long = advance(short_rate, long_rate, 0, new_requests)
+
+    # Data minimization is judged on the per-user breadth distribution,
+    # projected as if every proposed request were approved
+    newly_approved = Counter(user_id for user_id, _ in seen - already_approved)
+    histogram = counters['approved_breadth_histogram']
+    for user_id, added in newly_approved.items():
+        before = approved_breadth.get(user_id, 0)
+        for step in range(added):
+            histogram = shift_breadth(histogram, before + step, 1)
+    breadth = engine.consent_breadth_stats(histogram)
+    organization_violations = []
+    if engine.breadth_exceeds_threshold(breadth):
+        organization_violations.append(_violation('DATA_MINIMIZATION', {
+            **breadth,
+            'threshold': engine.DATA_MINIMIZATION_THRESHOLD,
+            'issue': 'Approving these requests would exceed the data minimization threshold',
+        }, 'Review if all requested data types are necessary for stated purpose'))
+
+    return {
+        'allowed': not organization_violations and all(r['allowed'] for r in results),
+        'requests': results,
+        'organization_violations': organization_violations,
+        'projected': {
+            'short_term_rate': round(projected_short, 2),
+            'baseline_rate': round(projected_long, 2),
+            'consent_breadth': breadth,
+        },
+    }
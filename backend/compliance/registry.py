@@ -0,0 +1,68 @@
+"""
+Compliance rule registry
+Each rule declares its metadata and the data it depends on, so scans can
+decide which rules to evaluate and attribute cost to individual rules
+"""
+
+
+class Rule:
+    """
+    A registered compliance rule.
+    inputs lists the data the rule reads: 'access_requests' and
+    'user_consents' changes, or 'clock' for rules over a sliding time window.
+    identity lists the detail keys that distinguish one finding of the rule
+    from another; rules without it produce one organization-wide finding.
+    """
+
+    def __init__(self, key, name, description, severity, check, inputs, identity=()):
+        self.key = key
+        self.name = name
+        self.description = description
+        self.severity = severity
+        self.check = check
+        self.inputs = tuple(inputs)
+        self.identity = tuple(identity)
+
+    def __repr__(self):
+        return f'<Rule {self.key}>'
+
+    def reads(self, *inputs) -> bool:
+        """Whether the rule depends on any of the given inputs"""
+        return any(i in self.inputs for i in inputs)
+
+    def evaluate(self, engine, organization, context) -> list:
+        """Run the rule's check method on the engine"""
+        return list(getattr(engine, self.check)(organization, context))
+
+    # Mapping-style access keeps rule['severity'] lookups working
+    def __getitem__(self, field):
+        try:
+            return getattr(self, field)
+        except AttributeError:
+            raise KeyError(field)
+
+    def get(self, field, default=None):
+        return getattr(self, field, default)
+
+
+class RuleRegistry(dict):
+    """Rules keyed by rule id, in evaluation order"""
+
+    def __init__(self, rules=()):
+        super().__init__()
+        for rule in rules:
+            self.register(rule)
+
+    def register(self, rule: Rule) -> Rule:
+        if rule.key in self:
+            raise ValueError(f'Rule {rule.key} is already registered')
+        self[rule.key] = rule
+        return rule
+
+    def severity(self, key: str, default: str = 'MEDIUM') -> str:
+        rule = self.get(key)
+        return rule.severity if rule else default
+
+    def depending_on(self, *inputs) -> list:
+        """Rules that read any of the given inputs"""
+        return [rule for rule in self.values() if rule.reads(*inputs)]
@@ -3,108 +3,147 @@ NDPR Compliance Rules Engine
 Implements automated checks based on Nigeria Data Protection Regulation
 Optimized for efficiency and idempotency
 """
+import hashlib
+import json
+import math
 from datetime import timedelta
+from django.db import transaction
+from django.db.models import Count, Max
 from django.utils import timezone
 from organization.models import AccessRequest, Org
-from consents.models import UserConsent
-from .models import ComplianceAudit, ViolationReport
+from organization.versioning import bump_data_version, get_data_version
+from organization.trust_scheduler import mark_trust_dirty
+from organization.request_rate import decayed_rates, in_burst
+from .models import ComplianceAudit, ViolationReport, ComplianceRuleWatermark, ComplianceScan
+from .registry import Rule, RuleRegistry
+from .scan_context import ScanContext
 
 
 class NDPRRulesEngine:
     """Engine for checking NDPR compliance rules"""
 
     # NDPR Rule Definitions
-    RULES = {
-        'CONSENT_VALIDITY': {
-            'name': 'Consent Validity Check',
-            'description': 'Ensures all data access has valid, explicit consent',
-            'severity': 'HIGH',
-        },
-        'PURPOSE_LIMITATION': {
-            'name': 'Purpose Limitation',
-            'description': 'Data access must align with stated purpose',
-            'severity': 'HIGH',
-        },
-        'DATA_MINIMIZATION': {
-            'name': 'Data Minimization',
-            'description': 'Organizations should only request necessary data',
-            'severity': 'MEDIUM',
-        },
-        'RETENTION_POLICY': {
-            'name': 'Data Retention Policy',
-            'description': 'Data should not be retained beyond stated purpose',
-            'severity': 'MEDIUM',
-        },
-        'ACCESS_CONTROL': {
-            'name': 'Access Control',
-            'description': 'Unauthorized access attempts detected',
-            'severity': 'CRITICAL',
-        },
-        'AUDIT_TRAIL': {
-            'name': 'Audit Trail Completeness',
-            'description': 'All data access must be logged and auditable',
-            'severity': 'HIGH',
-        },
-        'REVOCATION_HANDLING': {
-            'name': 'Consent Revocation Handling',
-            'description': 'Revoked consents must be respected immediately',
-            'severity': 'CRITICAL',
-        },
-        'EXCESSIVE_REQUESTS': {
-            'name': 'Excessive Data Requests',
-            'description': 'Unusual pattern of data access requests detected',
-            'severity': 'MEDIUM',
-        },
-    }
-
-    # -------------------- Helper Methods --------------------
+    # See compliance.registry.Rule for what inputs and identity declare.
+    RULES = RuleRegistry([
+        Rule(
+            'CONSENT_VALIDITY',
+            name='Consent Validity Check',
+            description='Ensures all data access has valid, explicit consent',
+            severity='HIGH',
+            check='check_consent_validity',
+            inputs=('access_requests', 'user_consents'),
+            identity=('access_request_id',),
+        ),
+        Rule(
+            'PURPOSE_LIMITATION',
+            name='Purpose Limitation',
+            description='Data access must align with stated purpose',
+            severity='HIGH',
+            check='check_purpose_limitation',
+            inputs=('access_requests',),
+            identity=('access_request_id',),
+        ),
+        Rule(
+            'DATA_MINIMIZATION',
+            name='Data Minimization',
+            description='Organizations should only request necessary data',
+            severity='MEDIUM',
+            check='check_data_minimization',
+            inputs=('access_requests',),
+        ),
+        Rule(
+            'RETENTION_POLICY',
+            name='Data Retention Policy',
+            description='Data should not be retained beyond stated purpose',
+            severity='MEDIUM',
+            check='check_retention_policy',
+            inputs=('access_requests', 'clock'),
+        ),
+        Rule(
+            'ACCESS_CONTROL',
+            name='Access Control',
+            description='Unauthorized access attempts detected',
+            severity='CRITICAL',
+            check='check_access_control',
+            inputs=('access_requests',),
+        ),
+        Rule(
+            'AUDIT_TRAIL',
+            name='Audit Trail Completeness',
+            description='All data access must be logged and auditable',
+            severity='HIGH',
+            check='check_audit_trail',
+            inputs=('access_requests',),
+        ),
+        Rule(
+            'REVOCATION_HANDLING',
+            name='Consent Revocation Handling',
+            description='Revoked consents must be respected immediately',
+            severity='CRITICAL',
+            check='check_revocation_handling',
+            inputs=('access_requests', 'user_consents'),
+            identity=('access_request_id',),
+        ),
+        Rule(
+            'EXCESSIVE_REQUESTS',
+            name='Excessive Data Requests',
+            description='Unusual pattern of data access requests detected',
+            severity='MEDIUM',
+            check='check_excessive_requests',
+            inputs=('access_requests', 'clock'),
+        ),
+    ])
 
-    @staticmethod
-    def fetch_approved_requests(organization: Org):
-        """Fetch all approved access requests once"""
-        return AccessRequest.objects.filter(
-            organization=organization,
-            status='APPROVED'
-        ).select_related('user', 'consent')
+    # Time-windowed rules are re-evaluated at least this often by incremental scans
+    CLOCK_RULE_REFRESH = timedelta(hours=1)
 
-    @staticmethod
-    def fetch_user_consents(user):
-        """Fetch all user consents once"""
-        return {uc.consent_id: uc for uc in UserConsent.objects.filter(user=user)}
+    # Rule thresholds, shared by scans and pre-flight checks
+    DATA_MINIMIZATION_THRESHOLD = 3.5   # consent types approved for one user
+    DATA_MINIMIZATION_PERCENTILE = 95   # flag when this share of users reaches the threshold
+    RETENTION_DAYS = 365
+    REVOKED_REQUEST_THRESHOLD = 10
+    # EXCESSIVE_REQUESTS compares request rates; see organization.request_rate
+
+    # Audits in these states are still open findings
+    OPEN_AUDIT_STATUSES = ['PENDING', 'INVESTIGATING']
+    BULK_BATCH_SIZE = 500
 
     # -------------------- Rule Checks --------------------
+    # Every rule evaluates against a ScanContext. When called on its own
+    # a rule loads a fresh context; run_all_checks shares one across rules.
+    # Per-request rules are generators so streamed exports never hold a full
+    # hit list; organization-wide rules return at most one finding.
+
+    VAGUE_PURPOSES = ['general', 'testing', 'research', 'other', '']
+
+    @classmethod
+    def is_vague_purpose(cls, purpose) -> bool:
+        """Purposes that are generic or shorter than 10 characters are too vague"""
+        return not purpose or purpose.lower() in cls.VAGUE_PURPOSES or len(purpose.strip()) < 10
 
     @classmethod
-    def check_consent_validity(cls, organization: Org) -> list:
+    def check_consent_validity(cls, organization: Org, context: ScanContext = None):
         """Check that all approved access requests have valid user consent"""
-        violations = []
-        approved_requests = cls.fetch_approved_requests(organization)
-
-        for req in approved_requests:
-            user_consents = cls.fetch_user_consents(req.user)
-            uc = user_consents.get(req.consent_id)
-            if not uc or not uc.access:
-                violations.append({
-                    'rule': 'CONSENT_VALIDITY',
-                    'details': {
-                        'access_request_id': req.id,
-                        'user_id': req.user.id,
-                        'consent_type': req.consent.name,
-                        'issue': 'Access approved but user consent revoked',
-                    },
-                    'recommendation': f'Revoke access request #{req.id} as user has revoked consent for {req.consent.name}',
-                })
-        return violations
+        context = context or ScanContext.load(organization)
+        for req in context.iter_unconsented():
+            yield {
+                'rule': 'CONSENT_VALIDITY',
+                'details': {
+                    'access_request_id': req.id,
+                    'user_id': req.user_id,
+                    'consent_type': req.consent_name,
+                    'issue': 'Access approved but user consent revoked',
+                },
+                'recommendation': f'Revoke access request #{req.id} as user has revoked consent for {req.consent_name}',
+            }
 
-    @staticmethod
-    def check_purpose_limitation(organization: Org) -> list:
+    @classmethod
+    def check_purpose_limitation(cls, organization: Org, context: ScanContext = None):
         """Check that access purposes are clear and specific"""
-        violations = []
-        requests = AccessRequest.objects.filter(organization=organization)
-        vague_purposes = ['general', 'testing', 'research', 'other', '']
-        for req in requests:
-            if req.purpose.lower() in vague_purposes or len(req.purpose.strip()) < 10:
-                violations.append({
+        context = context or ScanContext.load(organization)
+        for req in context.iter_requests():
+            if cls.is_vague_purpose(req.purpose):
+                yield {
                     'rule': 'PURPOSE_LIMITATION',
                     'details': {
                         'access_request_id': req.id,
@@ -112,69 +151,81 @@ class NDPRRulesEngine:
                         'issue': 'Purpose is too vague or insufficient',
                     },
                     'recommendation': 'Specify clear, specific purpose for data access (minimum 10 characters)',
-                })
-        return violations
+                }
 
-    @staticmethod
-    def check_data_minimization(organization: Org) -> list:
-        """Check if organization requests excessive data types"""
-        violations = []
-        approved_requests = AccessRequest.objects.filter(
-            organization=organization,
-            status='APPROVED'
-        )
-        unique_users = approved_requests.values('user').distinct().count()
-        consent_types = approved_requests.values('consent').distinct().count()
-        avg_consents_per_user = consent_types / unique_users if unique_users else 0
+    @classmethod
+    def consent_breadth_stats(cls, histogram: dict) -> dict:
+        """Distribution summary of a consent breadth histogram ({consent types per user: users})"""
+        buckets = sorted((int(breadth), users) for breadth, users in histogram.items())
+        total_users = sum(users for _, users in buckets)
+        rank = math.ceil(total_users * cls.DATA_MINIMIZATION_PERCENTILE / 100)
+        percentile = 0
+        seen = 0
+        for breadth, users in buckets:
+            seen += users
+            if seen >= rank:
+                percentile = breadth
+                break
+        above = sum(users for breadth, users in buckets if breadth > cls.DATA_MINIMIZATION_THRESHOLD)
+        return {
+            'unique_users': total_users,
+            f'p{cls.DATA_MINIMIZATION_PERCENTILE}_consents_per_user': percentile,
+            'share_above_threshold': round(above / total_users, 4) if total_users else 0,
+            'consent_breadth_histogram': {str(breadth): users for breadth, users in buckets},
+        }
 
-        if avg_consents_per_user >= 3.5:
-            violations.append({
-                'rule': 'DATA_MINIMIZATION',
-                'details': {
-                    'unique_users': unique_users,
-                    'consent_types_accessed': consent_types,
-                    'avg_consents_per_user': round(avg_consents_per_user, 2),
-                    'issue': 'Accessing multiple data types per user may violate data minimization',
-                },
-                'recommendation': 'Review if all requested data types are necessary for stated purpose',
-            })
-        return violations
+    @classmethod
+    def breadth_exceeds_threshold(cls, stats: dict) -> bool:
+        """Whether the DATA_MINIMIZATION_PERCENTILE user holds at least DATA_MINIMIZATION_THRESHOLD consent types"""
+        return stats[f'p{cls.DATA_MINIMIZATION_PERCENTILE}_consents_per_user'] >= cls.DATA_MINIMIZATION_THRESHOLD
 
-    @staticmethod
-    def check_retention_policy(organization: Org) -> list:
+    @classmethod
+    def check_data_minimization(cls, organization: Org, context: ScanContext = None) -> list:
+        """Check whether users commonly have many consent types approved for this organization"""
+        context = context or ScanContext.load(organization)
+        stats = cls.consent_breadth_stats(context.counters.approved_breadth_histogram)
+        if not cls.breadth_exceeds_threshold(stats):
+            return []
+        return [{
+            'rule': 'DATA_MINIMIZATION',
+            'details': {
+                **stats,
+                'threshold': cls.DATA_MINIMIZATION_THRESHOLD,
+                'issue': 'Accessing multiple data types per user may violate data minimization',
+            },
+            'recommendation': 'Review if all requested data types are necessary for stated purpose',
+        }]
+
+    @classmethod
+    def check_retention_policy(cls, organization: Org, context: ScanContext = None) -> list:
         """Check for old approved requests violating retention"""
+        context = context or ScanContext.load(organization)
         violations = []
-        one_year_ago = timezone.now() - timedelta(days=365)
-        old_approved = AccessRequest.objects.filter(
-            organization=organization,
-            status='APPROVED',
-            requested_at__lt=one_year_ago
-        )
-        if old_approved.exists():
+        old_count = context.approved_before_count(days=cls.RETENTION_DAYS)
+        if old_count:
+            oldest = context.counters.oldest_approved_at
             violations.append({
                 'rule': 'RETENTION_POLICY',
                 'details': {
-                    'old_requests_count': old_approved.count(),
-                    'oldest_request_date': old_approved.order_by('requested_at').first().requested_at.date().isoformat(),
-                    'issue': f'{old_approved.count()} approved access requests older than 1 year',
+                    'old_requests_count': old_count,
+                    'oldest_request_date': oldest.date().isoformat(),
+                    'issue': f'{old_count} approved access requests older than 1 year',
                 },
                 'recommendation': 'Review and archive data access older than retention period (1 year)',
             })
         return violations
 
-    @staticmethod
-    def check_access_control(organization: Org) -> list:
+    @classmethod
+    def check_access_control(cls, organization: Org, context: ScanContext = None) -> list:
         """Check for patterns indicating unauthorized access"""
+        context = context or ScanContext.load(organization)
         violations = []
-        revoked_after_approval = AccessRequest.objects.filter(
-            organization=organization,
-            status='REVOKED'
-        )
-        if revoked_after_approval.count() > 10:
+        revoked_count = context.counters.revoked_requests
+        if revoked_count > cls.REVOKED_REQUEST_THRESHOLD:
             violations.append({
                 'rule': 'ACCESS_CONTROL',
                 'details': {
-                    'revoked_count': revoked_after_approval.count(),
+                    'revoked_count': revoked_count,
                     'issue': 'High number of revoked access requests may indicate access control issues',
                 },
                 'recommendation': 'Review access control policies and ensure revoked access is immediately enforced',
@@ -182,13 +233,11 @@ class NDPRRulesEngine:
         return violations
 
     @staticmethod
-    def check_audit_trail(organization: Org) -> list:
+    def check_audit_trail(organization: Org, context: ScanContext = None) -> list:
         """Ensure all access requests are properly logged"""
+        context = context or ScanContext.load(organization)
         violations = []
-        missing_purpose = AccessRequest.objects.filter(
-            organization=organization,
-            purpose__isnull=True
-        ).count()
+        missing_purpose = sum(1 for r in context.iter_requests() if r.purpose is None)
         if missing_purpose > 0:
             violations.append({
                 'rule': 'AUDIT_TRAIL',
@@ -201,115 +250,354 @@ class NDPRRulesEngine:
         return violations
 
     @classmethod
-    def check_revocation_handling(cls, organization: Org) -> list:
+    def check_revocation_handling(cls, organization: Org, context: ScanContext = None):
         """Ensure revoked consents are enforced"""
-        violations = []
-        approved_requests = cls.fetch_approved_requests(organization)
-        for req in approved_requests:
-            user_consents = cls.fetch_user_consents(req.user)
-            uc = user_consents.get(req.consent_id)
-            if not uc or not uc.access:
-                violations.append({
-                    'rule': 'REVOCATION_HANDLING',
-                    'details': {
-                        'access_request_id': req.id,
-                        'user_id': req.user.id,
-                        'consent_type': req.consent.name,
-                        'issue': 'Access approved but consent is missing or revoked',
-                    },
-                    'recommendation': f'IMMEDIATELY revoke access request #{req.id}',
-                })
-        return violations
-
-    @staticmethod
-    def check_excessive_requests(organization: Org) -> list:
-        """Detect unusual access patterns"""
-        violations = []
-        thirty_days_ago = timezone.now() - timedelta(days=30)
-        recent_requests = AccessRequest.objects.filter(
-            organization=organization,
-            requested_at__gte=thirty_days_ago
-        )
-        if recent_requests.count() > 100:
-            violations.append({
-                'rule': 'EXCESSIVE_REQUESTS',
+        context = context or ScanContext.load(organization)
+        for req in context.iter_unconsented():
+            yield {
+                'rule': 'REVOCATION_HANDLING',
                 'details': {
-                    'requests_count': recent_requests.count(),
-                    'period_days': 30,
-                    'issue': 'Unusually high number of data access requests',
+                    'access_request_id': req.id,
+                    'user_id': req.user_id,
+                    'consent_type': req.consent_name,
+                    'issue': 'Access approved but consent is missing or revoked',
                 },
-                'recommendation': 'Review if all requests are necessary and legitimate',
-            })
-        return violations
+                'recommendation': f'IMMEDIATELY revoke access request #{req.id}',
+            }
+
+    @classmethod
+    def excessive_requests_violation(cls, state, now) -> dict:
+        """Finding for an organization whose request rate is bursting"""
+        short_rate, long_rate = decayed_rates(state, now)
+        return {
+            'rule': 'EXCESSIVE_REQUESTS',
+            'details': {
+                'short_term_rate': round(short_rate, 2),
+                'baseline_rate': round(long_rate, 2),
+                'burst_started_at': state.burst_started_at.isoformat() if state.burst_started_at else None,
+                'issue': 'Access request rate is far above the organization\'s usual rate',
+            },
+            'recommendation': 'Review if all requests are necessary and legitimate',
+        }
+
+    @classmethod
+    def check_excessive_requests(cls, organization: Org, context: ScanContext = None) -> list:
+        """Detect request bursts from the streaming rate state, without counting requests"""
+        context = context or ScanContext.load(organization)
+        state = context.request_rate
+        if not in_burst(state, context.now):
+            return []
+        return [cls.excessive_requests_violation(state, context.now)]
 
     # -------------------- Main Execution --------------------
 
     @classmethod
-    def run_all_checks(cls, organization: Org) -> dict:
-        """Run all rules and calculate overall risk"""
+    def iter_violations(cls, organization: Org, context: ScanContext = None):
+        """Yield every rule's violations one at a time, without collecting them"""
+        context = context or ScanContext.stream(organization)
+        for rule in cls.RULES.values():
+            yield from getattr(cls, rule.check)(organization, context)
+
+    @classmethod
+    def evaluate_rules(cls, rules, organization: Org, context: ScanContext, profiler=None) -> dict:
+        """Evaluate rules against one context, returning violations by rule key"""
+        violations_by_rule = {}
+        for rule in rules:
+            if profiler is None:
+                violations_by_rule[rule.key] = rule.evaluate(cls, organization, context)
+                continue
+            with profiler.rule(rule.key, context):
+                violations_by_rule[rule.key] = rule.evaluate(cls, organization, context)
+        return violations_by_rule
+
+    @classmethod
+    def run_all_checks(cls, organization: Org, context: ScanContext = None, profiler=None) -> dict:
+        """Run all rules against one shared data snapshot and calculate overall risk"""
+        context = context or ScanContext.load(organization)
+        violations_by_rule = cls.evaluate_rules(cls.RULES.values(), organization, context, profiler)
+        return cls.summarize([v for violations in violations_by_rule.values() for v in violations])
+
+    @classmethod
+    def run_incremental_checks(cls, organization: Org, force: bool = False, profiler=None) -> dict:
+        """
+        Re-evaluate only the rules whose inputs changed since their watermark.
+        Findings of unchanged rules are carried forward from the last evaluation,
+        so a quiet organization costs a few aggregate queries and no data load.
+        Consent changes are detected through the organization's data version,
+        which every UserConsent save and delete bumps, including the sibling
+        revocations UserConsent.save applies with a bulk update.
+        With force=True every rule is re-evaluated and its watermark refreshed.
+        """
+        now = timezone.now()
+        watermarks = {}
+        if not force:
+            watermarks = {w.rule: w for w in ComplianceRuleWatermark.objects.filter(organization=organization)}
+        request_state = AccessRequest.objects.filter(organization=organization).aggregate(
+            last_change=Max('updated_at'),
+            total=Count('id'),
+        )
+        data_version = get_data_version(organization.pk)
+
+        stale_rules = []
+        for rule in cls.RULES.values():
+            watermark = watermarks.get(rule.key)
+            if watermark is None:
+                stale_rules.append(rule)
+                continue
+            requests_changed = (
+                watermark.access_request_count != request_state['total']
+                or (request_state['last_change'] and request_state['last_change'] > watermark.evaluated_at)
+            )
+            consents_changed = watermark.data_version != data_version
+            clock_expired = now - watermark.evaluated_at >= cls.CLOCK_RULE_REFRESH
+            if ((requests_changed and rule.reads('access_requests'))
+                    or (consents_changed and rule.reads('user_consents'))
+                    or (clock_expired and rule.reads('clock'))):
+                stale_rules.append(rule)
+
+        fresh_violations = {}
+        if stale_rules:
+            context = ScanContext.load(organization, now=now)
+            fresh_violations = cls.evaluate_rules(stale_rules, organization, context, profiler)
+            cls.save_watermarks(organization, fresh_violations, now, request_state['total'], data_version)
+
         all_violations = []
-        all_violations.extend(cls.check_consent_validity(organization))
-        all_violations.extend(cls.check_purpose_limitation(organization))
-        all_violations.extend(cls.check_data_minimization(organization))
-        all_violations.extend(cls.check_retention_policy(organization))
-        all_violations.extend(cls.check_access_control(organization))
-        all_violations.extend(cls.check_audit_trail(organization))
-        all_violations.extend(cls.check_revocation_handling(organization))
-        all_violations.extend(cls.check_excessive_requests(organization))
+        for rule in cls.RULES:
+            if rule in fresh_violations:
+                all_violations.extend(fresh_violations[rule])
+            else:
+                all_violations.extend(watermarks[rule].violations)
+
+        result = cls.summarize(all_violations)
+        result['evaluated_rules'] = [rule.key for rule in stale_rules]
+        result['carried_forward_rules'] = [rule for rule in cls.RULES if rule not in fresh_violations]
+        return result
 
+    @staticmethod
+    def save_watermarks(organization: Org, violations_by_rule: dict, evaluated_at, access_request_count: int,
+                        data_version: int = 0):
+        """Record the evaluation watermark and findings for each evaluated rule"""
+        ComplianceRuleWatermark.objects.bulk_create(
+            [
+                ComplianceRuleWatermark(
+                    organization=organization,
+                    rule=rule,
+                    evaluated_at=evaluated_at,
+                    access_request_count=access_request_count,
+                    data_version=data_version,
+                    violations=violations,
+                )
+                for rule, violations in violations_by_rule.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['organization', 'rule'],
+            update_fields=['evaluated_at', 'access_request_count', 'data_version', 'violations'],
+        )
+
+    @classmethod
+    def summarize(cls, all_violations: list) -> dict:
+        """Build the scan result summary for a list of violations"""
         return {
             'violations': all_violations,
             'risk_score': cls.calculate_risk_score(all_violations),
             'total_violations': len(all_violations),
-            'critical_count': len([v for v in all_violations if cls.RULES.get(v['rule'], {}).get('severity') == 'CRITICAL']),
-            'high_count': len([v for v in all_violations if cls.RULES.get(v['rule'], {}).get('severity') == 'HIGH']),
-            'medium_count': len([v for v in all_violations if cls.RULES.get(v['rule'], {}).get('severity') == 'MEDIUM']),
+            'critical_count': len([v for v in all_violations if cls.RULES.severity(v['rule'], None) == 'CRITICAL']),
+            'high_count': len([v for v in all_violations if cls.RULES.severity(v['rule'], None) == 'HIGH']),
+            'medium_count': len([v for v in all_violations if cls.RULES.severity(v['rule'], None) == 'MEDIUM']),
         }
 
-    @staticmethod
-    def calculate_risk_score(violations: list) -> int:
+    # Risk points per finding by severity; anything else (LOW) scores 5
+    SEVERITY_POINTS = {'CRITICAL': 20, 'HIGH': 15, 'MEDIUM': 10}
+
+    @classmethod
+    def calculate_risk_score(cls, violations: list) -> int:
         """Calculate NDPR risk score (0-100)"""
-        score = 0
+        severity_counts = {}
         for v in violations:
-            severity = NDPRRulesEngine.RULES.get(v['rule'], {}).get('severity', 'MEDIUM')
-            if severity == 'CRITICAL':
-                score += 20
-            elif severity == 'HIGH':
-                score += 15
-            elif severity == 'MEDIUM':
-                score += 10
-            else:
-                score += 5
+            severity = cls.RULES.severity(v['rule'])
+            severity_counts[severity] = severity_counts.get(severity, 0) + 1
+        return cls.calculate_risk_score_from_counts(severity_counts)
+
+    @classmethod
+    def calculate_risk_score_from_counts(cls, severity_counts: dict) -> int:
+        """Calculate NDPR risk score (0-100) from finding counts keyed by severity"""
+        score = sum(cls.SEVERITY_POINTS.get(severity, 5) * count for severity, count in severity_counts.items())
         return min(score, 100)
 
     @classmethod
-    def create_audit_records(cls, organization: Org, scan_result: dict) -> list:
-        """Create audits and violation reports idempotently"""
-        audit_records = []
+    def findings_from_signals(cls, counters, unconsented: int, vague_purposes: int, missing_purposes: int,
+                              retention_expired: int, rate_state, now=None) -> dict:
+        """
+        Findings per rule a full scan would raise, from aggregate signals instead
+        of request rows, so callers can score an organization without scanning it
+        """
+        stats = cls.consent_breadth_stats(counters.approved_breadth_histogram)
+        return {
+            'CONSENT_VALIDITY': unconsented,
+            'PURPOSE_LIMITATION': vague_purposes,
+            'DATA_MINIMIZATION': int(cls.breadth_exceeds_threshold(stats)),
+            'RETENTION_POLICY': int(retention_expired > 0),
+            'ACCESS_CONTROL': int(counters.revoked_requests > cls.REVOKED_REQUEST_THRESHOLD),
+            'AUDIT_TRAIL': int(missing_purposes > 0),
+            'REVOCATION_HANDLING': unconsented,
+            'EXCESSIVE_REQUESTS': int(in_burst(rate_state, now)),
+        }
+
+    @classmethod
+    def calculate_risk_score_from_findings(cls, findings_by_rule: dict) -> int:
+        """Calculate NDPR risk score (0-100) from finding counts keyed by rule"""
+        severity_counts = {}
+        for rule, count in findings_by_rule.items():
+            severity = cls.RULES.severity(rule)
+            severity_counts[severity] = severity_counts.get(severity, 0) + count
+        return cls.calculate_risk_score_from_counts(severity_counts)
+
+    @classmethod
+    def fingerprint(cls, organization: Org, violation: dict) -> str:
+        """Deterministic identity of a violation, stable across scans"""
+        rule = violation['rule']
+        details = violation.get('details', {})
+        identity = {key: str(details.get(key)) for key in getattr(cls.RULES.get(rule), 'identity', ())}
+        payload = json.dumps({'organization': organization.id, 'rule': rule, 'identity': identity}, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def lock_organization(organization: Org):
+        """Serialize writers of an organization's open audits for this transaction"""
+        Org.objects.select_for_update().filter(pk=organization.pk).exists()
+
+    @classmethod
+    @transaction.atomic
+    def raise_finding(cls, organization: Org, violation: dict) -> ComplianceAudit:
+        """
+        Open an audit for a finding detected outside a scan, such as a request
+        burst caught on insert. An open audit with the same fingerprint is
+        reused, and the next scan treats it like any other open audit.
+        """
+        cls.lock_organization(organization)
+        fingerprint = cls.fingerprint(organization, violation)
+        audit = ComplianceAudit.objects.filter(
+            organization=organization,
+            status__in=cls.OPEN_AUDIT_STATUSES,
+            fingerprint=fingerprint,
+        ).first()
+        if audit is not None:
+            return audit
+
+        rule = cls.RULES[violation['rule']]
+        audit = ComplianceAudit.objects.create(
+            organization=organization,
+            rule_name=rule.name,
+            rule_description=rule.description,
+            severity=rule.severity,
+            details=violation.get('details', {}),
+            recommendation=violation.get('recommendation', ''),
+            status='PENDING',
+            fingerprint=fingerprint,
+        )
+        if audit.severity in ['CRITICAL', 'HIGH']:
+            ViolationReport.objects.create(
+                organization=organization,
+                violation_type=violation['rule'],
+                related_audit=audit,
+                description=audit.recommendation or audit.rule_description,
+                affected_users_count=1 if 'user_id' in audit.details else 0,
+                reported_to_dpo=audit.severity == 'CRITICAL',
+            )
+        return audit
+
+    @classmethod
+    @transaction.atomic
+    def record_scan(cls, organization: Org, scan_result: dict, incremental: bool = False) -> ComplianceScan:
+        """
+        Persist scan findings as a diff against the open audits left by the
+        previous scan, keyed on violation fingerprints. New findings are
+        inserted, vanished ones are resolved in bulk with their reports, and
+        persisting audits are not written, so writes scale with change volume.
+        Runs in one transaction under the organization's row lock, so a failed
+        scan leaves nothing behind and concurrent scans cannot both insert a
+        fingerprint.
+        """
+        cls.lock_organization(organization)
+        now = timezone.now()
+        current = {}
         for violation in scan_result.get('violations', []):
+            current.setdefault(cls.fingerprint(organization, violation), violation)
+
+        persisting = set()
+        vanished_ids = []
+        open_audits = ComplianceAudit.objects.filter(organization=organization, status__in=cls.OPEN_AUDIT_STATUSES)
+        for pk, fingerprint in open_audits.values_list('id', 'fingerprint').order_by():
+            if fingerprint in current and fingerprint not in persisting:
+                persisting.add(fingerprint)
+            else:
+                vanished_ids.append(pk)
+
+        for i in range(0, len(vanished_ids), cls.BULK_BATCH_SIZE):
+            batch = vanished_ids[i:i + cls.BULK_BATCH_SIZE]
+            ComplianceAudit.objects.filter(pk__in=batch).update(status='RESOLVED', resolved_at=now)
+            ViolationReport.objects.filter(related_audit_id__in=batch, resolved=False).update(
+                resolved=True,
+                resolution_notes='Auto-resolved: violation no longer detected',
+            )
+
+        new_audits = []
+        for fingerprint, violation in current.items():
+            if fingerprint in persisting:
+                continue
             rule_info = cls.RULES.get(violation['rule'], {})
-            audit, _ = ComplianceAudit.objects.get_or_create(
+            new_audits.append(ComplianceAudit(
                 organization=organization,
                 rule_name=rule_info.get('name', violation['rule']),
-                defaults={
-                    'rule_description': rule_info.get('description', ''),
-                    'severity': rule_info.get('severity', 'MEDIUM'),
-                    'details': violation.get('details', {}),
-                    'recommendation': violation.get('recommendation', ''),
-                    'status': 'PENDING',
-                }
-            )
-            audit_records.append(audit)
+                rule_description=rule_info.get('description', ''),
+                severity=rule_info.get('severity', 'MEDIUM'),
+                details=violation.get('details', {}),
+                recommendation=violation.get('recommendation', ''),
+                status='PENDING',
+                fingerprint=fingerprint,
+            ))
+        ComplianceAudit.objects.bulk_create(new_audits, batch_size=cls.BULK_BATCH_SIZE)
 
-            if rule_info.get('severity') in ['CRITICAL', 'HIGH']:
-                ViolationReport.objects.get_or_create(
+        reports = []
+        for audit in new_audits:
+            violation = current[audit.fingerprint]
+            if audit.severity in ['CRITICAL', 'HIGH']:
+                reports.append(ViolationReport(
                     organization=organization,
                     violation_type=violation.get('rule', 'PRIVACY_BREACH'),
                     related_audit=audit,
-                    defaults={
-                        'description': violation.get('recommendation', rule_info.get('description', '')),
-                        'affected_users_count': 1 if 'user_id' in violation.get('details', {}) else 0,
-                        'reported_to_dpo': rule_info.get('severity') == 'CRITICAL',
-                    }
-                )
-        return audit_records
+                    description=violation.get('recommendation', audit.rule_description),
+                    affected_users_count=1 if 'user_id' in violation.get('details', {}) else 0,
+                    reported_to_dpo=audit.severity == 'CRITICAL',
+                ))
+        ViolationReport.objects.bulk_create(reports, batch_size=cls.BULK_BATCH_SIZE)
+
+        # Bulk writes bypass model signals, so invalidate cached results here
+        if new_audits or vanished_ids:
+            bump_data_version(organization.id)
+            mark_trust_dirty(organization.id)
+
+        scan = ComplianceScan.objects.create(
+            organization=organization,
+            incremental=incremental,
+            created_at=now,
+            risk_score=scan_result.get('risk_score', 0),
+            total_violations=scan_result.get('total_violations', len(current)),
+            new_count=len(new_audits),
+            persisting_count=len(persisting),
+            resolved_count=len(vanished_ids),
+            new_audit_ids=[audit.id for audit in new_audits],
+            resolved_audit_ids=vanished_ids,
+        )
+        scan.fingerprints = list(current)
+        return scan
+
+    @classmethod
+    def create_audit_records(cls, organization: Org, scan_result: dict) -> list:
+        """Record a scan and return the open audit for each finding, in violation order"""
+        scan = cls.record_scan(organization, scan_result)
+        by_fingerprint = {
+            audit.fingerprint: audit
+            for audit in ComplianceAudit.objects.filter(organization=organization, status__in=cls.OPEN_AUDIT_STATUSES)
+        }
+        return [by_fingerprint[fingerprint] for fingerprint in scan.fingerprints]
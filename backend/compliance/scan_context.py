@@ -0,0 +1,186 @@
+"""
+Per-scan data snapshot for the NDPR rules engine
+Loads an organization's access requests and consent states once so every
+rule evaluates against the same in-memory data
+"""
+from collections import Counter, namedtuple
+from datetime import timedelta
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from django.utils.functional import cached_property
+from organization.models import AccessRequest
+from organization.counters import breadth_histogram, get_counters
+from organization.request_rate import get_rate_state, replay
+from consents.models import UserConsent
+
+
+# Compact row for one access request, including whether the user
+# currently holds an active consent for the requested consent type
+AccessRequestRow = namedtuple('AccessRequestRow', [
+    'id',
+    'user_id',
+    'consent_id',
+    'consent_name',
+    'status',
+    'purpose',
+    'requested_at',
+    'has_active_consent',
+])
+
+# Per-organization request counters, as stored in OrgRequestCounters
+RequestCounters = namedtuple('RequestCounters', [
+    'total_requests',
+    'pending_requests',
+    'approved_requests',
+    'revoked_requests',
+    'approved_users',
+    'approved_consent_types',
+    'oldest_approved_at',
+    'approved_breadth_histogram',
+])
+
+
+class ScanContext:
+    """
+    Snapshot of the data one compliance scan evaluates.
+    Access request rows are only fetched when a rule needs them; rules that
+    only need totals read the organization's materialized counters.
+    """
+
+    # Rows fetched per round trip when streaming
+    STREAM_CHUNK_SIZE = 2000
+
+    def __init__(self, organization, requests, now=None, queryset=None):
+        self.organization = organization
+        self._rows = requests
+        self._queryset = queryset
+        self.now = now or timezone.now()
+        self.rows_fetched = 0  # rows read from the database, for scan profiling
+
+    @staticmethod
+    def request_rows(organization):
+        """Access request rows with their consent state, newest first"""
+        active_consent = UserConsent.objects.filter(
+            user=OuterRef('user'),
+            consent=OuterRef('consent'),
+            access=True,
+        )
+        return (
+            AccessRequest.objects.filter(organization=organization)
+            .annotate(has_active_consent=Exists(active_consent))
+            .order_by('-requested_at')
+            .values_list(
+                'id', 'user_id', 'consent_id', 'consent__name',
+                'status', 'purpose', 'requested_at', 'has_active_consent',
+            )
+        )
+
+    @classmethod
+    def stream(cls, organization, now=None):
+        """
+        A context that never holds the organization's rows in memory.
+        Each pass over iter_requests re-reads rows in chunks from the database.
+        """
+        return cls(organization, None, now=now, queryset=cls.request_rows(organization))
+
+    @classmethod
+    def load(cls, organization, now=None):
+        """Load the organization's access requests and consent states in one query"""
+        rows = cls.request_rows(organization)
+
+        def fetch():
+            # The query runs on first access to requests, not here
+            for row in rows:
+                yield AccessRequestRow._make(row)
+
+        return cls(organization, fetch(), now=now)
+
+    @cached_property
+    def requests(self) -> list:
+        rows = list(self._rows)
+        if not isinstance(self._rows, (list, tuple)):
+            self.rows_fetched += len(rows)
+        return rows
+
+    @property
+    def rows_loaded(self) -> bool:
+        return 'requests' in self.__dict__ or isinstance(self._rows, (list, tuple))
+
+    @cached_property
+    def counters(self) -> RequestCounters:
+        """Request totals, from the loaded rows when present, else the counters table"""
+        if self.rows_loaded or self.organization is None or self.organization.pk is None:
+            approved = self.approved
+            return RequestCounters(
+                total_requests=len(self.requests),
+                pending_requests=sum(1 for r in self.requests if r.status == 'PENDING'),
+                approved_requests=len(approved),
+                revoked_requests=len(self.revoked),
+                approved_users=len({r.user_id for r in approved}),
+                approved_consent_types=len({r.consent_id for r in approved}),
+                oldest_approved_at=min((r.requested_at for r in approved), default=None),
+                approved_breadth_histogram=breadth_histogram(Counter(Counter(r.user_id for r in approved).values())),
+            )
+        stored = get_counters(self.organization)
+        self.rows_fetched += 1
+        return RequestCounters(*(getattr(stored, field) for field in RequestCounters._fields))
+
+    @cached_property
+    def request_rate(self):
+        """Request rate detector state, from the stored state unless there is no organization to read it for"""
+        if self.organization is None or self.organization.pk is None:
+            return replay(sorted(r.requested_at for r in self.requests))
+        self.rows_fetched += 1
+        return get_rate_state(self.organization.pk)
+
+    # -------------------- Derived Views --------------------
+
+    @cached_property
+    def approved(self) -> list:
+        return [r for r in self.requests if r.status == 'APPROVED']
+
+    @cached_property
+    def revoked(self) -> list:
+        return [r for r in self.requests if r.status == 'REVOKED']
+
+    @cached_property
+    def unconsented(self) -> list:
+        """Approved requests with no active user consent"""
+        return [r for r in self.approved if not r.has_active_consent]
+
+    def iter_requests(self, status: str = None):
+        """Iterate request rows, optionally of one status, streaming them when the context streams"""
+        if self._queryset is None:
+            rows = self.approved if status == 'APPROVED' else self.requests
+            for row in rows:
+                if status is None or row.status == status:
+                    yield row
+            return
+        queryset = self._queryset if status is None else self._queryset.filter(status=status)
+        for row in queryset.iterator(chunk_size=self.STREAM_CHUNK_SIZE):
+            self.rows_fetched += 1
+            yield AccessRequestRow._make(row)
+
+    def iter_unconsented(self):
+        """Approved requests with no active user consent"""
+        for row in self.iter_requests('APPROVED'):
+            if not row.has_active_consent:
+                yield row
+
+    def approved_before(self, days: int) -> list:
+        cutoff = self.now - timedelta(days=days)
+        return [r for r in self.approved if r.requested_at < cutoff]
+
+    def approved_before_count(self, days: int) -> int:
+        """Approved requests older than days; skips the count when the oldest approval is recent"""
+        cutoff = self.now - timedelta(days=days)
+        oldest = self.counters.oldest_approved_at
+        if oldest is None or oldest >= cutoff:
+            return 0
+        if self.rows_loaded:
+            return len(self.approved_before(days))
+        return AccessRequest.objects.filter(
+            organization=self.organization,
+            status='APPROVED',
+            requested_at__lt=cutoff,
+        ).count()
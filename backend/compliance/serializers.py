@@ -1,5 +1,8 @@
 from rest_framework import serializers
-from .models import ComplianceAudit, ViolationReport
+from .models import (
+    ComplianceAudit, ViolationReport, ComplianceScanJob, ComplianceScan,
+    ComplianceAuditArchive, ViolationReportArchive
+)
 
 
 # For saved objects (DB model instances)
@@ -32,6 +35,25 @@ class ViolationReportSerializer(serializers.ModelSerializer):
         read_only_fields = ['detected_at']
 
 
+# Archived rows serialize with the same fields as their hot tables
+class ComplianceAuditArchiveSerializer(ComplianceAuditSerializer):
+    archived = serializers.BooleanField(read_only=True)
+
+    class Meta(ComplianceAuditSerializer.Meta):
+        model = ComplianceAuditArchive
+        fields = ComplianceAuditSerializer.Meta.fields + ['archived']
+
+
+class ViolationReportArchiveSerializer(ViolationReportSerializer):
+    related_audit = serializers.IntegerField(source='related_audit_id', read_only=True)
+    related_audit_name = serializers.CharField(read_only=True)
+    archived = serializers.BooleanField(read_only=True)
+
+    class Meta(ViolationReportSerializer.Meta):
+        model = ViolationReportArchive
+        fields = ViolationReportSerializer.Meta.fields + ['archived']
+
+
 # For compliance scan results (possibly unsaved dicts)
 class ComplianceScanResultSerializer(serializers.Serializer):
     risk_score = serializers.IntegerField()
@@ -39,14 +61,34 @@ class ComplianceScanResultSerializer(serializers.Serializer):
     critical_count = serializers.IntegerField()
     high_count = serializers.IntegerField()
     medium_count = serializers.IntegerField()
-    
-    # Use plain Serializer for dicts to avoid KeyError
-    violations = serializers.ListField(
-        child=serializers.DictField(),  # expects a list of dicts, not model instances
-        read_only=True
-    )
-    
-    audit_records = serializers.ListField(
-        child=serializers.DictField(),
-        read_only=True
-    )
+    evaluated_rules = serializers.ListField(child=serializers.CharField(), required=False)
+    carried_forward_rules = serializers.ListField(child=serializers.CharField(), required=False)
+    profile = serializers.DictField(required=False)
+    diff = serializers.DictField(required=False)
+
+
+class ComplianceScanSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ComplianceScan
+        fields = [
+            'id', 'incremental', 'created_at', 'risk_score', 'total_violations',
+            'new_count', 'persisting_count', 'resolved_count'
+        ]
+        read_only_fields = fields
+
+
+class ComplianceScanJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ComplianceScanJob
+        fields = [
+            'id', 'organization', 'status', 'incremental', 'profile', 'created_at',
+            'started_at', 'finished_at', 'result', 'error'
+        ]
+        read_only_fields = fields
+
+
+# For pre-flight checks of access requests that have not been filed
+class PreflightRequestSerializer(serializers.Serializer):
+    user_id = serializers.UUIDField()
+    consent_id = serializers.IntegerField()
+    purpose = serializers.CharField(max_length=40, allow_blank=True, required=False, default='')
@@ -1,11 +1,32 @@
 """
 Tests for compliance module
 """
-from django.test import TestCase
+import json
+import os
+import tempfile
+import uuid
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
 from django.contrib.auth import get_user_model
-from organization.models import Org
-from compliance.models import ComplianceAudit, ViolationReport
+from organization.models import Org, AccessRequest, AccessRequestStatusHistory
+from consents.models import Consent, UserConsent, ConsentHistory
+from compliance.models import (
+    ComplianceAudit, ViolationReport, ComplianceRuleWatermark, ComplianceScanJob, ComplianceScan,
+    ComplianceAuditArchive, ViolationReportArchive
+)
 from compliance.rules_engine import NDPRRulesEngine
+from compliance.scan_context import ScanContext, AccessRequestRow
+from compliance.benchmarks import seed_organization
+from compliance.backtest import backtest
+from compliance.archive import archive_cutoff, archive_records
+from compliance.management.commands import compliance_sweep as sweep_command
+from organization.versioning import get_data_version
 
 User = get_user_model()
 
@@ -112,3 +133,1089 @@ class ComplianceModelsTestCase(TestCase):
         self.assertFalse(violation.resolved)
 
 
+
+
+class ConsentValidityRulesTestCase(TestCase):
+    """Test set-based consent validity and revocation rules"""
+
+    def setUp(self):
+        """Set up an organization with approved requests"""
+        self.org_user = User.objects.create_user(
+            email='org@test.com',
+            password='testpass123',
+            user_role='ORGANIZATION'
+        )
+        self.org = Org.objects.create(
+            user=self.org_user,
+            name='Test Organization',
+            email='org@test.com',
+            address='123 Test St'
+        )
+        self.consent = Consent.objects.create(name='Email')
+
+    def _approved_request(self, email, granted):
+        citizen = User.objects.create_user(email=email, password='testpass123')
+        UserConsent.objects.create(user=citizen, consent=self.consent, access=granted)
+        return AccessRequest.objects.create(
+            organization=self.org,
+            user=citizen,
+            consent=self.consent,
+            status='APPROVED',
+            purpose='Account verification emails',
+        )
+
+    def test_revoked_consent_flagged_by_both_rules(self):
+        """Approved requests without active consent are flagged"""
+        revoked = self._approved_request('revoked@test.com', granted=False)
+        self._approved_request('granted@test.com', granted=True)
+
+        validity = list(NDPRRulesEngine.check_consent_validity(self.org))
+        revocation = list(NDPRRulesEngine.check_revocation_handling(self.org))
+
+        self.assertEqual([v['details']['access_request_id'] for v in validity], [revoked.id])
+        self.assertEqual([v['details']['access_request_id'] for v in revocation], [revoked.id])
+        self.assertEqual(validity[0]['details']['user_id'], revoked.user.id)
+        self.assertEqual(validity[0]['details']['consent_type'], 'Email')
+
+    def test_query_count_is_constant(self):
+        """The consent lookup does not issue a query per approved request"""
+        for i in range(5):
+            self._approved_request(f'citizen{i}@test.com', granted=i % 2 == 0)
+
+        # The request snapshot plus the request rate state
+        with self.assertNumQueries(2):
+            context = ScanContext.load(self.org)
+            NDPRRulesEngine.run_all_checks(self.org, context)
+        self.assertEqual(len(context.unconsented), 2)
+
+
+class ScanContextRulesTestCase(TestCase):
+    """Test rules against hand-built scan snapshots"""
+
+    def _row(self, pk, status='APPROVED', purpose='Customer onboarding checks',
+             user_id=1, consent_id=1, days_ago=0, has_active_consent=True):
+        return AccessRequestRow(
+            id=pk,
+            user_id=user_id,
+            consent_id=consent_id,
+            consent_name=f'Consent {consent_id}',
+            status=status,
+            purpose=purpose,
+            requested_at=self.now - timedelta(days=days_ago),
+            has_active_consent=has_active_consent,
+        )
+
+    def setUp(self):
+        self.now = timezone.now()
+
+    def test_purpose_limitation(self):
+        """Vague purposes are flagged"""
+        context = ScanContext(None, [self._row(1, purpose='general'), self._row(2)], now=self.now)
+        violations = list(NDPRRulesEngine.check_purpose_limitation(None, context))
+        self.assertEqual([v['details']['access_request_id'] for v in violations], [1])
+
+    def test_retention_and_access_control(self):
+        """Old approvals and many revocations are flagged"""
+        rows = [self._row(1, days_ago=400), self._row(2, days_ago=10)]
+        rows += [self._row(100 + i, status='REVOKED') for i in range(11)]
+        context = ScanContext(None, rows, now=self.now)
+
+        retention = NDPRRulesEngine.check_retention_policy(None, context)
+        self.assertEqual(retention[0]['details']['old_requests_count'], 1)
+        access = NDPRRulesEngine.check_access_control(None, context)
+        self.assertEqual(access[0]['details']['revoked_count'], 11)
+
+    def test_run_all_checks_on_snapshot(self):
+        """A snapshot is evaluated without touching the database"""
+        context = ScanContext(None, [self._row(1, has_active_consent=False)], now=self.now)
+        with self.assertNumQueries(0):
+            result = NDPRRulesEngine.run_all_checks(None, context)
+        self.assertEqual(
+            sorted(v['rule'] for v in result['violations']),
+            ['CONSENT_VALIDITY', 'REVOCATION_HANDLING'],
+        )
+        self.assertEqual(result['risk_score'], 35)
+
+
+class IncrementalScanTestCase(TestCase):
+    """Test watermark-based incremental scans"""
+
+    def setUp(self):
+        """Set up an organization with one approved request"""
+        self.org_user = User.objects.create_user(
+            email='org@test.com',
+            password='testpass123',
+            user_role='ORGANIZATION'
+        )
+        self.org = Org.objects.create(
+            user=self.org_user,
+            name='Test Organization',
+            email='org@test.com',
+            address='123 Test St'
+        )
+        self.consent = Consent.objects.create(name='Email')
+        self.citizen = User.objects.create_user(email='citizen@test.com', password='testpass123')
+        self.user_consent = UserConsent.objects.create(user=self.citizen, consent=self.consent, access=True)
+        AccessRequest.objects.create(
+            organization=self.org,
+            user=self.citizen,
+            consent=self.consent,
+            status='APPROVED',
+            purpose='general',
+        )
+
+    def test_quiet_organization_carries_findings_forward(self):
+        """Nothing is re-evaluated when no inputs changed"""
+        first = NDPRRulesEngine.run_incremental_checks(self.org)
+        self.assertEqual(first['evaluated_rules'], list(NDPRRulesEngine.RULES))
+
+        with self.assertNumQueries(3):
+            second = NDPRRulesEngine.run_incremental_checks(self.org)
+        self.assertEqual(second['evaluated_rules'], [])
+        self.assertEqual(second['violations'], first['violations'])
+        self.assertEqual(second['risk_score'], first['risk_score'])
+
+    def test_consent_toggle_reevaluates_consent_rules(self):
+        """Only rules reading user consents rerun after a consent toggle"""
+        AccessRequest.objects.update(updated_at=timezone.now() - timedelta(minutes=10))
+        NDPRRulesEngine.run_incremental_checks(self.org)
+        self.user_consent.access = False
+        self.user_consent.save()
+
+        result = NDPRRulesEngine.run_incremental_checks(self.org)
+        self.assertEqual(result['evaluated_rules'], ['CONSENT_VALIDITY', 'REVOCATION_HANDLING'])
+        self.assertEqual(
+            sorted(v['rule'] for v in result['violations']),
+            ['CONSENT_VALIDITY', 'PURPOSE_LIMITATION', 'REVOCATION_HANDLING'],
+        )
+
+    def test_sibling_revocation_reevaluates_consent_rules(self):
+        """Consents revoked by UserConsent.save's bulk update are detected without consent history"""
+        AccessRequest.objects.update(updated_at=timezone.now() - timedelta(minutes=10))
+        NDPRRulesEngine.run_incremental_checks(self.org)
+        replacement = UserConsent.objects.create(user=self.citizen, consent=self.consent, access=True)
+        ConsentHistory.objects.all().delete()
+        self.user_consent.refresh_from_db()
+        self.assertFalse(self.user_consent.access)
+
+        result = NDPRRulesEngine.run_incremental_checks(self.org)
+        self.assertEqual(result['evaluated_rules'], ['CONSENT_VALIDITY', 'REVOCATION_HANDLING'])
+
+        replacement.delete()
+        result = NDPRRulesEngine.run_incremental_checks(self.org)
+        self.assertEqual(result['evaluated_rules'], ['CONSENT_VALIDITY', 'REVOCATION_HANDLING'])
+        self.assertIn('CONSENT_VALIDITY', [v['rule'] for v in result['violations']])
+
+    def test_new_access_request_reevaluates_request_rules(self):
+        """Rules reading access requests rerun after a new request"""
+        NDPRRulesEngine.run_incremental_checks(self.org)
+        other = Consent.objects.create(name='Phone')
+        AccessRequest.objects.create(
+            organization=self.org,
+            user=self.citizen,
+            consent=other,
+            purpose='Two-factor authentication codes',
+        )
+
+        result = NDPRRulesEngine.run_incremental_checks(self.org)
+        self.assertEqual(result['evaluated_rules'], list(NDPRRulesEngine.RULES))
+
+
+class ComplianceSweepCommandTestCase(TestCase):
+    """Test the platform-wide compliance sweep command"""
+
+    def setUp(self):
+        """Set up two organizations"""
+        self.orgs = []
+        for i in range(2):
+            org_user = User.objects.create_user(
+                email=f'org{i}@test.com',
+                password='testpass123',
+                user_role='ORGANIZATION'
+            )
+            self.orgs.append(Org.objects.create(
+                user=org_user,
+                name=f'Test Organization {i}',
+                email=f'org{i}@test.com',
+                address='123 Test St'
+            ))
+        self.checkpoint = os.path.join(tempfile.mkdtemp(), 'sweep.json')
+
+    def test_sweep_scans_all_organizations(self):
+        """Every organization is scanned and a clean sweep leaves no checkpoint"""
+        out = StringIO()
+        call_command('compliance_sweep', workers=1, checkpoint=self.checkpoint, stdout=out)
+
+        self.assertIn('Scanned 2 organizations (0 failed)', out.getvalue())
+        self.assertIn('p95', out.getvalue())
+        self.assertFalse(os.path.exists(self.checkpoint))
+        self.assertEqual(ComplianceRuleWatermark.objects.values('organization').distinct().count(), 2)
+
+    def test_resume_skips_completed_organizations(self):
+        """Organizations recorded in the checkpoint are skipped on resume"""
+        with open(self.checkpoint, 'w') as f:
+            json.dump({'completed': [self.orgs[0].id]}, f)
+
+        out = StringIO()
+        call_command('compliance_sweep', workers=1, checkpoint=self.checkpoint, resume=True, stdout=out)
+
+        self.assertIn('Scanned 1 organizations', out.getvalue())
+        self.assertFalse(ComplianceRuleWatermark.objects.filter(organization=self.orgs[0]).exists())
+
+    def test_resume_after_a_finished_sweep_scans_everything(self):
+        """Nightly --resume runs each scan every organization once the previous sweep finished"""
+        for _ in range(2):
+            out = StringIO()
+            call_command('compliance_sweep', workers=1, checkpoint=self.checkpoint, resume=True, stdout=out)
+            self.assertIn('Scanned 2 organizations (0 failed)', out.getvalue())
+        self.assertEqual(ComplianceScan.objects.count(), 4)
+
+    def test_failed_sweep_keeps_checkpoint_for_resume(self):
+        """Organizations that failed are retried on resume; completed ones are skipped"""
+        failing = {'org_id': self.orgs[1].id, 'elapsed': 0, 'violations': 0, 'error': 'boom'}
+        original = sweep_command.scan_organization
+        with mock.patch.object(sweep_command, 'scan_organization',
+                               side_effect=lambda pk, inc: failing if pk == self.orgs[1].id else original(pk, inc)):
+            call_command('compliance_sweep', workers=1, checkpoint=self.checkpoint, stdout=StringIO(), stderr=StringIO())
+        with open(self.checkpoint) as f:
+            self.assertEqual(json.load(f)['completed'], [self.orgs[0].id])
+
+        out = StringIO()
+        call_command('compliance_sweep', workers=1, checkpoint=self.checkpoint, resume=True, stdout=out)
+        self.assertIn('Scanned 1 organizations (0 failed)', out.getvalue())
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+
+class AuditPersistenceTestCase(TestCase):
+    """Test fingerprint-keyed bulk persistence of scan findings"""
+
+    def setUp(self):
+        """Set up an organization with two revoked-consent approvals"""
+        self.org_user = User.objects.create_user(
+            email='org@test.com',
+            password='testpass123',
+            user_role='ORGANIZATION'
+        )
+        self.org = Org.objects.create(
+            user=self.org_user,
+            name='Test Organization',
+            email='org@test.com',
+            address='123 Test St'
+        )
+        self.consent = Consent.objects.create(name='Email')
+        self.requests = []
+        for i in range(2):
+            citizen = User.objects.create_user(email=f'citizen{i}@test.com', password='testpass123')
+            UserConsent.objects.create(user=citizen, consent=self.consent, access=False)
+            self.requests.append(AccessRequest.objects.create(
+                organization=self.org,
+                user=citizen,
+                consent=self.consent,
+                status='APPROVED',
+                purpose='Account verification emails',
+            ))
+
+    def _scan(self):
+        scan_result = NDPRRulesEngine.run_all_checks(self.org)
+        return NDPRRulesEngine.create_audit_records(self.org, scan_result)
+
+    def test_each_violation_gets_its_own_audit(self):
+        """Violations of the same rule no longer collapse into one row"""
+        audits = self._scan()
+        self.assertEqual(len(audits), 4)
+        self.assertEqual(len({a.fingerprint for a in audits}), 4)
+        self.assertEqual(ViolationReport.objects.filter(organization=self.org).count(), 4)
+
+    def test_rescan_touches_existing_audits(self):
+        """Repeated scans do not duplicate audits"""
+        first = self._scan()
+        # Snapshot, request rate state, the organization lock (inside a
+        # savepoint pair), open fingerprints, the scan row and the returned
+        # audits; persisting audits are not rewritten
+        with self.assertNumQueries(8):
+            second = self._scan()
+        self.assertEqual([a.id for a in first], [a.id for a in second])
+        self.assertEqual(ComplianceAudit.objects.filter(organization=self.org).count(), 4)
+
+    def test_vanished_violations_are_resolved(self):
+        """Findings no longer detected are resolved with their reports"""
+        self._scan()
+        self.requests[0].status = 'REVOKED'
+        self.requests[0].save()
+
+        audits = self._scan()
+        self.assertEqual(len(audits), 2)
+        resolved = ComplianceAudit.objects.filter(organization=self.org, status='RESOLVED')
+        self.assertEqual(resolved.count(), 2)
+        self.assertTrue(all(a.details['access_request_id'] == self.requests[0].id for a in resolved))
+        self.assertEqual(ViolationReport.objects.filter(organization=self.org, resolved=True).count(), 2)
+
+    def test_failed_scan_leaves_nothing_behind(self):
+        """A scan that fails before its scan row is written resolves and inserts nothing"""
+        self._scan()
+        self.requests[0].status = 'REVOKED'
+        self.requests[0].save()
+        scan_result = NDPRRulesEngine.run_all_checks(self.org)
+
+        with mock.patch.object(ComplianceScan.objects, 'create', side_effect=RuntimeError('disk full')):
+            with self.assertRaises(RuntimeError):
+                NDPRRulesEngine.record_scan(self.org, scan_result)
+        self.assertFalse(ComplianceAudit.objects.filter(organization=self.org, status='RESOLVED').exists())
+        self.assertEqual(ComplianceScan.objects.filter(organization=self.org).count(), 1)
+
+
+class ComplianceScanJobTestCase(TestCase):
+    """Test asynchronous compliance scan jobs"""
+
+    def setUp(self):
+        """Set up an authenticated organization client"""
+        self.org_user = User.objects.create_user(
+            email='org@test.com',
+            password='testpass123',
+            user_role='ORGANIZATION'
+        )
+        self.org = Org.objects.create(
+            user=self.org_user,
+            name='Test Organization',
+            email='org@test.com',
+            address='123 Test St'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.org_user)
+
+    def test_concurrent_requests_attach_to_in_flight_job(self):
+        """A second enqueue returns the queued job instead of a duplicate"""
+        first = self.client.post('/api/compliance/scan/jobs/')
+        second = self.client.post('/api/compliance/scan/jobs/')
+
+        self.assertEqual(first.status_code, 202)
+        self.assertEqual(first.data['data']['id'], second.data['data']['id'])
+        self.assertEqual(ComplianceScanJob.objects.count(), 1)
+
+    def test_worker_completes_job(self):
+        """The worker runs queued jobs and the result can be polled"""
+        job_id = self.client.post('/api/compliance/scan/jobs/').data['data']['id']
+        call_command('run_scan_worker', once=True, stdout=StringIO())
+
+        response = self.client.get(f'/api/compliance/scan/jobs/{job_id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'COMPLETED')
+        self.assertEqual(response.data['result']['risk_score'], 0)
+        # The result is a summary; audits are paged through the scan diff and reports
+        self.assertNotIn('audits', response.data['result'])
+        self.assertNotIn('violations', response.data['result'])
+        scan = ComplianceScan.objects.get(organization=self.org)
+        self.assertEqual(response.data['result']['diff']['id'], scan.id)
+
+        # A finished job no longer blocks new scans
+        self.client.post('/api/compliance/scan/jobs/')
+        self.assertEqual(ComplianceScanJob.objects.count(), 2)
+
+    def test_profile_flag_is_stored_on_queued_jobs(self):
+        """?profile=1 on jobs/ is kept for the worker, as on scan/"""
+        response = self.client.post('/api/compliance/scan/jobs/?profile=1')
+        self.assertTrue(response.data['data']['profile'])
+        self.assertTrue(ComplianceScanJob.objects.get(pk=response.data['data']['id']).profile)
+
+    def test_unknown_or_foreign_job_is_not_found(self):
+        """Job ids that do not exist or belong to another organization return 404"""
+        other_user = User.objects.create_user(email='other@test.com', password='testpass123', user_role='ORGANIZATION')
+        other = Org.objects.create(user=other_user, name='Other Organization', email='other@test.com', address='1 Other St')
+        job = ComplianceScanJob.objects.create(organization=other)
+
+        self.assertEqual(self.client.get(f'/api/compliance/scan/jobs/{job.id}/').status_code, 404)
+        self.assertEqual(self.client.get(f'/api/compliance/scan/jobs/{uuid.uuid4()}/').status_code, 404)
+
+    def test_scan_endpoint_queues_instead_of_running(self):
+        """POST scan/ only enqueues; the worker runs the scan"""
+        response = self.client.post('/api/compliance/scan/')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['data']['status'], 'QUEUED')
+        self.assertFalse(ComplianceScan.objects.exists())
+
+        call_command('run_scan_worker', once=True, stdout=StringIO())
+        self.assertEqual(ComplianceScan.objects.count(), 1)
+
+    @override_settings(COMPLIANCE_SCAN_JOBS_EAGER=True)
+    def test_eager_mode_runs_in_process(self):
+        """Eager mode completes the job before responding"""
+        response = self.client.post('/api/compliance/scan/jobs/')
+        self.assertEqual(response.data['data']['status'], 'COMPLETED')
+
+
+class ComplianceResultCacheTestCase(TestCase):
+    """Test version-keyed caching of compliance results"""
+
+    def setUp(self):
+        """Set up an authenticated organization client"""
+        cache.clear()
+        self.org_user = User.objects.create_user(
+            email='org@test.com',
+            password='testpass123',
+            user_role='ORGANIZATION'
+        )
+        self.org = Org.objects.create(
+            user=self.org_user,
+            name='Test Organization',
+            email='org@test.com',
+            address='123 Test St'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.org_user)
+
+    def test_dashboard_is_served_from_cache_until_data_changes(self):
+        """Repeated dashboard loads hit the cache; an audit change invalidates it"""
+        first = self.client.get('/api/compliance/scan/')
+        with self.assertNumQueries(2):
+            second = self.client.get('/api/compliance/scan/')
+        self.assertEqual(first.data, second.data)
+
+        ComplianceAudit.objects.create(
+            organization=self.org,
+            rule_name='Access Control',
+            rule_description='Test',
+            severity='CRITICAL',
+        )
+        third = self.client.get('/api/compliance/scan/')
+        self.assertEqual(third.data['total_violations'], 1)
+
+    def test_persisting_findings_bumps_version(self):
+        """Bulk audit persistence invalidates cached results"""
+        before = get_data_version(self.org.id)
+        NDPRRulesEngine.create_audit_records(self.org, {'violations': [{'rule': 'ACCESS_CONTROL', 'details': {}}]})
+        self.assertEqual(get_data_version(self.org.id), before + 1)
+
+
+class BenchmarkSuiteTestCase(TestCase):
+    """Test the engine benchmark harness at a tiny size"""
+
+    def test_seed_and_measure(self):
+        """Seeding creates the requested rows and every entry point is measured"""
+        organization = seed_organization(25, consent_types=4)
+        self.assertEqual(AccessRequest.objects.filter(organization=organization).count(), 25)
+        self.assertEqual(UserConsent.objects.filter(user__access_requests__organization=organization).distinct().count(), 25)
+
+        output = os.path.join(tempfile.mkdtemp(), 'benchmark.json')
+        call_command('benchmark_engines', sizes=[20], output=output, stdout=StringIO())
+        with open(output) as f:
+            report = json.load(f)
+        self.assertEqual(len(report['results']), 3)
+        for result in report['results']:
+            self.assertEqual(result['size'], 20)
+            self.assertGreater(result['queries'], 0)
+        # Seeded data is rolled back unless --keep is given
+        self.assertEqual(AccessRequest.objects.count(), 25)
+
+
+class ComplianceDashboardTestCase(TestCase):
+    """Test the aggregated compliance dashboard summary"""
+
+    def setUp(self):
+        """Set up an organization with pending and resolved audits"""
+        cache.clear()
+        self.org_user = User.objects.create_user(
+            email='org@test.com',
+            password='testpass123',
+            user_role='ORGANIZATION'
+        )
+        self.org = Org.objects.create(
+            user=self.org_user,
+            name='Test Organization',
+            email='org@test.com',
+            address='123 Test St'
+        )
+        for severity, status in [('CRITICAL', 'PENDING'), ('HIGH', 'PENDING'), ('HIGH', 'PENDING'),
+                                 ('MEDIUM', 'PENDING'), ('CRITICAL', 'RESOLVED')]:
+            ComplianceAudit.objects.create(
+                organization=self.org,
+                rule_name='Consent Revocation Handling',
+                rule_description='Test',
+                severity=severity,
+                status=status,
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.org_user)
+
+    def test_summary_uses_audit_severity(self):
+        """Counts and risk score come from pending audits by severity"""
+        with self.assertNumQueries(5):
+            response = self.client.get('/api/compliance/scan/')
+
+        self.assertEqual(response.data['total_violations'], 4)
+        self.assertEqual(response.data['critical_count'], 1)
+        self.assertEqual(response.data['high_count'], 2)
+        self.assertEqual(response.data['medium_count'], 1)
+        # CRITICAL 20 + 2 x HIGH 15 + MEDIUM 10
+        self.assertEqual(response.data['risk_score'], 60)
+        self.assertEqual(len(response.data['audits']), 5)
+
+
+class ComplianceReportsPaginationTestCase(TestCase):
+    """Test keyset pagination of the compliance reports endpoint"""
+
+    def setUp(self):
+        """Set up an organization with several audits"""
+        self.org_user = User.objects.create_user(
+            email='org@test.com',
+            password='testpass123',
+            user_role='ORGANIZATION'
+        )
+        self.org = Org.objects.create(
+            user=self.org_user,
+            name='Test Organization',
+            email='org@test.com',
+            address='123 Test St'
+        )
+        for i in range(5):
+            audit = ComplianceAudit.objects.create(
+                organization=self.org,
+                rule_name='Consent Validity Check',
+                rule_description='Test',
+                severity='HIGH' if i % 2 else 'MEDIUM',
+                status='RESOLVED' if i == 0 else 'PENDING',
+            )
+            ViolationReport.objects.create(
+                organization=self.org,
+                violation_type='CONSENT_VALIDITY',
+                description='Test violation',
+                related_audit=audit,
+                resolved=i == 0,
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.org_user)
+
+    def test_cursor_walks_every_row_once(self):
+        """Following cursors returns each audit exactly once"""
+        seen = []
+        cursor = None
+        while True:
+            params = {'page_size': 2}
+            if cursor:
+                params['audit_cursor'] = cursor
+            response = self.client.get('/api/compliance/reports/', params)
+            seen.extend(a['id'] for a in response.data['audits'])
+            cursor = response.data['next_audit_cursor']
+            if not cursor:
+                break
+        self.assertEqual(sorted(seen), sorted(ComplianceAudit.objects.values_list('id', flat=True)))
+        self.assertEqual(len(seen), 5)
+
+    def test_filters_and_statistics(self):
+        """Filters narrow the lists while statistics cover the whole window"""
+        # Organization, archive check, two statistics aggregates, two pages
+        with self.assertNumQueries(6):
+            response = self.client.get('/api/compliance/reports/', {'severity': 'high', 'resolved': 'false'})
+        self.assertEqual({a['severity'] for a in response.data['audits']}, {'HIGH'})
+        self.assertEqual(len(response.data['violations']), 4)
+        self.assertEqual(response.data['statistics'], {
+            'total_audits': 5,
+            'pending_audits': 4,
+            'resolved_audits': 1,
+            'unresolved_violations': 4,
+        })
+
+    def test_invalid_cursor(self):
+        """A malformed cursor is rejected"""
+        response = self.client.get('/api/compliance/reports/', {'audit_cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+
+class CompliancePreflightTestCase(TestCase):
+    """Test dry-run compliance checks for proposed access requests"""
+
+    def setUp(self):
+        """Set up an organization and citizens with granted consents"""
+        cache.clear()
+        self.org_user = User.objects.create_user(
+            email='org@test.com',
+            password='testpass123',
+            user_role='ORGANIZATION'
+        )
+        self.org = Org.objects.create(
+            user=self.org_user,
+            name='Test Organization',
+            email='org@test.com',
+            address='123 Test St'
+        )
+        self.consents = [Consent.objects.create(name=f'Consent {i}') for i in range(5)]
+        self.citizen = User.objects.create_user(email='citizen@test.com', password='testpass123')
+        for consent in self.consents:
+            UserConsent.objects.create(user=self.citizen, consent=consent, access=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.org_user)
+
+    def _proposal(self, consent, purpose='Identity verification for onboarding'):
+        return {'user_id': str(self.citizen.id), 'consent_id': consent.id, 'purpose': purpose}
+
+    def test_single_request_predicts_purpose_violation(self):
+        """A vague purpose is flagged and nothing is written"""
+        response = self.client.post('/api/compliance/preflight/', self._proposal(self.consents[0], 'general'), format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data['allowed'])
+        self.assertEqual([v['rule'] for v in response.data['violations']], ['PURPOSE_LIMITATION'])
+        self.assertFalse(AccessRequest.objects.exists())
+        self.assertFalse(ComplianceAudit.objects.exists())
+
+    def test_batch_predicts_data_minimization_and_excessive_requests(self):
+        """Batches are evaluated cumulatively in a fixed number of queries"""
+        payload = {'requests': [self._proposal(consent) for consent in self.consents]}
+        with self.assertNumQueries(8):
+            response = self.client.post('/api/compliance/preflight/', payload, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(all(r['allowed'] for r in response.data['requests']))
+        self.assertEqual(response.data['organization_violations'][0]['rule'], 'DATA_MINIMIZATION')
+        self.assertEqual(response.data['projected']['consent_breadth']['consent_breadth_histogram'], {'5': 1})
+        self.assertEqual(response.data['projected']['short_term_rate'], 5.0)
+
+        with mock.patch('organization.request_rate.BURST_MIN_RATE', 4):
+            response = self.client.post('/api/compliance/preflight/', payload, format='json')
+        flagged = [r['index'] for r in response.data['requests'] if not r['allowed']]
+        self.assertEqual(flagged, [3, 4])
+
+    def test_missing_consent_and_invalid_payload(self):
+        """Unconsented requests are flagged and malformed batches rejected"""
+        other = Consent.objects.create(name='Biometrics')
+        response = self.client.post('/api/compliance/preflight/', self._proposal(other), format='json')
+        self.assertEqual([v['rule'] for v in response.data['violations']], ['CONSENT_VALIDITY'])
+
+        response = self.client.post('/api/compliance/preflight/', {'requests': []}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(COMPLIANCE_SCAN_JOBS_EAGER=True)
+class RuleProfilingTestCase(TestCase):
+    """Test the rule registry and per-rule scan profiling"""
+
+    def setUp(self):
+        """Set up an organization with a vague-purpose request"""
+        cache.clear()
+        self.org_user = User.objects.create_user(
+            email='org@test.com',
+            password='testpass123',
+            user_role='ORGANIZATION'
+        )
+        self.org = Org.objects.create(
+            user=self.org_user,
+            name='Test Organization',
+            email='org@test.com',
+            address='123 Test St'
+        )
+        citizen = User.objects.create_user(email='citizen@test.com', password='testpass123')
+        consent = Consent.objects.create(name='Email')
+        UserConsent.objects.create(user=citizen, consent=consent, access=True)
+        AccessRequest.objects.create(organization=self.org, user=citizen, consent=consent, purpose='general')
+        self.client = APIClient()
+        self.client.force_authenticate(self.org_user)
+
+    def test_registry_declares_dependencies(self):
+        """Rules are registry objects that keep dict-style access"""
+        rule = NDPRRulesEngine.RULES['CONSENT_VALIDITY']
+        self.assertTrue(rule.reads('user_consents'))
+        self.assertEqual(rule['severity'], 'HIGH')
+        self.assertIn(NDPRRulesEngine.RULES['EXCESSIVE_REQUESTS'], NDPRRulesEngine.RULES.depending_on('clock'))
+
+    def test_scan_returns_profile_and_logs_it(self):
+        """?profile=1 adds a per-rule profile block and a structured log line"""
+        with self.assertLogs('compliance.profile', level='INFO') as logs:
+            response = self.client.post('/api/compliance/scan/?profile=1')
+
+        profile = response.data['data']['result']['profile']
+        self.assertEqual([r['rule'] for r in profile['rules']], list(NDPRRulesEngine.RULES))
+        for entry in profile['rules']:
+            self.assertEqual(set(entry), {'rule', 'queries', 'rows_touched', 'wall_time_ms'})
+        # The first rule that needs request rows pays for loading the snapshot
+        self.assertEqual(profile['rules'][0]['queries'], 1)
+        self.assertEqual(profile['rules'][0]['rows_touched'], 1)
+
+        logged = json.loads(logs.records[0].getMessage())
+        self.assertEqual(logged['event'], 'compliance_scan_profile')
+        self.assertEqual(logged['organization_id'], self.org.id)
+
+    def test_scan_without_profile_flag(self):
+        """Profiles are opt-in"""
+        response = self.client.post('/api/compliance/scan/')
+        self.assertNotIn('profile', response.data['data']['result'])
+
+
+class ViolationExportTestCase(TestCase):
+    """Test the streaming NDJSON violation export"""
+
+    def setUp(self):
+        """Set up an organization with unconsented and vague requests"""
+        cache.clear()
+        self.org_user = User.objects.create_user(
+            email='org@test.com',
+            password='testpass123',
+            user_role='ORGANIZATION'
+        )
+        self.org = Org.objects.create(
+            user=self.org_user,
+            name='Test Organization',
+            email='org@test.com',
+            address='123 Test St'
+        )
+        consent = Consent.objects.create(name='Email')
+        for i in range(6):
+            citizen = User.objects.create_user(email=f'citizen{i}@test.com', password='testpass123')
+            UserConsent.objects.create(user=citizen, consent=consent, access=i % 2 == 0)
+            AccessRequest.objects.create(
+                organization=self.org,
+                user=citizen,
+                consent=consent,
+                status='APPROVED',
+                purpose='general' if i < 2 else 'Identity verification for onboarding',
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.org_user)
+
+    def test_export_streams_every_violation(self):
+        """Each violation is one JSON line, followed by a summary line"""
+        response = self.client.get('/api/compliance/export/violations/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        expected = NDPRRulesEngine.run_all_checks(self.org)
+
+        summary = lines.pop()['summary']
+        self.assertEqual(len(lines), expected['total_violations'])
+        self.assertEqual(summary['total_violations'], expected['total_violations'])
+        self.assertEqual(summary['risk_score'], expected['risk_score'])
+        self.assertEqual({line['rule'] for line in lines}, {'CONSENT_VALIDITY', 'REVOCATION_HANDLING', 'PURPOSE_LIMITATION'})
+        self.assertFalse(ComplianceAudit.objects.exists())
+
+    def test_streaming_context_never_materializes_rows(self):
+        """Streaming rules read rows in chunks instead of loading the snapshot"""
+        context = ScanContext.stream(self.org)
+        with mock.patch.object(ScanContext, 'STREAM_CHUNK_SIZE', 2):
+            violations = list(NDPRRulesEngine.iter_violations(self.org, context))
+
+        self.assertEqual(len(violations), NDPRRulesEngine.run_all_checks(self.org)['total_violations'])
+        self.assertNotIn('requests', context.__dict__)
+
+
+class ComplianceArchiveTestCase(TestCase):
+    """Test archival of closed compliance records and archive-aware reports"""
+
+    def setUp(self):
+        """Set up an organization with old and recent audits"""
+        self.org_user = User.objects.create_user(
+            email='org@test.com',
+            password='testpass123',
+            user_role='ORGANIZATION'
+        )
+        self.org = Org.objects.create(
+            user=self.org_user,
+            name='Test Organization',
+            email='org@test.com',
+            address='123 Test St'
+        )
+        self.old_resolved = [self._audit('RESOLVED', days_ago=300 + i) for i in range(3)]
+        self.old_open = self._audit('PENDING', days_ago=300)
+        self.old_blocked = self._audit('RESOLVED', days_ago=300, report_resolved=False)
+        self.recent = self._audit('RESOLVED', days_ago=5)
+        self.client = APIClient()
+        self.client.force_authenticate(self.org_user)
+
+    def _audit(self, status, days_ago, report_resolved=True):
+        audit = ComplianceAudit.objects.create(
+            organization=self.org,
+            rule_name='Consent Validity Check',
+            rule_description='Test',
+            severity='HIGH',
+            status=status,
+        )
+        report = ViolationReport.objects.create(
+            organization=self.org,
+            violation_type='CONSENT_VIOLATION',
+            description='Test violation',
+            related_audit=audit,
+            resolved=report_resolved,
+        )
+        detected_at = timezone.now() - timedelta(days=days_ago)
+        ComplianceAudit.objects.filter(pk=audit.pk).update(detected_at=detected_at)
+        ViolationReport.objects.filter(pk=report.pk).update(detected_at=detected_at)
+        return audit
+
+    def test_archive_moves_only_closed_old_records(self):
+        """Resolved audits past the horizon move with their reports, in batches"""
+        out = StringIO()
+        call_command('archive_compliance_records', '--batch-size', '2', stdout=out)
+
+        # The open audit stays hot but its resolved report is archived on its own
+        self.assertIn('Archived 3 audit(s) and 4 violation report(s) in 3 batch(es)', out.getvalue())
+        archived_ids = set(ComplianceAuditArchive.objects.values_list('id', flat=True))
+        self.assertEqual(archived_ids, {audit.id for audit in self.old_resolved})
+        self.assertEqual(
+            set(ComplianceAudit.objects.values_list('id', flat=True)),
+            {self.old_open.id, self.old_blocked.id, self.recent.id},
+        )
+        archived_report = ViolationReportArchive.objects.get(related_audit_id=self.old_resolved[0].id)
+        self.assertEqual(archived_report.archive_month, archived_report.detected_at.date().replace(day=1))
+        self.assertEqual(archived_report.related_audit_name, 'Consent Validity Check')
+
+    def test_archive_bumps_version_once_per_batch(self):
+        """Archived rows are deleted without per-row signals; each batch bumps the organization once"""
+        before = get_data_version(self.org.id)
+        with mock.patch('organization.signals.bump_data_version') as per_row:
+            totals = archive_records(archive_cutoff(), batch_size=2)
+        per_row.assert_not_called()
+        self.assertEqual(totals['batches'], 3)
+        self.assertEqual(get_data_version(self.org.id), before + 3)
+
+        # The deferral ends with the archive batch; ordinary deletes bump again
+        self.recent.delete()
+        self.assertGreater(get_data_version(self.org.id), before + 3)
+
+    def test_reports_read_archive_only_for_long_windows(self):
+        """Short windows stay on the hot tables; long windows merge in the archive"""
+        call_command('archive_compliance_records', stdout=StringIO())
+
+        response = self.client.get('/api/compliance/reports/')
+        self.assertFalse(response.data['includes_archive'])
+        self.assertEqual([a['id'] for a in response.data['audits']], [self.recent.id])
+
+        seen = []
+        cursor = None
+        while True:
+            params = {'days': 365, 'page_size': 2}
+            if cursor:
+                params['audit_cursor'] = cursor
+            response = self.client.get('/api/compliance/reports/', params)
+            self.assertTrue(response.data['includes_archive'])
+            seen.extend((a['id'], a.get('archived', False)) for a in response.data['audits'])
+            cursor = response.data['next_audit_cursor']
+            if not cursor:
+                break
+        self.assertEqual(len(seen), 6)
+        self.assertEqual({pk for pk, archived in seen if archived}, {audit.id for audit in self.old_resolved})
+        self.assertEqual(response.data['statistics']['total_audits'], 6)
+
+
+    def test_reports_find_records_archived_with_a_shorter_horizon(self):
+        """A horizon override on the command never hides archived records from reports"""
+        short_lived = self._audit('RESOLVED', days_ago=20)
+        call_command('archive_compliance_records', '--horizon-days', '10', stdout=StringIO())
+        self.assertTrue(ComplianceAuditArchive.objects.filter(pk=short_lived.pk).exists())
+
+        response = self.client.get('/api/compliance/reports/', {'days': 30})
+        self.assertTrue(response.data['includes_archive'])
+        self.assertEqual(
+            {a['id'] for a in response.data['audits']},
+            {short_lived.id, self.recent.id},
+        )
+
+class ComplianceScanDiffTestCase(TestCase):
+    """Test scan diffs of new, persisting and resolved findings"""
+
+    def setUp(self):
+        """Set up an organization with two revoked-consent approvals"""
+        cache.clear()
+        self.org_user = User.objects.create_user(
+            email='org@test.com',
+            password='testpass123',
+            user_role='ORGANIZATION'
+        )
+        self.org = Org.objects.create(
+            user=self.org_user,
+            name='Test Organization',
+            email='org@test.com',
+            address='123 Test St'
+        )
+        self.consent = Consent.objects.create(name='Email')
+        self.requests = []
+        for i in range(2):
+            citizen = User.objects.create_user(email=f'citizen{i}@test.com', password='testpass123')
+            UserConsent.objects.create(user=citizen, consent=self.consent, access=False)
+            self.requests.append(AccessRequest.objects.create(
+                organization=self.org,
+                user=citizen,
+                consent=self.consent,
+                status='APPROVED',
+                purpose='Account verification emails',
+            ))
+        self.client = APIClient()
+        self.client.force_authenticate(self.org_user)
+
+    def _scan(self):
+        return NDPRRulesEngine.record_scan(self.org, NDPRRulesEngine.run_all_checks(self.org))
+
+    def test_scan_records_deltas_only(self):
+        """An unchanged rescan writes only its scan row"""
+        first = self._scan()
+        self.assertEqual((first.new_count, first.persisting_count, first.resolved_count), (4, 0, 0))
+
+        scan_result = NDPRRulesEngine.run_all_checks(self.org)
+        # Savepoint, organization lock, open fingerprints, scan row, release
+        with self.assertNumQueries(5):
+            second = NDPRRulesEngine.record_scan(self.org, scan_result)
+        self.assertEqual((second.new_count, second.persisting_count, second.resolved_count), (0, 4, 0))
+
+        self.requests[0].status = 'REVOKED'
+        self.requests[0].save()
+        third = self._scan()
+        self.assertEqual((third.new_count, third.persisting_count, third.resolved_count), (0, 2, 2))
+        self.assertEqual(
+            set(third.resolved_audit_ids),
+            set(ComplianceAudit.objects.filter(status='RESOLVED').values_list('id', flat=True)),
+        )
+
+    def test_diff_endpoint_returns_only_changes(self):
+        """The diff endpoint lists new audits and resolved ids, folding scans with since"""
+        first = self._scan()
+        response = self.client.get('/api/compliance/scan/diff/')
+        self.assertEqual(len(response.data['new']), 4)
+        self.assertEqual(response.data['resolved_audit_ids'], [])
+
+        self.requests[0].status = 'REVOKED'
+        self.requests[0].save()
+        self._scan()
+        response = self.client.get('/api/compliance/scan/diff/', {'since': first.id})
+        self.assertEqual(response.data['scans_included'], 1)
+        self.assertEqual(response.data['new'], [])
+        self.assertEqual(len(response.data['resolved_audit_ids']), 2)
+        self.assertEqual(response.data['persisting_count'], 2)
+
+        response = self.client.get(f'/api/compliance/scan/{first.id}/diff/')
+        self.assertEqual(response.data['scan']['id'], first.id)
+
+    def test_diff_rejects_unknown_and_malformed_scans(self):
+        """Unknown scan ids are 404s and a non-numeric since is a 400"""
+        first = self._scan()
+        self.assertEqual(self.client.get(f'/api/compliance/scan/{first.id + 100}/diff/').status_code, 404)
+        self.assertEqual(self.client.get('/api/compliance/scan/diff/', {'since': first.id + 100}).status_code, 404)
+        self.assertEqual(self.client.get('/api/compliance/scan/diff/', {'since': 'latest'}).status_code, 400)
+
+
+class ComplianceBacktestTestCase(TestCase):
+    """Test risk score backtesting from status and consent history"""
+
+    def setUp(self):
+        """Set up an approval granted ten days ago whose consent is revoked today"""
+        cache.clear()
+        self.org_user = User.objects.create_user(
+            email='org@test.com',
+            password='testpass123',
+            user_role='ORGANIZATION'
+        )
+        self.org = Org.objects.create(
+            user=self.org_user,
+            name='Test Organization',
+            email='org@test.com',
+            address='123 Test St'
+        )
+        self.consent = Consent.objects.create(name='Email')
+        citizen = User.objects.create_user(email='citizen@test.com', password='testpass123')
+        self.user_consent = UserConsent.objects.create(user=citizen, consent=self.consent, access=True)
+        self.request = AccessRequest.objects.create(
+            organization=self.org,
+            user=citizen,
+            consent=self.consent,
+            status='APPROVED',
+            purpose='Account verification emails',
+        )
+        past = timezone.now() - timedelta(days=10)
+        AccessRequest.objects.filter(pk=self.request.pk).update(requested_at=past)
+        AccessRequestStatusHistory.objects.filter(access_request=self.request).update(changed_at=past)
+        ConsentHistory.objects.filter(user_consent=self.user_consent).update(changed_at=past)
+        self.user_consent.access = False
+        self.user_consent.save()
+        self.client = APIClient()
+        self.client.force_authenticate(self.org_user)
+
+    def test_status_changes_are_recorded(self):
+        """Creating and updating a request appends status history"""
+        self.request.status = 'REVOKED'
+        self.request.save()
+        history = list(self.request.status_history.values_list('previous_status', 'new_status'))
+        self.assertEqual(history, [(None, 'APPROVED'), ('APPROVED', 'REVOKED')])
+
+    def test_series_tracks_consent_revocation(self):
+        """Days before the revocation are clean; today matches a live scan"""
+        today = timezone.localdate()
+        series = backtest(self.org, today - timedelta(days=12), today)
+
+        self.assertEqual(len(series), 13)
+        self.assertEqual(series[0]['date'], (today - timedelta(days=12)).isoformat())
+        self.assertTrue(all(point['total_violations'] == 0 for point in series[:-1]))
+        live = NDPRRulesEngine.run_all_checks(self.org)
+        self.assertEqual(series[-1]['risk_score'], live['risk_score'])
+        self.assertEqual(series[-1]['total_violations'], live['total_violations'])
+        self.assertEqual(series[-1]['total_violations'], 2)
+
+    def test_endpoint_validates_range(self):
+        """The endpoint returns a bounded daily series"""
+        today = timezone.localdate()
+        response = self.client.get('/api/compliance/backtest/', {
+            'start': (today - timedelta(days=6)).isoformat(),
+            'end': today.isoformat(),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['series']), 7)
+
+        response = self.client.get('/api/compliance/backtest/')
+        self.assertEqual(len(response.data['series']), 30)
+
+        response = self.client.get('/api/compliance/backtest/', {'start': '2020-01-01', 'end': '2024-01-01'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/compliance/backtest/', {'start': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ConsentBreadthTestCase(TestCase):
+    """Test data minimization on the per-user consent breadth distribution"""
+
+    def setUp(self):
+        """Set up an organization and four consent types"""
+        cache.clear()
+        self.org_user = User.objects.create_user(
+            email='org@test.com',
+            password='testpass123',
+            user_role='ORGANIZATION'
+        )
+        self.org = Org.objects.create(
+            user=self.org_user,
+            name='Test Organization',
+            email='org@test.com',
+            address='123 Test St'
+        )
+        self.consents = [Consent.objects.create(name=f'Consent {i}') for i in range(4)]
+
+    def _approve(self, citizen, consents):
+        for consent in consents:
+            AccessRequest.objects.create(
+                organization=self.org,
+                user=citizen,
+                consent=consent,
+                status='APPROVED',
+                purpose='Identity verification for onboarding',
+            )
+
+    def _citizens(self, count, prefix):
+        return [User.objects.create_user(email=f'{prefix}{i}@test.com', password='testpass123') for i in range(count)]
+
+    def test_uniformly_broad_access_is_flagged(self):
+        """Every user approved for every consent type is flagged even with many users"""
+        for citizen in self._citizens(5, 'broad'):
+            self._approve(citizen, self.consents)
+
+        violations = NDPRRulesEngine.check_data_minimization(self.org)
+        details = violations[0]['details']
+        self.assertEqual(details['p95_consents_per_user'], 4)
+        self.assertEqual(details['share_above_threshold'], 1.0)
+        self.assertEqual(details['consent_breadth_histogram'], {'4': 5})
+
+    def test_rare_broad_users_are_not_flagged(self):
+        """A few broad users in a narrow population stay under the p95 threshold"""
+        for citizen in self._citizens(19, 'narrow'):
+            self._approve(citizen, self.consents[:1])
+        self._approve(self._citizens(1, 'broad')[0], self.consents)
+
+        self.assertEqual(NDPRRulesEngine.check_data_minimization(self.org), [])
+        stored = ScanContext.load(self.org).counters.approved_breadth_histogram
+        context = ScanContext.load(self.org)
+        self.assertEqual(len(context.requests), 23)
+        self.assertEqual(context.counters.approved_breadth_histogram, stored)
+        self.assertEqual(stored, {'1': 19, '4': 1})
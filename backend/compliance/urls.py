@@ -1,8 +1,19 @@
 from django.urls import path
-from .views import ComplianceScanView, ComplianceReportsView, ComplianceAuditDetailView
+from .views import (
+    ComplianceScanView, ComplianceScanJobView, ComplianceScanJobDetailView,
+    ComplianceReportsView, ComplianceAuditDetailView, CompliancePreflightView,
+    ComplianceViolationExportView, ComplianceScanDiffView, ComplianceBacktestView,
+)
 
 urlpatterns = [
     path('scan/', ComplianceScanView.as_view(), name='compliance-scan'),
+    path('scan/diff/', ComplianceScanDiffView.as_view(), name='compliance-scan-diff'),
+    path('scan/<int:scan_id>/diff/', ComplianceScanDiffView.as_view(), name='compliance-scan-diff-detail'),
+    path('scan/jobs/', ComplianceScanJobView.as_view(), name='compliance-scan-jobs'),
+    path('scan/jobs/<uuid:job_id>/', ComplianceScanJobDetailView.as_view(), name='compliance-scan-job-detail'),
+    path('export/violations/', ComplianceViolationExportView.as_view(), name='compliance-violation-export'),
+    path('backtest/', ComplianceBacktestView.as_view(), name='compliance-backtest'),
+    path('preflight/', CompliancePreflightView.as_view(), name='compliance-preflight'),
     path('reports/', ComplianceReportsView.as_view(), name='compliance-reports'),
     path('reports/<int:org_id>/', ComplianceReportsView.as_view(), name='compliance-reports-org'),
     path('audit/<int:audit_id>/', ComplianceAuditDetailView.as_view(), name='compliance-audit-detail'),
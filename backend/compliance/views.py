@@ -2,78 +2,291 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.db.models import Count, Q
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from datetime import timedelta
 
 from organization.models import Org
 from organization.permissions import IsOrganization
 from .rules_engine import NDPRRulesEngine
-from .models import ComplianceAudit, ViolationReport
+from .models import (
+    ComplianceAudit, ViolationReport, ComplianceScanJob, ComplianceScan,
+    ComplianceAuditArchive, ViolationReportArchive
+)
+from .jobs import enqueue_scan
+from .cache import cached_for_version
+from .pagination import merged_keyset_page
+from .archive import window_reaches_archive
+from .preflight import preflight
+from .export import violation_lines
+from .backtest import backtest
 from .serializers import (
     ComplianceAuditSerializer,
     ViolationReportSerializer,
-    ComplianceScanResultSerializer
+    ComplianceScanJobSerializer,
+    ComplianceScanSerializer,
+    PreflightRequestSerializer,
+    ComplianceAuditArchiveSerializer,
+    ViolationReportArchiveSerializer
 )
 
+
+def wants_incremental(request) -> bool:
+    """Read the incremental flag from the request body or query string"""
+    value = request.data.get('incremental', request.query_params.get('incremental', ''))
+    return str(value).lower() in ('1', 'true', 'yes')
+
+
+def wants_profile(request) -> bool:
+    """Read the profile flag from the query string"""
+    return request.query_params.get('profile', '').lower() in ('1', 'true', 'yes')
+
+
 class ComplianceScanView(APIView):
     permission_classes = [IsAuthenticated, IsOrganization]
     DUPLICATE_WINDOW_DAYS = 30
 
     def post(self, request):
+        """Queue a scan; poll scan/jobs/<id>/ for its result"""
         try:
             organization = get_object_or_404(Org, user=request.user)
-            scan_result = NDPRRulesEngine.run_all_checks(organization)
-            audit_records = NDPRRulesEngine.create_audit_records(organization, scan_result)
-
-            audit_serializer = ComplianceAuditSerializer(audit_records, many=True)
-            violation_records = []
-            for audit in audit_records:
-                violation_records.extend(audit.violationreport_set.all())
-            violation_serializer = ViolationReportSerializer(violation_records, many=True)
-
-            result_data = {
-                'risk_score': scan_result.get('risk_score', 0),
-                'total_violations': scan_result.get('total_violations', len(violation_records)),
-                'critical_count': scan_result.get('critical_count', 0),
-                'high_count': scan_result.get('high_count', 0),
-                'medium_count': scan_result.get('medium_count', 0),
-                'audits': audit_serializer.data,
-                'violations': violation_serializer.data,
-            }
-
-            serializer = ComplianceScanResultSerializer(result_data)
-            return Response({'message': 'Compliance scan completed', 'data': serializer.data}, status=status.HTTP_200_OK)
+            # Incremental scans only re-evaluate rules whose inputs changed;
+            # full scans re-evaluate everything and refresh the watermarks.
+            job, created = enqueue_scan(
+                organization,
+                requested_by=request.user,
+                incremental=wants_incremental(request),
+                profile=wants_profile(request),
+            )
+            return Response({
+                'message': 'Compliance scan queued' if created else 'Compliance scan already in progress',
+                'data': ComplianceScanJobSerializer(job).data,
+            }, status=status.HTTP_202_ACCEPTED)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     def get(self, request):
         try:
             organization = get_object_or_404(Org, user=request.user)
-            window_start = timezone.now() - timedelta(days=self.DUPLICATE_WINDOW_DAYS)
-            audits = ComplianceAudit.objects.filter(organization=organization, detected_at__gte=window_start).order_by('-detected_at')
-            violations = ViolationReport.objects.filter(organization=organization, detected_at__gte=window_start).order_by('-detected_at')
+            summary = cached_for_version('dashboard', organization, lambda: self._dashboard_summary(organization))
+            return Response(summary, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def _dashboard_summary(self, organization):
+        window_start = timezone.now() - timedelta(days=self.DUPLICATE_WINDOW_DAYS)
+        audits = ComplianceAudit.objects.filter(organization=organization, detected_at__gte=window_start)
+        violations = ViolationReport.objects.filter(organization=organization, detected_at__gte=window_start)
+
+        # One grouped aggregate serves every count and the risk score
+        pending_by_severity = {}
+        for row in audits.values('severity', 'status').annotate(count=Count('id')).order_by():
+            if row['status'] == 'PENDING':
+                pending_by_severity[row['severity']] = row['count']
+
+        return {
+            'risk_score': NDPRRulesEngine.calculate_risk_score_from_counts(pending_by_severity),
+            'total_violations': sum(pending_by_severity.values()),
+            'critical_count': pending_by_severity.get('CRITICAL', 0),
+            'high_count': pending_by_severity.get('HIGH', 0),
+            'medium_count': pending_by_severity.get('MEDIUM', 0),
+            'audits': ComplianceAuditSerializer(
+                audits.select_related('organization').order_by('-detected_at')[:10], many=True
+            ).data,
+            'violations': ViolationReportSerializer(
+                violations.select_related('organization', 'related_audit').order_by('-detected_at')[:10], many=True
+            ).data,
+        }
+
+
+class ComplianceScanDiffView(APIView):
+    """
+    Findings that changed in a scan: new audits and the ids of audits resolved
+    since the scan before it. ?since=<scan id> folds every later scan into one delta.
+    """
+    permission_classes = [IsAuthenticated, IsOrganization]
+
+    def get(self, request, scan_id=None):
+        try:
+            organization = get_object_or_404(Org, user=request.user)
+            scans = ComplianceScan.objects.filter(organization=organization)
+            since = request.query_params.get('since')
+            if scan_id is not None:
+                changed = [get_object_or_404(scans, pk=scan_id)]
+            elif since is not None:
+                try:
+                    since_id = int(since)
+                except ValueError:
+                    return Response({'error': 'since must be a scan id'}, status=status.HTTP_400_BAD_REQUEST)
+                get_object_or_404(scans, pk=since_id)
+                changed = list(scans.filter(pk__gt=since_id).order_by('id'))
+            else:
+                latest = scans.first()
+                if latest is None:
+                    return Response({'error': 'No compliance scans yet'}, status=status.HTTP_404_NOT_FOUND)
+                changed = [latest]
 
-            pending_audits = audits.filter(status='PENDING')
-            risk_score = NDPRRulesEngine.calculate_risk_score([{'rule': a.rule_name, 'details': a.details} for a in pending_audits])
+            # Audits opened and resolved within the range cancel out
+            new_ids = set()
+            resolved_ids = set()
+            for scan in changed:
+                new_ids.update(scan.new_audit_ids)
+                for audit_id in scan.resolved_audit_ids:
+                    if audit_id in new_ids:
+                        new_ids.discard(audit_id)
+                    else:
+                        resolved_ids.add(audit_id)
 
+            new_audits = ComplianceAudit.objects.filter(
+                organization=organization,
+                pk__in=new_ids,
+            ).select_related('organization').order_by('-detected_at', 'id')
+            latest = changed[-1] if changed else None
             return Response({
-                'risk_score': risk_score,
-                'total_violations': pending_audits.count(),
-                'critical_count': pending_audits.filter(severity='CRITICAL').count(),
-                'high_count': pending_audits.filter(severity='HIGH').count(),
-                'medium_count': pending_audits.filter(severity='MEDIUM').count(),
-                'audits': ComplianceAuditSerializer(audits[:10], many=True).data,
-                'violations': ViolationReportSerializer(violations[:10], many=True).data,
+                'scan': ComplianceScanSerializer(latest).data if latest else None,
+                'scans_included': len(changed),
+                'new': ComplianceAuditSerializer(new_audits, many=True).data,
+                'resolved_audit_ids': sorted(resolved_ids),
+                'persisting_count': latest.persisting_count if latest else None,
             }, status=status.HTTP_200_OK)
+        except Http404:
+            raise
         except Exception as e:
-            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            return Response({'error': f'Failed to retrieve scan diff: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ComplianceViolationExportView(APIView):
+    """Stream a fresh scan's violations as newline-delimited JSON, without persisting audits"""
+    permission_classes = [IsAuthenticated, IsOrganization]
+
+    def get(self, request):
+        try:
+            organization = get_object_or_404(Org, user=request.user)
+            response = StreamingHttpResponse(violation_lines(organization), content_type='application/x-ndjson')
+            response['Content-Disposition'] = f'attachment; filename="violations-{organization.id}.ndjson"'
+            return response
+        except Exception as e:
+            return Response({'error': f'Failed to export violations: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ComplianceBacktestView(APIView):
+    """
+    Daily risk score series reconstructed from access request and consent history.
+    ?start= and ?end= are ISO dates; the range defaults to the last 30 days.
+    """
+    permission_classes = [IsAuthenticated, IsOrganization]
+    DEFAULT_RANGE_DAYS = 30
+    MAX_RANGE_DAYS = 366
+
+    def get(self, request):
+        try:
+            organization = get_object_or_404(Org, user=request.user)
+            params = request.query_params
+            today = timezone.localdate()
+            end = parse_date(params['end']) if 'end' in params else today
+            start = parse_date(params['start']) if 'start' in params else end - timedelta(days=self.DEFAULT_RANGE_DAYS - 1)
+            if start is None or end is None:
+                return Response({'error': 'start and end must be dates (YYYY-MM-DD)'}, status=status.HTTP_400_BAD_REQUEST)
+            if start > end:
+                return Response({'error': 'start must not be after end'}, status=status.HTTP_400_BAD_REQUEST)
+            if (end - start).days + 1 > self.MAX_RANGE_DAYS:
+                return Response(
+                    {'error': f'At most {self.MAX_RANGE_DAYS} days can be backtested at once'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            return Response({
+                'start': start.isoformat(),
+                'end': end.isoformat(),
+                'series': backtest(organization, start, end),
+            }, status=status.HTTP_200_OK)
+        except ValueError:
+            return Response({'error': 'start and end must be dates (YYYY-MM-DD)'}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({'error': f'Backtest failed: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ComplianceScanJobView(APIView):
+    """Queue a compliance scan to run outside the request cycle"""
+    permission_classes = [IsAuthenticated, IsOrganization]
+
+    def post(self, request):
+        try:
+            organization = get_object_or_404(Org, user=request.user)
+            job, created = enqueue_scan(
+                organization,
+                requested_by=request.user,
+                incremental=wants_incremental(request),
+                profile=wants_profile(request),
+            )
+            return Response({
+                'message': 'Compliance scan queued' if created else 'Compliance scan already in progress',
+                'data': ComplianceScanJobSerializer(job).data,
+            }, status=status.HTTP_202_ACCEPTED)
+        except Exception as e:
+            return Response({'error': f'Failed to queue compliance scan: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ComplianceScanJobDetailView(APIView):
+    """Poll the status and result of a queued compliance scan"""
+    permission_classes = [IsAuthenticated, IsOrganization]
+
+    def get(self, request, job_id):
+        try:
+            organization = get_object_or_404(Org, user=request.user)
+            job = get_object_or_404(ComplianceScanJob, pk=job_id, organization=organization)
+            return Response(ComplianceScanJobSerializer(job).data, status=status.HTTP_200_OK)
+        except Http404:
+            raise
+        except Exception as e:
+            return Response({'error': f'Failed to retrieve compliance scan: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class CompliancePreflightView(APIView):
+    """
+    Predict the violations proposed access requests would cause, without filing them.
+    Accepts one request object or {"requests": [...]} for a batch.
+    """
+    permission_classes = [IsAuthenticated, IsOrganization]
+    MAX_BATCH_SIZE = 500
+
+    def post(self, request):
+        try:
+            organization = get_object_or_404(Org, user=request.user)
+            batch = 'requests' in request.data
+            payload = request.data.get('requests') if batch else [request.data]
+            if not isinstance(payload, list) or not payload:
+                return Response({'error': 'requests must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+            if len(payload) > self.MAX_BATCH_SIZE:
+                return Response(
+                    {'error': f'At most {self.MAX_BATCH_SIZE} requests can be checked at once'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            serializer = PreflightRequestSerializer(data=payload, many=True)
+            if not serializer.is_valid():
+                return Response({'error': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+            result = preflight(organization, serializer.validated_data)
+            if not batch:
+                single = result['requests'][0]
+                single['violations'].extend(result['organization_violations'])
+                single['allowed'] = result['allowed']
+                result = {**single, 'projected': result['projected']}
+            return Response(result, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response({'error': f'Pre-flight check failed: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
 class ComplianceReportsView(APIView):
     """Get compliance reports for an organization"""
     permission_classes = [IsAuthenticated, IsOrganization]
     DUPLICATE_WINDOW_DAYS = 30
+    DEFAULT_PAGE_SIZE = 50
+    MAX_PAGE_SIZE = 200
 
     def get(self, request, org_id=None):
         try:
@@ -85,33 +298,101 @@ class ComplianceReportsView(APIView):
             else:
                 organization = get_object_or_404(Org, user=request.user)
 
-            window_start = timezone.now() - timedelta(days=self.DUPLICATE_WINDOW_DAYS)
+            params = request.query_params
+            try:
+                page_size = min(int(params.get('page_size', self.DEFAULT_PAGE_SIZE)), self.MAX_PAGE_SIZE)
+                if page_size < 1:
+                    raise ValueError
+            except ValueError:
+                return Response({'error': 'page_size must be a positive integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+            try:
+                days = int(params.get('days', self.DUPLICATE_WINDOW_DAYS))
+                if days < 1:
+                    raise ValueError
+            except ValueError:
+                return Response({'error': 'days must be a positive integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+            window_start = timezone.now() - timedelta(days=days)
+            # Closed records moved out by archive_compliance_records live in the archive tables
+            include_archive = window_reaches_archive(organization, window_start)
 
-            audits = ComplianceAudit.objects.filter(
+            audit_sources = [ComplianceAudit.objects.filter(
                 organization=organization,
                 detected_at__gte=window_start
-            ).order_by('-detected_at')
-
-            violations = ViolationReport.objects.filter(
+            )]
+            violation_sources = [ViolationReport.objects.filter(
                 organization=organization,
                 detected_at__gte=window_start
-            ).order_by('-detected_at')
+            )]
+            if include_archive:
+                audit_sources.append(ComplianceAuditArchive.objects.filter(
+                    organization=organization,
+                    detected_at__gte=window_start
+                ))
+                violation_sources.append(ViolationReportArchive.objects.filter(
+                    organization=organization,
+                    detected_at__gte=window_start
+                ))
+
+            audit_stats = {'total_audits': 0, 'pending_audits': 0, 'resolved_audits': 0}
+            for audits in audit_sources:
+                counts = audits.aggregate(
+                    total_audits=Count('id'),
+                    pending_audits=Count('id', filter=Q(status='PENDING')),
+                    resolved_audits=Count('id', filter=Q(status='RESOLVED')),
+                )
+                audit_stats = {key: audit_stats[key] + counts[key] for key in audit_stats}
+            violation_stats = violation_sources[0].aggregate(
+                unresolved_violations=Count('id', filter=Q(resolved=False)),
+            )
+
+            # Filters narrow the listed rows; statistics always cover the whole window
+            audit_filters = {}
+            severity = params.get('severity')
+            if severity:
+                audit_filters['severity'] = severity.upper()
+            audit_status = params.get('status')
+            if audit_status:
+                audit_filters['status'] = audit_status.upper()
+            violation_filters = {}
+            resolved = params.get('resolved')
+            if resolved is not None:
+                if resolved.lower() not in ('true', 'false'):
+                    return Response({'error': 'resolved must be true or false'}, status=status.HTTP_400_BAD_REQUEST)
+                violation_filters['resolved'] = resolved.lower() == 'true'
+
+            audit_sources = [audits.filter(**audit_filters).select_related('organization') for audits in audit_sources]
+            violation_sources = [violations.filter(**violation_filters).select_related('organization')
+                                 for violations in violation_sources]
+            violation_sources[0] = violation_sources[0].select_related('related_audit')
 
-            total_audits = audits.count()
-            pending_audits = audits.filter(status='PENDING').count()
-            resolved_audits = audits.filter(status='RESOLVED').count()
-            unresolved_violations = violations.filter(resolved=False).count()
+            try:
+                audit_page, next_audit_cursor = merged_keyset_page(
+                    audit_sources, params.get('audit_cursor'), page_size
+                )
+                violation_page, next_violation_cursor = merged_keyset_page(
+                    violation_sources, params.get('violation_cursor'), page_size
+                )
+            except ValueError:
+                return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
 
             return Response({
                 'organization': {'id': organization.id, 'name': organization.name},
-                'statistics': {
-                    'total_audits': total_audits,
-                    'pending_audits': pending_audits,
-                    'resolved_audits': resolved_audits,
-                    'unresolved_violations': unresolved_violations,
-                },
-                'audits': ComplianceAuditSerializer(audits, many=True).data,
-                'violations': ViolationReportSerializer(violations, many=True).data,
+                'statistics': {**audit_stats, **violation_stats},
+                'audits': [
+                    (ComplianceAuditArchiveSerializer if getattr(audit, 'archived', False)
+                     else ComplianceAuditSerializer)(audit).data
+                    for audit in audit_page
+                ],
+                'violations': [
+                    (ViolationReportArchiveSerializer if getattr(violation, 'archived', False)
+                     else ViolationReportSerializer)(violation).data
+                    for violation in violation_page
+                ],
+                'includes_archive': include_archive,
+                'next_audit_cursor': next_audit_cursor,
+                'next_violation_cursor': next_violation_cursor,
             }, status=status.HTTP_200_OK)
 
         except Exception as e:
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 01:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consents', '0007_alter_userconsent_unique_together'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userconsent',
+            index=models.Index(fields=['user', 'consent', 'access'], name='consents_us_user_id_625442_idx'),
+        ),
+    ]
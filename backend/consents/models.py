@@ -38,6 +38,7 @@ class UserConsent(models.Model):
         indexes = [
             models.Index(fields=['user', '-granted_at']),
             models.Index(fields=['expires_at']),
+            models.Index(fields=['user', 'consent', 'access']),  # Active-consent lookups in compliance scans
         ]
         # Optional: PostgreSQL only active uniqueness
         # constraints = [
@@ -0,0 +1,264 @@
+"""
+Materialized per-organization access request counters and daily rollups
+Kept current by AccessRequest.save and the post_delete signal, and rebuilt
+from the access request table by the reconcile_request_counters command
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Count, DateTimeField, F, Min, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Least, TruncDate
+from django.utils import timezone
+from .models import AccessRequest, Org, OrgDailyRequestRollup, OrgRequestCounters
+
+
+STATUS_FIELDS = {
+    'PENDING': 'pending_requests',
+    'APPROVED': 'approved_requests',
+    'REVOKED': 'revoked_requests',
+}
+COUNTER_FIELDS = [
+    'total_requests',
+    'pending_requests',
+    'approved_requests',
+    'revoked_requests',
+    'approved_users',
+    'approved_consent_types',
+    'oldest_approved_at',
+    'approved_breadth_histogram',
+]
+
+
+def compute_counters(organization_ids=None) -> dict:
+    """Count access requests per organization straight from the table"""
+    requests = AccessRequest.objects.all()
+    if organization_ids is not None:
+        requests = requests.filter(organization_id__in=organization_ids)
+    approved = Q(status='APPROVED')
+    rows = requests.values('organization_id').annotate(
+        total_requests=Count('id'),
+        pending_requests=Count('id', filter=Q(status='PENDING')),
+        approved_requests=Count('id', filter=approved),
+        revoked_requests=Count('id', filter=Q(status='REVOKED')),
+        approved_users=Count('user', filter=approved, distinct=True),
+        approved_consent_types=Count('consent', filter=approved, distinct=True),
+        oldest_approved_at=Min('requested_at', filter=approved),
+    ).order_by()
+    counters = {row.pop('organization_id'): row for row in rows}
+
+    # One GROUP BY pass over (organization, user) for the per-user breadth
+    breadth = defaultdict(Counter)
+    per_user = (
+        requests.filter(approved)
+        .values('organization_id', 'user_id')
+        .annotate(consent_types=Count('id'))
+        .values_list('organization_id', 'consent_types')
+        .order_by()
+    )
+    for org_id, consent_types in per_user:
+        breadth[org_id][consent_types] += 1
+    for org_id, row in counters.items():
+        row['approved_breadth_histogram'] = breadth_histogram(breadth[org_id])
+    return counters
+
+
+def breadth_histogram(users_by_breadth) -> dict:
+    """JSON-ready histogram of users keyed by consent types approved per user"""
+    return {str(k): v for k, v in sorted(users_by_breadth.items()) if k > 0 and v > 0}
+
+
+def shift_breadth(histogram: dict, other_approved: int, delta: int) -> dict:
+    """
+    Move one user between breadth buckets when one of their approvals is added
+    (delta 1) or removed (delta -1); other_approved counts their other approvals.
+    """
+    users_by_breadth = Counter({int(k): v for k, v in histogram.items()})
+    users_by_breadth[other_approved + (delta < 0)] -= 1
+    users_by_breadth[other_approved + (delta > 0)] += 1
+    return breadth_histogram(users_by_breadth)
+
+
+def rebuild_counters(organization_ids=None, dry_run: bool = False) -> list:
+    """
+    Recompute counters from the access request table and store them.
+    Returns one entry per organization whose stored counters had drifted.
+    """
+    actual = compute_counters(organization_ids)
+    orgs = Org.objects.all() if organization_ids is None else Org.objects.filter(pk__in=organization_ids)
+    stored = {c.organization_id: c for c in OrgRequestCounters.objects.filter(organization__in=orgs)}
+    empty = {field: 0 for field in COUNTER_FIELDS}
+    empty['oldest_approved_at'] = None
+    empty['approved_breadth_histogram'] = {}
+
+    drift = []
+    to_create = []
+    to_update = []
+    for org_id in orgs.values_list('pk', flat=True):
+        values = actual.get(org_id, empty)
+        counters = stored.get(org_id)
+        if counters is None:
+            to_create.append(OrgRequestCounters(organization_id=org_id, **values))
+            continue
+        changed = {
+            field: {'stored': getattr(counters, field), 'actual': values[field]}
+            for field in COUNTER_FIELDS
+            if getattr(counters, field) != values[field]
+        }
+        if changed:
+            drift.append({'organization_id': org_id, 'fields': changed})
+            for field, value in values.items():
+                setattr(counters, field, value)
+            to_update.append(counters)
+
+    if not dry_run:
+        OrgRequestCounters.objects.bulk_create(to_create, batch_size=500, ignore_conflicts=True)
+        OrgRequestCounters.objects.bulk_update(to_update, COUNTER_FIELDS, batch_size=500)
+    return drift
+
+
+def compute_rollups(organization_ids=None) -> dict:
+    """Daily request buckets keyed by (organization, day, status, consent), from the table"""
+    requests = AccessRequest.objects.all()
+    if organization_ids is not None:
+        requests = requests.filter(organization_id__in=organization_ids)
+    buckets = (
+        requests.annotate(day=TruncDate('requested_at'))
+        .values_list('organization_id', 'day', 'status', 'consent_id')
+        .annotate(request_count=Count('id'))
+        .order_by()
+    )
+    return {tuple(bucket[:4]): bucket[4] for bucket in buckets}
+
+
+def rebuild_rollups(organization_ids=None, dry_run: bool = False) -> int:
+    """
+    Recompute daily rollups from the access request table and store them.
+    Returns the number of buckets that were missing, stale or wrong.
+    """
+    actual = compute_rollups(organization_ids)
+    stored_rows = OrgDailyRequestRollup.objects.all()
+    if organization_ids is not None:
+        stored_rows = stored_rows.filter(organization_id__in=organization_ids)
+    stored = {
+        (row.organization_id, row.day, row.status, row.consent_id): row
+        for row in stored_rows
+    }
+
+    to_create = [
+        OrgDailyRequestRollup(organization_id=org_id, day=day, status=status, consent_id=consent_id, request_count=count)
+        for (org_id, day, status, consent_id), count in actual.items()
+        if (org_id, day, status, consent_id) not in stored
+    ]
+    to_update = []
+    to_delete = []
+    for key, row in stored.items():
+        count = actual.get(key, 0)
+        if count == row.request_count:
+            continue
+        if count:
+            row.request_count = count
+            to_update.append(row)
+        else:
+            to_delete.append(row.pk)
+
+    if not dry_run:
+        OrgDailyRequestRollup.objects.filter(pk__in=to_delete).delete()
+        OrgDailyRequestRollup.objects.bulk_update(to_update, ['request_count'], batch_size=500)
+        OrgDailyRequestRollup.objects.bulk_create(to_create, batch_size=500)
+    return len(to_create) + len(to_update) + len(to_delete)
+
+
+def window_start(now, days: int):
+    """First bucket day of a days-long window ending today; the window spans exactly days buckets"""
+    return timezone.localdate(now) - timedelta(days=days - 1)
+
+
+def requests_in_window(organization_id: int, days: int, now=None, **filters) -> int:
+    """Access requests filed in the last days buckets, summed from the daily rollups"""
+    total = OrgDailyRequestRollup.objects.filter(
+        organization_id=organization_id,
+        day__gte=window_start(now or timezone.now(), days),
+        **filters,
+    ).aggregate(total=Sum('request_count'))['total']
+    return total or 0
+
+
+def lock_counters(organization_id: int):
+    """Lock an organization's counters row for this transaction, building it if missing"""
+    if not OrgRequestCounters.objects.select_for_update().filter(pk=organization_id).exists():
+        rebuild_counters([organization_id])
+        rebuild_rollups([organization_id])
+        OrgRequestCounters.objects.select_for_update().filter(pk=organization_id).exists()
+
+
+def get_counters(organization: Org) -> OrgRequestCounters:
+    """Current counters for an organization, building them on first use"""
+    counters = OrgRequestCounters.objects.filter(pk=organization.pk).first()
+    if counters is None:
+        rebuild_counters([organization.pk])
+        counters = OrgRequestCounters.objects.get(pk=organization.pk)
+    return counters
+
+
+@transaction.atomic
+def apply_status_change(access_request: AccessRequest, old_status, new_status):
+    """
+    Apply one access request transition to its organization's counters.
+    old_status is None for a new request and new_status is None for a deleted one.
+    """
+    if old_status == new_status:
+        return
+
+    updates = {}
+    if old_status is None:
+        updates['total_requests'] = F('total_requests') + 1
+    else:
+        updates[STATUS_FIELDS[old_status]] = F(STATUS_FIELDS[old_status]) - 1
+    if new_status is None:
+        updates['total_requests'] = F('total_requests') - 1
+    else:
+        updates[STATUS_FIELDS[new_status]] = F(STATUS_FIELDS[new_status]) + 1
+
+    if 'APPROVED' in (old_status, new_status):
+        delta = 1 if new_status == 'APPROVED' else -1
+        other_approved = AccessRequest.objects.filter(
+            organization_id=access_request.organization_id,
+            status='APPROVED',
+        ).exclude(pk=access_request.pk)
+        user_approved = other_approved.filter(user_id=access_request.user_id).count()
+        if not user_approved:
+            updates['approved_users'] = F('approved_users') + delta
+        histogram = OrgRequestCounters.objects.select_for_update().filter(
+            pk=access_request.organization_id,
+        ).values_list('approved_breadth_histogram', flat=True).first()
+        if histogram is not None:
+            updates['approved_breadth_histogram'] = shift_breadth(histogram, user_approved, delta)
+        if not other_approved.filter(consent_id=access_request.consent_id).exists():
+            updates['approved_consent_types'] = F('approved_consent_types') + delta
+        if delta > 0:
+            requested_at = Value(access_request.requested_at, output_field=DateTimeField())
+            updates['oldest_approved_at'] = Least(Coalesce('oldest_approved_at', requested_at), requested_at)
+        else:
+            updates['oldest_approved_at'] = Subquery(
+                other_approved.order_by('requested_at').values('requested_at')[:1]
+            )
+
+    OrgRequestCounters.objects.filter(pk=access_request.organization_id).update(**updates)
+
+    if old_status is not None:
+        _adjust_rollup(access_request, old_status, -1)
+    if new_status is not None:
+        _adjust_rollup(access_request, new_status, 1)
+
+
+def _adjust_rollup(access_request: AccessRequest, status: str, delta: int):
+    """Move one request into or out of its daily bucket"""
+    bucket = {
+        'organization_id': access_request.organization_id,
+        'day': timezone.localdate(access_request.requested_at),
+        'status': status,
+        'consent_id': access_request.consent_id,
+    }
+    updated = OrgDailyRequestRollup.objects.filter(**bucket).update(request_count=F('request_count') + delta)
+    if not updated and delta > 0:
+        OrgDailyRequestRollup.objects.create(request_count=delta, **bucket)
@@ -0,0 +1,38 @@
+"""
+Compact trust score history
+Deletes trust score history past the retention horizon and averages rows
+past the raw horizon into one row per organization and day, one short
+transaction per batch
+Run: python manage.py compact_trust_history [--raw-days 90] [--retention-days 730]
+"""
+from django.core.management.base import BaseCommand
+
+from organization.trust_history import compact_history
+
+
+class Command(BaseCommand):
+    help = 'Downsample old trust score history and delete history past retention'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--raw-days', type=int, default=None,
+                            help='Keep every row for this many days '
+                                 '(default: TRUST_SCORE_HISTORY_RAW_DAYS)')
+        parser.add_argument('--retention-days', type=int, default=None,
+                            help='Delete history older than this many days '
+                                 '(default: TRUST_SCORE_HISTORY_RETENTION_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Rows or organization-days handled per transaction')
+        parser.add_argument('--pause', type=float, default=0,
+                            help='Seconds to sleep between batches')
+
+    def handle(self, *args, **options):
+        totals = compact_history(
+            raw_days=options['raw_days'],
+            retention_days=options['retention_days'],
+            batch_size=options['batch_size'],
+            pause=options['pause'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {totals['expired']} expired and compacted away {totals['compacted']} "
+            f"trust score history row(s) in {totals['batches']} batch(es)"
+        ))
@@ -0,0 +1,41 @@
+"""
+Recompute stored trust scores
+Recalculates Org.trust_score and trust_level for organizations whose stored
+score is missing or older than TRUST_SCORE_MAX_AGE_MINUTES, so the public
+trust registry can be served from the stored columns
+Run: python manage.py recompute_trust_scores [--org ID ...] [--max-age-minutes 60] [--all]
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from organization.models import Org
+from organization.trust_recompute import recompute_trust_scores, stale_organizations
+
+
+class Command(BaseCommand):
+    help = 'Recompute stored organization trust scores that are missing or stale'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--org', type=int, nargs='+', dest='org_ids', default=None,
+                            help='Only recompute these organization ids')
+        parser.add_argument('--max-age-minutes', type=int, default=None,
+                            help='Recompute scores older than this (default: TRUST_SCORE_MAX_AGE_MINUTES)')
+        parser.add_argument('--all', action='store_true',
+                            help='Recompute every selected organization regardless of age')
+        parser.add_argument('--batch-size', type=int, default=50,
+                            help='Organizations fetched per round trip')
+        parser.add_argument('--pause', type=float, default=0,
+                            help='Seconds to sleep between batches')
+
+    def handle(self, *args, **options):
+        if options['all']:
+            organizations = Org.objects.order_by('id')
+        else:
+            max_age = options['max_age_minutes']
+            organizations = stale_organizations(None if max_age is None else timedelta(minutes=max_age))
+        if options['org_ids']:
+            organizations = organizations.filter(pk__in=options['org_ids'])
+
+        recomputed = recompute_trust_scores(organizations, batch_size=options['batch_size'], pause=options['pause'])
+        self.stdout.write(self.style.SUCCESS(f'Recomputed trust scores for {recomputed} organization(s)'))
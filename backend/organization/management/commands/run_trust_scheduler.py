@@ -0,0 +1,59 @@
+"""
+Trust score recomputation scheduler
+Recomputes trust scores of organizations marked dirty by data changes, in
+rate-limited batches, and logs staleness against the SLA after every pass
+Run: python manage.py run_trust_scheduler [--once] [--batch-size 50] [--max-per-second 5]
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from organization.trust_scheduler import log_metrics, recompute_dirty
+
+
+class Command(BaseCommand):
+    help = 'Recompute trust scores of organizations whose data changed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Recompute until nothing is due and exit instead of polling')
+        parser.add_argument('--batch-size', type=int, default=50,
+                            help='Organizations recomputed per pass')
+        parser.add_argument('--max-per-second', type=float, default=None,
+                            help='Upper bound on recomputes per second')
+        parser.add_argument('--min-interval', type=int, default=None,
+                            help='Seconds between recomputes of one organization '
+                                 '(default: TRUST_SCORE_MIN_INTERVAL_SECONDS)')
+        parser.add_argument('--poll-interval', type=float, default=5.0,
+                            help='Seconds to sleep when nothing is due')
+
+    def handle(self, *args, **options):
+        min_interval = options['min_interval']
+        if min_interval is None:
+            min_interval = getattr(settings, 'TRUST_SCORE_MIN_INTERVAL_SECONDS', 300)
+        min_interval = timedelta(seconds=min_interval)
+
+        total = 0
+        while True:
+            close_old_connections()
+            recomputed = recompute_dirty(
+                batch_size=options['batch_size'],
+                max_per_second=options['max_per_second'],
+                min_interval=min_interval,
+            )
+            total += recomputed
+            metrics = log_metrics(recomputed=recomputed)
+            if recomputed:
+                self.stdout.write(
+                    f"Recomputed {recomputed} trust score(s); {metrics['dirty_organizations']} dirty, "
+                    f"oldest {metrics['oldest_dirty_seconds']}s, {metrics['sla_breaches']} past SLA"
+                )
+                continue
+            if options['once']:
+                break
+            time.sleep(options['poll_interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Recomputed {total} trust score(s)'))
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-18 01:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consents', '0007_alter_userconsent_unique_together'),
+        ('organization', '0007_alter_org_options_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='accessrequest',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='accessrequest',
+            index=models.Index(fields=['organization', '-updated_at'], name='organizatio_organiz_45df41_idx'),
+        ),
+    ]
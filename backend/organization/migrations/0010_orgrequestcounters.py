@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-18 01:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consents', '0008_userconsent_active_lookup_index'),
+        ('organization', '0009_orgdataversion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrgRequestCounters',
+            fields=[
+                ('organization', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='request_counters', serialize=False, to='organization.org')),
+                ('total_requests', models.PositiveIntegerField(default=0)),
+                ('pending_requests', models.PositiveIntegerField(default=0)),
+                ('approved_requests', models.PositiveIntegerField(default=0)),
+                ('revoked_requests', models.PositiveIntegerField(default=0)),
+                ('approved_users', models.PositiveIntegerField(default=0)),
+                ('approved_consent_types', models.PositiveIntegerField(default=0)),
+                ('oldest_approved_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='accessrequest',
+            index=models.Index(fields=['organization', 'status', 'requested_at'], name='organizatio_organiz_43dc03_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accessrequest',
+            index=models.Index(fields=['organization', 'consent', 'status'], name='organizatio_organiz_53e092_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.7 on 2026-10-18 01:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def backfill_rollups(apps, schema_editor):
+    """Bucket access requests filed before rollups existed"""
+    AccessRequest = apps.get_model('organization', 'AccessRequest')
+    OrgDailyRequestRollup = apps.get_model('organization', 'OrgDailyRequestRollup')
+    buckets = (
+        AccessRequest.objects.annotate(day=TruncDate('requested_at'))
+        .values('organization_id', 'day', 'status', 'consent_id')
+        .annotate(request_count=Count('id'))
+        .order_by()
+    )
+    OrgDailyRequestRollup.objects.bulk_create(
+        (OrgDailyRequestRollup(**bucket) for bucket in buckets.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consents', '0008_userconsent_active_lookup_index'),
+        ('organization', '0010_orgrequestcounters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrgDailyRequestRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('APPROVED', 'Approved'), ('REVOKED', 'Revoked')], max_length=10)),
+                ('request_count', models.PositiveIntegerField(default=0)),
+                ('consent', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_request_rollups', to='consents.consent')),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_request_rollups', to='organization.org')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['organization', 'day'], name='organizatio_organiz_33bbf2_idx')],
+                'unique_together': {('organization', 'day', 'status', 'consent')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.7 on 2026-10-18 02:08
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_status_history(apps, schema_editor):
+    """
+    Seed one transition per existing request at its request time. Earlier
+    transitions were never recorded, so backtests see the current status
+    from the day each request was filed.
+    """
+    AccessRequest = apps.get_model('organization', 'AccessRequest')
+    AccessRequestStatusHistory = apps.get_model('organization', 'AccessRequestStatusHistory')
+    AccessRequestStatusHistory.objects.bulk_create(
+        (
+            AccessRequestStatusHistory(
+                access_request_id=pk,
+                organization_id=organization_id,
+                previous_status=None,
+                new_status=status,
+                changed_at=requested_at,
+            )
+            for pk, organization_id, status, requested_at in AccessRequest.objects.values_list(
+                'id', 'organization_id', 'status', 'requested_at'
+            ).iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organization', '0011_orgdailyrequestrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccessRequestStatusHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('previous_status', models.CharField(blank=True, choices=[('PENDING', 'Pending'), ('APPROVED', 'Approved'), ('REVOKED', 'Revoked')], max_length=10, null=True)),
+                ('new_status', models.CharField(choices=[('PENDING', 'Pending'), ('APPROVED', 'Approved'), ('REVOKED', 'Revoked')], max_length=10)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('access_request', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_history', to='organization.accessrequest')),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='access_request_status_history', to='organization.org')),
+            ],
+            options={
+                'ordering': ['changed_at'],
+                'indexes': [models.Index(fields=['organization', 'changed_at'], name='organizatio_organiz_dce17b_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_status_history, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.7 on 2026-10-18 02:14
+
+import math
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_request_rates(apps, schema_editor):
+    """
+    Replay existing request times through the detector so organizations
+    start with a baseline. Mirrors organization.request_rate at the time
+    of writing: 1 and 30 day timescales, in requests/day.
+    """
+    AccessRequest = apps.get_model('organization', 'AccessRequest')
+    OrgRequestRateState = apps.get_model('organization', 'OrgRequestRateState')
+    states = {}
+    rows = AccessRequest.objects.order_by('organization_id', 'requested_at').values_list('organization_id', 'requested_at')
+    for organization_id, requested_at in rows.iterator():
+        state = states.get(organization_id)
+        if state is None:
+            state = states[organization_id] = OrgRequestRateState(organization_id=organization_id)
+        if state.last_request_at is not None:
+            elapsed = (requested_at - state.last_request_at).total_seconds() / 86400
+            state.short_rate *= math.exp(-elapsed / 1.0)
+            state.long_rate *= math.exp(-elapsed / 30.0)
+        state.short_rate += 1 / 1.0
+        state.long_rate += 1 / 30.0
+        state.last_request_at = requested_at
+    OrgRequestRateState.objects.bulk_create(states.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organization', '0012_accessrequeststatushistory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrgRequestRateState',
+            fields=[
+                ('organization', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='request_rate', serialize=False, to='organization.org')),
+                ('short_rate', models.FloatField(default=0)),
+                ('long_rate', models.FloatField(default=0)),
+                ('last_request_at', models.DateTimeField(blank=True, null=True)),
+                ('burst_started_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_request_rates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-18 02:20
+
+from collections import Counter, defaultdict
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_breadth_histograms(apps, schema_editor):
+    """Build each organization's approved consent breadth histogram in one GROUP BY pass"""
+    AccessRequest = apps.get_model('organization', 'AccessRequest')
+    OrgRequestCounters = apps.get_model('organization', 'OrgRequestCounters')
+    breadth = defaultdict(Counter)
+    per_user = (
+        AccessRequest.objects.filter(status='APPROVED')
+        .values('organization_id', 'user_id')
+        .annotate(consent_types=Count('id'))
+        .values_list('organization_id', 'consent_types')
+        .order_by()
+    )
+    for organization_id, consent_types in per_user:
+        breadth[organization_id][consent_types] += 1
+    counters = list(OrgRequestCounters.objects.filter(organization_id__in=breadth))
+    for row in counters:
+        row.approved_breadth_histogram = {str(k): v for k, v in sorted(breadth[row.organization_id].items())}
+    OrgRequestCounters.objects.bulk_update(counters, ['approved_breadth_histogram'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organization', '0013_orgrequestratestate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orgrequestcounters',
+            name='approved_breadth_histogram',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(backfill_breadth_histograms, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 02:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organization', '0014_orgrequestcounters_approved_breadth_histogram'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='org',
+            name='organizatio_trust_s_15dc8d_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='org',
+            name='organizatio_trust_l_f1b90c_idx',
+        ),
+        migrations.AddIndex(
+            model_name='org',
+            index=models.Index(fields=['-trust_score', 'id'], name='organizatio_trust_s_3115ea_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='org',
+            index=models.Index(fields=['trust_level', '-trust_score', 'id'], name='organizatio_trust_l_b32fa8_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-18 02:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organization', '0015_trust_registry_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrgTrustScoreDirty',
+            fields=[
+                ('organization', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trust_dirty', serialize=False, to='organization.org')),
+                ('first_marked_at', models.DateTimeField()),
+                ('last_marked_at', models.DateTimeField()),
+                ('change_count', models.PositiveIntegerField(default=1)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['first_marked_at'], name='organizatio_first_m_0dfeb0_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 02:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organization', '0016_orgtrustscoredirty'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrustScoreHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recorded_at', models.DateTimeField()),
+                ('overall', models.PositiveSmallIntegerField()),
+                ('compliance', models.PositiveSmallIntegerField()),
+                ('data_integrity', models.PositiveSmallIntegerField()),
+                ('consent_respect', models.PositiveSmallIntegerField()),
+                ('transparency', models.PositiveSmallIntegerField()),
+                ('user_satisfaction', models.PositiveSmallIntegerField()),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trust_history', to='organization.org')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['organization', 'recorded_at'], name='organizatio_organiz_4f8bb5_idx'), models.Index(fields=['recorded_at'], name='organizatio_recorde_a14c02_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organization', '0017_trustscorehistory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trustscorehistory',
+            name='samples',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
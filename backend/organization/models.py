@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.utils import timezone
 from accounts.models import CustomUser, Profile
@@ -33,17 +33,19 @@ class Org(models.Model):
     class Meta:
         ordering = ['-trust_score', 'name']
         indexes = [
-            models.Index(fields=['-trust_score']),
-            models.Index(fields=['trust_level']),
+            # Trust registry pages: ORDER BY -trust_score, id with an optional trust_level filter
+            models.Index(fields=['-trust_score', 'id']),
+            models.Index(fields=['trust_level', '-trust_score', 'id']),
         ]
     
     def __str__(self):
         return self.name
     
-    def update_trust_score(self):
-        """Update trust score for this organization"""
+    def update_trust_score(self, trust_data=None):
+        """Update trust score for this organization, from already calculated trust_data if given"""
         from .trust_engine import TrustScoreEngine
-        trust_data = TrustScoreEngine.calculate_trust_score(self)
+        trust_data = trust_data or TrustScoreEngine.calculate_trust_score(self)
+        changed = self.trust_score_last_calculated is None or self.trust_score != trust_data['overall_score']
         self.trust_score = trust_data['overall_score']
         self.trust_level = trust_data['trust_level']
         self.trust_score_last_calculated = timezone.now()
@@ -56,7 +58,12 @@ class Org(models.Model):
             self.trust_certificate_issued = False
             self.trust_certificate_issued_at = None
         
-        self.save()
+        self.save(update_fields=[
+            'trust_score', 'trust_level', 'trust_score_last_calculated',
+            'trust_certificate_issued', 'trust_certificate_issued_at',
+        ])
+        if changed:
+            TrustScoreHistory.from_trust_data(self, trust_data, self.trust_score_last_calculated).save()
         return trust_data
 
 
@@ -72,14 +79,64 @@ class AccessRequest(models.Model):
     consent = models.ForeignKey(Consent, on_delete=models.CASCADE, related_name='access_requests')
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
     requested_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # Change watermark for incremental compliance scans
     purpose = models.CharField(max_length=40, blank=False, null=False)
     class Meta:
         unique_together = ('organization', 'user', 'consent')
         ordering = ['-requested_at']
+        indexes = [
+            models.Index(fields=['organization', '-updated_at']),
+            models.Index(fields=['organization', 'status', 'requested_at']),
+            models.Index(fields=['organization', 'consent', 'status']),
+        ]
 
     def __str__(self):
         return f"{self.organization.name} → {self.user.email} ({self.status})"
 
+    def save(self, *args, **kwargs):
+        """
+        Keeps the organization's request counters and rate in step with this request.
+        The counters row is locked first so concurrent saves for the same
+        organization apply their deltas one at a time.
+        """
+        from .counters import lock_counters, apply_status_change
+        from .request_rate import record_request
+
+        with transaction.atomic():
+            lock_counters(self.organization_id)
+            old_status = None
+            if self.pk:
+                old_status = AccessRequest.objects.filter(pk=self.pk).values_list('status', flat=True).first()
+            super().save(*args, **kwargs)
+            apply_status_change(self, old_status, self.status)
+            if old_status is None:
+                record_request(self)
+            if old_status != self.status:
+                AccessRequestStatusHistory.objects.create(
+                    access_request=self,
+                    organization_id=self.organization_id,
+                    previous_status=old_status,
+                    new_status=self.status,
+                )
+
+
+class AccessRequestStatusHistory(models.Model):
+    """Status transitions of access requests, replayed by compliance backtests"""
+    access_request = models.ForeignKey(AccessRequest, on_delete=models.CASCADE, related_name='status_history')
+    organization = models.ForeignKey(Org, on_delete=models.CASCADE, related_name='access_request_status_history')
+    previous_status = models.CharField(max_length=10, choices=AccessRequest.STATUS_CHOICES, null=True, blank=True)
+    new_status = models.CharField(max_length=10, choices=AccessRequest.STATUS_CHOICES)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['changed_at']
+        indexes = [
+            models.Index(fields=['organization', 'changed_at']),
+        ]
+
+    def __str__(self):
+        return f"Request #{self.access_request_id}: {self.previous_status} → {self.new_status}"
+
 
 class IntegrityRecord(models.Model):
     """Store integrity records for audit trail"""
@@ -101,3 +158,143 @@ class IntegrityRecord(models.Model):
     
     def __str__(self):
         return f"{self.organization.name} - {self.entity_type} - {self.checksum[:8]}"
+
+
+class OrgDataVersion(models.Model):
+    """
+    Per-organization counter bumped whenever data that feeds compliance or
+    trust results changes. Cached results are keyed by (organization, version).
+    """
+    organization = models.OneToOneField(Org, on_delete=models.CASCADE, primary_key=True, related_name='data_version')
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.organization.name} - v{self.version}"
+
+
+class TrustScoreHistory(models.Model):
+    """
+    Append-only trust score samples, written by Org.update_trust_score when
+    the score changes. Scores are stored in centi-points (0-10000) as small
+    integers to keep rows narrow; compact_trust_history downsamples old rows
+    to one per day and drops rows past the retention horizon. samples is the
+    number of raw samples a row stands for, so averages stay weighted.
+    """
+    SCORE_FIELDS = ['overall', 'compliance', 'data_integrity', 'consent_respect', 'transparency', 'user_satisfaction']
+
+    organization = models.ForeignKey(Org, on_delete=models.CASCADE, related_name='trust_history')
+    recorded_at = models.DateTimeField()
+    overall = models.PositiveSmallIntegerField()
+    compliance = models.PositiveSmallIntegerField()
+    data_integrity = models.PositiveSmallIntegerField()
+    consent_respect = models.PositiveSmallIntegerField()
+    transparency = models.PositiveSmallIntegerField()
+    user_satisfaction = models.PositiveSmallIntegerField()
+    samples = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['organization', 'recorded_at']),
+            models.Index(fields=['recorded_at']),
+        ]
+
+    @staticmethod
+    def to_centi(score: float) -> int:
+        return int(round(min(max(score or 0, 0), 100) * 100))
+
+    @classmethod
+    def from_trust_data(cls, organization: Org, trust_data: dict, recorded_at):
+        """Unsaved history row for a calculated trust score"""
+        components = trust_data['components']
+        return cls(
+            organization=organization,
+            recorded_at=recorded_at,
+            overall=cls.to_centi(trust_data['overall_score']),
+            **{field: cls.to_centi(components[field]) for field in cls.SCORE_FIELDS[1:]},
+        )
+
+    def __str__(self):
+        return f"{self.organization.name} - {self.overall / 100:.2f} at {self.recorded_at}"
+
+
+class OrgTrustScoreDirty(models.Model):
+    """
+    Marks an organization whose stored trust score is out of date.
+    Set by the same changes that bump OrgDataVersion and cleared by the
+    trust scheduler once it has recomputed the score.
+    """
+    organization = models.OneToOneField(Org, on_delete=models.CASCADE, primary_key=True, related_name='trust_dirty')
+    first_marked_at = models.DateTimeField()
+    last_marked_at = models.DateTimeField()
+    change_count = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['first_marked_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.organization.name} - dirty since {self.first_marked_at}"
+
+
+class OrgRequestCounters(models.Model):
+    """
+    Denormalized access request counters for an organization, maintained
+    transactionally by AccessRequest.save and rebuilt by reconcile_request_counters.
+    Distinct user/consent counts and the oldest date cover APPROVED requests only.
+    approved_breadth_histogram maps consent types approved per user to the
+    number of users with that many, e.g. {"1": 40, "3": 2}.
+    """
+    organization = models.OneToOneField(Org, on_delete=models.CASCADE, primary_key=True, related_name='request_counters')
+    total_requests = models.PositiveIntegerField(default=0)
+    pending_requests = models.PositiveIntegerField(default=0)
+    approved_requests = models.PositiveIntegerField(default=0)
+    revoked_requests = models.PositiveIntegerField(default=0)
+    approved_users = models.PositiveIntegerField(default=0)
+    approved_consent_types = models.PositiveIntegerField(default=0)
+    oldest_approved_at = models.DateTimeField(null=True, blank=True)
+    approved_breadth_histogram = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.organization.name} - {self.total_requests} requests"
+
+
+class OrgRequestRateState(models.Model):
+    """
+    Constant-size streaming state of an organization's request rate:
+    exponentially weighted requests/day on a short and a long timescale,
+    as of last_request_at. Advanced by AccessRequest.save on every insert.
+    """
+    organization = models.OneToOneField(Org, on_delete=models.CASCADE, primary_key=True, related_name='request_rate')
+    short_rate = models.FloatField(default=0)
+    long_rate = models.FloatField(default=0)
+    last_request_at = models.DateTimeField(null=True, blank=True)
+    burst_started_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.organization.name} - {self.short_rate:.1f}/day"
+
+
+class OrgDailyRequestRollup(models.Model):
+    """
+    Access requests an organization filed per day, status and consent type,
+    bucketed by requested_at and maintained alongside OrgRequestCounters.
+    Time-window reads, such as the trust engine's recent activity, sum buckets
+    instead of range-scanning access requests.
+    """
+    organization = models.ForeignKey(Org, on_delete=models.CASCADE, related_name='daily_request_rollups')
+    day = models.DateField()
+    status = models.CharField(max_length=10, choices=AccessRequest.STATUS_CHOICES)
+    consent = models.ForeignKey(Consent, on_delete=models.CASCADE, related_name='daily_request_rollups')
+    request_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('organization', 'day', 'status', 'consent')
+        indexes = [
+            models.Index(fields=['organization', 'day']),
+        ]
+
+    def __str__(self):
+        return f"{self.organization.name} {self.day} {self.status}: {self.request_count}"
@@ -0,0 +1,116 @@
+"""
+Streaming access request rate detector
+Each organization keeps two exponentially weighted request rates, a short
+one that reacts to bursts and a long baseline, advanced in O(1) on every
+insert. A burst is a short-term rate well above the organization's own
+baseline, so large steady organizations are not flagged and small ones are.
+"""
+import math
+from django.dispatch import Signal
+from django.utils import timezone
+from .models import AccessRequest, OrgRequestRateState
+
+
+SHORT_TIMESCALE_DAYS = 1.0
+LONG_TIMESCALE_DAYS = 30.0
+BURST_RATIO = 4.0       # short-term rate over the baseline that counts as a burst
+BURST_MIN_RATE = 25.0   # requests/day; quieter short-term rates are never bursts
+
+# Sent with organization_id and state when an insert starts a burst
+request_burst_detected = Signal()
+
+
+def _decay(rate: float, elapsed_days: float, timescale_days: float) -> float:
+    return rate * math.exp(-max(elapsed_days, 0) / timescale_days)
+
+
+def decayed_rates(state: OrgRequestRateState, now=None) -> tuple:
+    """(short, long) rates in requests/day as of now"""
+    if state is None or state.last_request_at is None:
+        return 0.0, 0.0
+    elapsed = ((now or timezone.now()) - state.last_request_at).total_seconds() / 86400
+    return (
+        _decay(state.short_rate, elapsed, SHORT_TIMESCALE_DAYS),
+        _decay(state.long_rate, elapsed, LONG_TIMESCALE_DAYS),
+    )
+
+
+def advance(short_rate: float, long_rate: float, elapsed_days: float, count: int = 1) -> tuple:
+    """Rates after count requests arrive elapsed_days after the last one"""
+    return (
+        _decay(short_rate, elapsed_days, SHORT_TIMESCALE_DAYS) + count / SHORT_TIMESCALE_DAYS,
+        _decay(long_rate, elapsed_days, LONG_TIMESCALE_DAYS) + count / LONG_TIMESCALE_DAYS,
+    )
+
+
+def is_burst(short_rate: float, long_rate: float) -> bool:
+    return short_rate >= BURST_MIN_RATE and short_rate > BURST_RATIO * long_rate
+
+
+def in_burst(state: OrgRequestRateState, now=None) -> bool:
+    return is_burst(*decayed_rates(state, now))
+
+
+def get_rate_state(organization_id: int):
+    """Stored detector state, or None before the organization's first request"""
+    return OrgRequestRateState.objects.filter(pk=organization_id).first()
+
+
+def observe(state: OrgRequestRateState, at) -> bool:
+    """Advance state by one request at the given time; True when it starts a burst"""
+    elapsed = 0.0
+    if state.last_request_at is not None:
+        elapsed = (at - state.last_request_at).total_seconds() / 86400
+    state.short_rate, state.long_rate = advance(state.short_rate, state.long_rate, elapsed)
+    state.last_request_at = max(at, state.last_request_at or at)
+    if not is_burst(state.short_rate, state.long_rate):
+        state.burst_started_at = None
+    elif state.burst_started_at is None:
+        state.burst_started_at = at
+        return True
+    return False
+
+
+def replay(timestamps, organization_id=None) -> OrgRequestRateState:
+    """Unsaved detector state after requests at the given times, oldest first"""
+    state = OrgRequestRateState(organization_id=organization_id)
+    for at in timestamps:
+        observe(state, at)
+    return state
+
+
+def record_request(access_request: AccessRequest) -> bool:
+    """
+    Advance the organization's rates by one new request.
+    Called from AccessRequest.save under the counters lock, so the
+    read-modify-write is serialized per organization. Returns True when
+    this request starts a burst.
+    """
+    state, _ = OrgRequestRateState.objects.get_or_create(pk=access_request.organization_id)
+    started = observe(state, access_request.requested_at)
+    state.save(update_fields=['short_rate', 'long_rate', 'last_request_at', 'burst_started_at'])
+    if started:
+        request_burst_detected.send(sender=OrgRequestRateState, organization_id=state.organization_id, state=state)
+    return started
+
+
+def rebuild_request_rates(organization_ids) -> int:
+    """
+    Replay request timestamps into fresh detector state, for organizations
+    whose requests were bulk inserted. Returns the number of states written.
+    """
+    states = {}
+    rows = (
+        AccessRequest.objects.filter(organization_id__in=organization_ids)
+        .order_by('organization_id', 'requested_at')
+        .values_list('organization_id', 'requested_at')
+    )
+    for organization_id, requested_at in rows.iterator(chunk_size=2000):
+        state = states.get(organization_id)
+        if state is None:
+            state = states[organization_id] = OrgRequestRateState(organization_id=organization_id)
+        observe(state, requested_at)
+
+    OrgRequestRateState.objects.filter(organization_id__in=organization_ids).delete()
+    OrgRequestRateState.objects.bulk_create(states.values(), batch_size=500)
+    return len(states)
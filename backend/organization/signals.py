@@ -0,0 +1,105 @@
+"""
+Django signals for organization data
+Bumps per-organization data versions when compliance inputs change and
+raises request burst findings as they are detected
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from consents.models import UserConsent
+from compliance.models import ComplianceAudit, ViolationReport
+from compliance.rules_engine import NDPRRulesEngine
+from .models import AccessRequest, Org
+from .versioning import bump_data_version
+from .trust_scheduler import mark_trust_dirty
+from .counters import apply_status_change
+from .request_rate import request_burst_detected
+
+
+# Set by bulk jobs that delete many records and bump their organizations once themselves
+_version_bumps_deferred = ContextVar('version_bumps_deferred', default=False)
+
+
+@contextmanager
+def deferred_version_bumps():
+    """Skip per-row version bumps for records deleted inside the block; the caller bumps once"""
+    token = _version_bumps_deferred.set(True)
+    try:
+        yield
+    finally:
+        _version_bumps_deferred.reset(token)
+
+
+def deleted_with_organization(instance, origin) -> bool:
+    """
+    Whether instance is being cascade-deleted along with its organization,
+    i.e. the delete started from the Org itself or from the user owning it.
+    Writing version or dirty rows for such an organization would re-insert
+    rows that point at it and fail the FK check on commit.
+    """
+    if isinstance(origin, Org):
+        return origin.pk == instance.organization_id
+    if isinstance(origin, QuerySet):
+        model, pks = origin.model, origin.values('pk')
+    elif origin is not None:
+        model, pks = type(origin), [origin.pk]
+    else:
+        return False
+    if model is Org:
+        return Org.objects.filter(pk=instance.organization_id, pk__in=pks).exists()
+    if issubclass(model, get_user_model()):
+        return Org.objects.filter(pk=instance.organization_id, user__in=pks).exists()
+    return False
+
+
+@receiver([post_save, post_delete], sender=AccessRequest)
+@receiver([post_save, post_delete], sender=ComplianceAudit)
+@receiver([post_save, post_delete], sender=ViolationReport)
+def bump_organization_version(sender, instance, **kwargs):
+    """Any change to an organization's own records invalidates its cached results and trust score"""
+    if kwargs.get('signal') is post_delete and (
+        _version_bumps_deferred.get() or deleted_with_organization(instance, kwargs.get('origin'))
+    ):
+        return
+    bump_data_version(instance.organization_id)
+    mark_trust_dirty(instance.organization_id)
+
+
+@receiver(post_delete, sender=AccessRequest)
+def decrement_request_counters(sender, instance, **kwargs):
+    """Deleted requests leave the counters; saves are handled in AccessRequest.save"""
+    if deleted_with_organization(instance, kwargs.get('origin')):
+        return
+    apply_status_change(instance, instance.status, None)
+
+
+@receiver([post_save, post_delete], sender=UserConsent)
+def bump_versions_for_consent(sender, instance, **kwargs):
+    """A consent toggle affects every organization that requested that consent from the user"""
+    organization_ids = AccessRequest.objects.filter(
+        user_id=instance.user_id,
+        consent_id=instance.consent_id,
+    ).values_list('organization_id', flat=True).distinct()
+    bump_data_version(*organization_ids)
+    mark_trust_dirty(*organization_ids)
+
+
+@receiver(request_burst_detected)
+def raise_burst_finding(sender, organization_id, state, **kwargs):
+    """
+    Open an EXCESSIVE_REQUESTS audit as soon as a burst starts, without waiting
+    for a scan. The audit is written after the inserting transaction commits,
+    so only the counter and rate updates hold the organization's counters lock.
+    """
+    violation = NDPRRulesEngine.excessive_requests_violation(state, state.last_request_at)
+
+    def raise_finding():
+        organization = Org.objects.filter(pk=organization_id).first()
+        if organization is not None:
+            NDPRRulesEngine.raise_finding(organization, violation)
+
+    transaction.on_commit(raise_finding)
@@ -1,3 +1,805 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from compliance.models import ComplianceAudit, ComplianceScan
+from compliance.rules_engine import NDPRRulesEngine
+from compliance.scan_context import ScanContext
+from consents.models import Consent, UserConsent
+from .counters import compute_counters, rebuild_rollups, requests_in_window
+from .integrity import DataIntegrityChecker
+from .models import (
+    Org, AccessRequest, OrgDailyRequestRollup, OrgDataVersion, OrgRequestCounters, OrgRequestRateState,
+    OrgTrustScoreDirty,
+    TrustScoreHistory,
+)
+from .request_rate import get_rate_state, rebuild_request_rates
+from .trust_cache import _latest_key, _lock_key
+from .trust_engine import TrustScoreEngine
+from .trust_history import compact_history
+from .trust_scheduler import recompute_dirty, staleness_metrics
+from .versioning import bump_data_version, get_data_version
+
+User = get_user_model()
+
+
+class OrgDataVersionTestCase(TestCase):
+    """Test per-organization data version bumps"""
+
+    def setUp(self):
+        """Set up an organization and a consenting citizen"""
+        cache.clear()
+        self.org_user = User.objects.create_user(
+            email='org@test.com',
+            password='testpass123',
+            user_role='ORGANIZATION'
+        )
+        self.org = Org.objects.create(
+            user=self.org_user,
+            name='Test Organization',
+            email='org@test.com',
+            address='123 Test St'
+        )
+        self.consent = Consent.objects.create(name='Email')
+        self.citizen = User.objects.create_user(email='citizen@test.com', password='testpass123')
+        self.user_consent = UserConsent.objects.create(user=self.citizen, consent=self.consent, access=True)
+
+    def test_access_request_changes_bump_version(self):
+        """Creating and updating access requests bumps the version"""
+        self.assertEqual(get_data_version(self.org.id), 0)
+        request = AccessRequest.objects.create(
+            organization=self.org,
+            user=self.citizen,
+            consent=self.consent,
+            purpose='Account verification emails',
+        )
+        self.assertEqual(get_data_version(self.org.id), 1)
+        request.status = 'APPROVED'
+        request.save()
+        self.assertEqual(get_data_version(self.org.id), 2)
+
+    def test_consent_toggle_bumps_requesting_organizations(self):
+        """Only organizations that requested the consent are bumped"""
+        AccessRequest.objects.create(
+            organization=self.org,
+            user=self.citizen,
+            consent=self.consent,
+            purpose='Account verification emails',
+        )
+        before = get_data_version(self.org.id)
+        self.user_consent.access = False
+        self.user_consent.save()
+        self.assertEqual(get_data_version(self.org.id), before + 1)
+
+        other = Consent.objects.create(name='Phone')
+        UserConsent.objects.create(user=self.citizen, consent=other, access=True)
+        self.assertEqual(get_data_version(self.org.id), before + 1)
+
+    def _populate(self):
+        AccessRequest.objects.create(
+            organization=self.org,
+            user=self.citizen,
+            consent=self.consent,
+            purpose='Account verification emails',
+        )
+        ComplianceAudit.objects.create(
+            organization=self.org,
+            rule_name='Consent Validity Check',
+            rule_description='Test',
+            severity='HIGH',
+        )
+        self.assertTrue(OrgDataVersion.objects.filter(organization=self.org).exists())
+        self.assertTrue(OrgTrustScoreDirty.objects.filter(organization=self.org).exists())
+
+    def test_organization_delete_cascades_cleanly(self):
+        """Deleting an organization leaves no version or dirty rows pointing at it"""
+        self._populate()
+        self.org.delete()
+
+        connection.check_constraints()
+        self.assertFalse(OrgDataVersion.objects.exists())
+        self.assertFalse(OrgTrustScoreDirty.objects.exists())
+
+    def test_organization_user_delete_cascades_cleanly(self):
+        """Deleting the user that owns an organization cascades the same way"""
+        self._populate()
+        self.org_user.delete()
+
+        connection.check_constraints()
+        self.assertFalse(Org.objects.exists())
+        self.assertFalse(OrgDataVersion.objects.exists())
+        self.assertFalse(OrgTrustScoreDirty.objects.exists())
+
+    def test_citizen_delete_still_bumps_organization(self):
+        """Requests cascaded from a deleted citizen still invalidate the organization"""
+        self._populate()
+        before = get_data_version(self.org.id)
+        self.citizen.delete()
+
+        connection.check_constraints()
+        self.assertGreater(get_data_version(self.org.id), before)
+        self.assertTrue(OrgTrustScoreDirty.objects.filter(organization=self.org).exists())
+
+
+class OrgRequestCountersTestCase(TestCase):
+    """Test materialized access request counters"""
+
+    def setUp(self):
+        """Set up an organization and two citizens"""
+        cache.clear()
+        self.org_user = User.objects.create_user(
+            email='org@test.com',
+            password='testpass123',
+            user_role='ORGANIZATION'
+        )
+        self.org = Org.objects.create(
+            user=self.org_user,
+            name='Test Organization',
+            email='org@test.com',
+            address='123 Test St'
+        )
+        self.email = Consent.objects.create(name='Email')
+        self.phone = Consent.objects.create(name='Phone')
+        self.alice = User.objects.create_user(email='alice@test.com', password='testpass123')
+        self.bob = User.objects.create_user(email='bob@test.com', password='testpass123')
+
+    def _request(self, user, consent, status='PENDING'):
+        return AccessRequest.objects.create(
+            organization=self.org,
+            user=user,
+            consent=consent,
+            purpose='Account verification',
+            status=status,
+        )
+
+    def _assert_matches_table(self):
+        counters = OrgRequestCounters.objects.get(pk=self.org.pk)
+        actual = compute_counters([self.org.pk]).get(self.org.pk)
+        for field, value in actual.items():
+            self.assertEqual(getattr(counters, field), value, field)
+        return counters
+
+    def test_counters_follow_creates_and_status_changes(self):
+        """Creates, approvals, revocations and deletes keep the counters exact"""
+        first = self._request(self.alice, self.email)
+        second = self._request(self.alice, self.phone, status='APPROVED')
+        third = self._request(self.bob, self.phone, status='APPROVED')
+
+        counters = self._assert_matches_table()
+        self.assertEqual(counters.total_requests, 3)
+        self.assertEqual(counters.approved_users, 2)
+        self.assertEqual(counters.approved_consent_types, 1)
+
+        first.status = 'APPROVED'
+        first.save()
+        second.status = 'REVOKED'
+        second.save()
+        counters = self._assert_matches_table()
+        self.assertEqual(counters.approved_consent_types, 2)
+        self.assertEqual(counters.revoked_requests, 1)
+
+        third.delete()
+        counters = self._assert_matches_table()
+        self.assertEqual(counters.total_requests, 2)
+        self.assertEqual(counters.approved_users, 1)
+        self.assertEqual(counters.oldest_approved_at, first.requested_at)
+
+    def test_breadth_histogram_follows_approvals(self):
+        """Users move between consent breadth buckets as their approvals change"""
+        first = self._request(self.alice, self.email, status='APPROVED')
+        self._request(self.alice, self.phone, status='APPROVED')
+        self._request(self.bob, self.phone, status='APPROVED')
+        counters = self._assert_matches_table()
+        self.assertEqual(counters.approved_breadth_histogram, {'1': 1, '2': 1})
+
+        first.status = 'REVOKED'
+        first.save()
+        counters = self._assert_matches_table()
+        self.assertEqual(counters.approved_breadth_histogram, {'1': 2})
+
+        first.delete()
+        self._request(self.alice, self.email)
+        counters = self._assert_matches_table()
+        self.assertEqual(counters.approved_breadth_histogram, {'1': 2})
+
+    def test_reconcile_reports_and_repairs_drift(self):
+        """reconcile_request_counters rebuilds drifted counters"""
+        self._request(self.alice, self.email, status='APPROVED')
+        OrgRequestCounters.objects.filter(pk=self.org.pk).update(total_requests=7, approved_users=0)
+
+        out = StringIO()
+        call_command('reconcile_request_counters', '--dry-run', stdout=out)
+        self.assertIn('total_requests 7 -> 1', out.getvalue())
+        self.assertEqual(OrgRequestCounters.objects.get(pk=self.org.pk).total_requests, 7)
+
+        out = StringIO()
+        call_command('reconcile_request_counters', stdout=out)
+        self.assertIn('Repaired drift in 1 organization(s)', out.getvalue())
+        self._assert_matches_table()
+
+    def test_rules_read_counters_without_loading_rows(self):
+        """Count-only rules run in constant queries against the counters"""
+        from compliance.rules_engine import NDPRRulesEngine
+        from compliance.scan_context import ScanContext
+
+        for i in range(12):
+            self._request(User.objects.create_user(email=f'c{i}@test.com', password='x'), self.email, status='REVOKED')
+
+        context = ScanContext.load(self.org)
+        with self.assertNumQueries(1):
+            violations = NDPRRulesEngine.check_access_control(self.org, context)
+            NDPRRulesEngine.check_data_minimization(self.org, context)
+            NDPRRulesEngine.check_retention_policy(self.org, context)
+        self.assertEqual(violations[0]['details']['revoked_count'], 12)
+        self.assertFalse(context.rows_loaded)
+
+
+class OrgDailyRequestRollupTestCase(TestCase):
+    """Test daily request rollups read by the trust engine's recent activity"""
+
+    def setUp(self):
+        """Set up an organization with a handful of requests"""
+        cache.clear()
+        self.org_user = User.objects.create_user(
+            email='org@test.com',
+            password='testpass123',
+            user_role='ORGANIZATION'
+        )
+        self.org = Org.objects.create(
+            user=self.org_user,
+            name='Test Organization',
+            email='org@test.com',
+            address='123 Test St'
+        )
+        self.consent = Consent.objects.create(name='Email')
+        self.requests = [
+            AccessRequest.objects.create(
+                organization=self.org,
+                user=User.objects.create_user(email=f'c{i}@test.com', password='x'),
+                consent=self.consent,
+                purpose='Account verification',
+            )
+            for i in range(4)
+        ]
+
+    def test_rollups_follow_writes(self):
+        """Creates, status changes and deletes move requests between buckets"""
+        self.requests[0].status = 'APPROVED'
+        self.requests[0].save()
+        self.requests[1].delete()
+
+        buckets = dict(OrgDailyRequestRollup.objects.filter(organization=self.org).values_list('status', 'request_count'))
+        self.assertEqual(buckets, {'PENDING': 2, 'APPROVED': 1})
+        self.assertEqual(requests_in_window(self.org.pk, days=30), 3)
+        self.assertEqual(requests_in_window(self.org.pk, days=30, status='APPROVED'), 1)
+
+    def test_window_excludes_old_buckets(self):
+        """Requests older than the window fall out of the sum"""
+        old = timezone.now() - timedelta(days=45)
+        AccessRequest.objects.filter(pk=self.requests[0].pk).update(requested_at=old)
+        rebuild_rollups([self.org.pk])
+
+        self.assertEqual(requests_in_window(self.org.pk, days=30), 3)
+        self.assertEqual(requests_in_window(self.org.pk, days=60), 4)
+
+    def test_window_query_is_constant(self):
+        """A window sum costs one query however many requests exist"""
+        with self.assertNumQueries(1):
+            self.assertEqual(requests_in_window(self.org.pk, days=30), 4)
+
+
+class OrgRequestRateStateTestCase(TestCase):
+    """Test the streaming request burst detector"""
+
+    def setUp(self):
+        """Set up an organization and a citizen with many consent types"""
+        cache.clear()
+        self.org_user = User.objects.create_user(
+            email='org@test.com',
+            password='testpass123',
+            user_role='ORGANIZATION'
+        )
+        self.org = Org.objects.create(
+            user=self.org_user,
+            name='Test Organization',
+            email='org@test.com',
+            address='123 Test St'
+        )
+        self.citizen = User.objects.create_user(email='citizen@test.com', password='testpass123')
+        self.consents = [Consent.objects.create(name=f'Consent {i}') for i in range(30)]
+
+    def _file_requests(self, start, stop):
+        for consent in self.consents[start:stop]:
+            AccessRequest.objects.create(
+                organization=self.org,
+                user=self.citizen,
+                consent=consent,
+                purpose='Identity verification for onboarding',
+            )
+
+    def _burst_audits(self):
+        return ComplianceAudit.objects.filter(organization=self.org, rule_name='Excessive Data Requests')
+
+    def test_burst_from_small_org_raises_finding_on_insert(self):
+        """A quiet organization's sudden burst opens one audit without a scan"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self._file_requests(0, 24)
+        self.assertFalse(self._burst_audits().exists())
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self._file_requests(24, 30)
+            # The audit waits for commit, outside the counters lock
+            self.assertFalse(self._burst_audits().exists())
+        self.assertEqual(len(callbacks), 1)
+        state = get_rate_state(self.org.pk)
+        self.assertIsNotNone(state.burst_started_at)
+        self.assertEqual(self._burst_audits().count(), 1)
+
+        scan = NDPRRulesEngine.record_scan(self.org, NDPRRulesEngine.run_all_checks(self.org))
+        self.assertEqual(self._burst_audits().count(), 1)
+        self.assertGreaterEqual(scan.persisting_count, 1)
+
+    def test_steady_large_org_is_not_flagged(self):
+        """The same volume is normal for an organization whose baseline is high"""
+        OrgRequestRateState.objects.create(
+            organization=self.org,
+            short_rate=40,
+            long_rate=40,
+            last_request_at=timezone.now(),
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self._file_requests(0, 30)
+        self.assertIsNone(get_rate_state(self.org.pk).burst_started_at)
+        self.assertEqual(NDPRRulesEngine.check_excessive_requests(self.org), [])
+        self.assertFalse(self._burst_audits().exists())
+
+    def test_rule_reads_state_in_one_query(self):
+        """The rule reads one state row however many requests exist"""
+        self._file_requests(0, 30)
+        context = ScanContext.load(self.org)
+        with self.assertNumQueries(1):
+            violations = NDPRRulesEngine.check_excessive_requests(self.org, context)
+        self.assertEqual(violations[0]['details']['short_term_rate'], 30.0)
+
+        later = ScanContext.load(self.org, now=timezone.now() + timedelta(days=3))
+        self.assertEqual(NDPRRulesEngine.check_excessive_requests(self.org, later), [])
+
+    def test_rebuild_matches_streamed_state(self):
+        """Replaying stored requests reproduces the incrementally maintained rates"""
+        self._file_requests(0, 10)
+        streamed = get_rate_state(self.org.pk)
+        rebuild_request_rates([self.org.pk])
+        rebuilt = get_rate_state(self.org.pk)
+        self.assertAlmostEqual(rebuilt.short_rate, streamed.short_rate, places=3)
+        self.assertAlmostEqual(rebuilt.long_rate, streamed.long_rate, places=3)
+        self.assertEqual(rebuilt.last_request_at, streamed.last_request_at)
+
+
+class TrustRegistryTestCase(TestCase):
+    """Test the trust registry served from stored scores"""
+
+    def setUp(self):
+        """Set up scored organizations and one that was never scored"""
+        cache.clear()
+        now = timezone.now()
+        self.orgs = []
+        for i, (score, level) in enumerate([(92.5, 'EXCELLENT'), (80.0, 'VERIFIED'), (80.0, 'VERIFIED'), (45.0, 'BASIC')]):
+            user = User.objects.create_user(email=f'org{i}@test.com', password='testpass123', user_role='ORGANIZATION')
+            org = Org.objects.create(user=user, name=f'Organization {i}', email=f'org{i}@test.com', address='123 Test St')
+            Org.objects.filter(pk=org.pk).update(trust_score=score, trust_level=level, trust_score_last_calculated=now)
+            self.orgs.append(org)
+        user = User.objects.create_user(email='new@test.com', password='testpass123', user_role='ORGANIZATION')
+        self.unscored = Org.objects.create(user=user, name='New Organization', email='new@test.com', address='123 Test St')
+
+    def test_registry_pages_with_one_query(self):
+        """Pages follow (-trust_score, id) and skip organizations not scored yet"""
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/organization/trust/registry/', {'limit': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['organization']['id'] for r in response.data['results']], [self.orgs[0].id, self.orgs[1].id])
+
+        response = self.client.get('/api/organization/trust/registry/', {'limit': 2, 'cursor': response.data['next_cursor']})
+        self.assertEqual([r['organization']['id'] for r in response.data['results']], [self.orgs[2].id, self.orgs[3].id])
+        self.assertIsNone(response.data['next_cursor'])
+
+    def test_registry_filters_by_trust_level(self):
+        """trust_level narrows the registry and is validated"""
+        response = self.client.get('/api/organization/trust/registry/', {'trust_level': 'VERIFIED'})
+        self.assertEqual([r['trust_score'] for r in response.data['results']], [80.0, 80.0])
+
+        response = self.client.get('/api/organization/trust/registry/', {'trust_level': 'SUPREME'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/organization/trust/registry/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_recompute_command_scores_stale_organizations(self):
+        """recompute_trust_scores fills in missing scores and leaves fresh ones alone"""
+        out = StringIO()
+        call_command('recompute_trust_scores', stdout=out)
+        self.assertIn('Recomputed trust scores for 1 organization(s)', out.getvalue())
+        self.unscored.refresh_from_db()
+        self.assertIsNotNone(self.unscored.trust_score_last_calculated)
+        self.assertEqual(Org.objects.get(pk=self.orgs[0].pk).trust_score, 92.5)
+
+
+class TrustScoreSchedulerTestCase(TestCase):
+    """Test dirty marking and scheduled trust score recomputation"""
+
+    def setUp(self):
+        """Set up an organization and a consenting citizen"""
+        cache.clear()
+        self.org_user = User.objects.create_user(
+            email='org@test.com',
+            password='testpass123',
+            user_role='ORGANIZATION'
+        )
+        self.org = Org.objects.create(
+            user=self.org_user,
+            name='Test Organization',
+            email='org@test.com',
+            address='123 Test St'
+        )
+        self.citizen = User.objects.create_user(email='citizen@test.com', password='testpass123')
+        self.consent = Consent.objects.create(name='Email')
+        self.user_consent = UserConsent.objects.create(user=self.citizen, consent=self.consent, access=True)
+
+    def _request(self):
+        return AccessRequest.objects.create(
+            organization=self.org,
+            user=self.citizen,
+            consent=self.consent,
+            purpose='Account verification emails',
+        )
+
+    def test_changes_mark_organization_dirty(self):
+        """Request and consent changes mark the organization and count as activity"""
+        self.assertFalse(OrgTrustScoreDirty.objects.exists())
+        request = self._request()
+        mark = OrgTrustScoreDirty.objects.get(pk=self.org.pk)
+
+        request.status = 'APPROVED'
+        request.save()
+        self.user_consent.access = False
+        self.user_consent.save()
+        updated = OrgTrustScoreDirty.objects.get(pk=self.org.pk)
+        self.assertEqual(updated.first_marked_at, mark.first_marked_at)
+        self.assertGreater(updated.change_count, mark.change_count)
+
+    def test_recompute_clears_marks_and_respects_min_interval(self):
+        """Dirty organizations are recomputed once, then held back for the minimum interval"""
+        self._request()
+        self.assertEqual(recompute_dirty(), 1)
+        self.org.refresh_from_db()
+        self.assertIsNotNone(self.org.trust_score_last_calculated)
+        self.assertFalse(OrgTrustScoreDirty.objects.exists())
+        self.assertEqual(recompute_dirty(), 0)
+
+        self.user_consent.access = False
+        self.user_consent.save()
+        self.assertEqual(recompute_dirty(min_interval=timedelta(minutes=5)), 0)
+        self.assertTrue(OrgTrustScoreDirty.objects.exists())
+        self.assertEqual(recompute_dirty(), 1)
+
+    def test_change_during_recompute_keeps_mark(self):
+        """A mark made while a score is being computed survives for the next pass"""
+        self._request()
+
+        def change_during_compute(organization):
+            OrgTrustScoreDirty.objects.filter(pk=self.org.pk).update(
+                last_marked_at=timezone.now() + timedelta(seconds=1),
+            )
+
+        with mock.patch.object(Org, 'update_trust_score', autospec=True, side_effect=change_during_compute):
+            self.assertEqual(recompute_dirty(), 1)
+        self.assertTrue(OrgTrustScoreDirty.objects.filter(pk=self.org.pk).exists())
+
+    def test_staleness_metrics_and_command(self):
+        """Marks older than the SLA are reported and the command drains them"""
+        self._request()
+        OrgTrustScoreDirty.objects.update(first_marked_at=timezone.now() - timedelta(hours=1))
+        metrics = staleness_metrics()
+        self.assertEqual(metrics['dirty_organizations'], 1)
+        self.assertEqual(metrics['sla_breaches'], 1)
+        self.assertGreaterEqual(metrics['oldest_dirty_seconds'], 3600)
+
+        out = StringIO()
+        call_command('run_trust_scheduler', '--once', stdout=out)
+        self.assertIn('Recomputed 1 trust score(s)', out.getvalue())
+        self.assertEqual(staleness_metrics()['dirty_organizations'], 0)
+
+
+class TrustScoreBundleTestCase(TestCase):
+    """Test trust score components computed from one gathered bundle"""
+
+    def setUp(self):
+        """Set up requests covering consented, unconsented and revoked access"""
+        cache.clear()
+        self.org_user = User.objects.create_user(
+            email='org@test.com',
+            password='testpass123',
+            user_role='ORGANIZATION'
+        )
+        self.org = Org.objects.create(
+            user=self.org_user,
+            name='Test Organization',
+            email='org@test.com',
+            address='123 Test St'
+        )
+        self.consent = Consent.objects.create(name='Email')
+        for i, (status, granted, purpose) in enumerate([
+            ('APPROVED', True, 'Account verification emails'),
+            ('APPROVED', False, 'Account verification emails'),
+            ('REVOKED', True, 'Account verification emails'),
+            ('PENDING', True, 'general'),
+        ]):
+            citizen = User.objects.create_user(email=f'citizen{i}@test.com', password='testpass123')
+            UserConsent.objects.create(user=citizen, consent=self.consent, access=granted)
+            AccessRequest.objects.create(
+                organization=self.org,
+                user=citizen,
+                consent=self.consent,
+                status=status,
+                purpose=purpose,
+            )
+        ComplianceAudit.objects.create(
+            organization=self.org,
+            rule_name='Consent Validity Check',
+            rule_description='Test',
+            severity='HIGH',
+        )
+
+    def test_bundle_is_gathered_in_fixed_queries(self):
+        """Every component reads the bundle; per-organization cost is five queries"""
+        with self.assertNumQueries(5):
+            trust_data = TrustScoreEngine.calculate_trust_score(self.org)
+
+        components = trust_data['components']
+        self.assertEqual(components['compliance'], 50)  # unconsented approval (HIGH + CRITICAL) and a vague purpose (HIGH)
+        self.assertEqual(components['data_integrity'], 100)
+        self.assertEqual(components['consent_respect'], 5)  # 1 of 4 consented, minus the 20 point revocation cap
+        self.assertEqual(components['transparency'], 82.5)  # 3 of 4 clear purposes, all recent
+
+    def test_bundle_counts(self):
+        """The aggregate counts match the underlying rows"""
+        bundle = TrustScoreEngine.gather(self.org)
+        self.assertEqual(bundle.total_requests, 4)
+        self.assertEqual(bundle.consented_approvals, 1)
+        self.assertEqual(bundle.clear_purposes, 3)
+        self.assertEqual(bundle.recent_requests, 4)
+        self.assertEqual(bundle.rule_findings['CONSENT_VALIDITY'], 1)
+        self.assertEqual(bundle.rule_findings['REVOCATION_HANDLING'], 1)
+        self.assertEqual(bundle.rule_findings['PURPOSE_LIMITATION'], 1)
+        self.assertEqual(sum(bundle.rule_findings.values()), 3)
+
+    def test_compliance_matches_a_full_scan(self):
+        """The compliance component scores the same findings a scan raises, not the stored audits"""
+        scan_result = NDPRRulesEngine.run_all_checks(self.org)
+        self.assertEqual(
+            TrustScoreEngine.calculate_compliance_score(self.org),
+            max(0, 100 - scan_result['risk_score']),
+        )
+
+    def test_unscanned_organization_with_violations_is_not_perfect(self):
+        """An organization never scanned and with no audits still loses points for violating data"""
+        ComplianceAudit.objects.filter(organization=self.org).delete()
+        self.assertFalse(ComplianceScan.objects.filter(organization=self.org).exists())
+
+        trust_data = TrustScoreEngine.calculate_trust_score(self.org)
+        self.assertLess(trust_data['components']['compliance'], 100)
+        self.assertNotEqual(trust_data['trust_level'], 'EXCELLENT')
+
+    def test_recent_requests_come_from_rollups(self):
+        """Recent activity is summed from the daily buckets, not by scanning requests"""
+        old = timezone.now() - timedelta(days=45)
+        AccessRequest.objects.filter(pk=AccessRequest.objects.first().pk).update(requested_at=old)
+        self.assertEqual(TrustScoreEngine.gather(self.org).recent_requests, 4)
+
+        rebuild_rollups([self.org.pk])
+        self.assertEqual(TrustScoreEngine.gather(self.org).recent_requests, 3)
+
+
+class TrustScoreCacheTestCase(TestCase):
+    """Test the version-keyed trust score cache behind the trust score views"""
+
+    def setUp(self):
+        """Set up an organization with one approved request"""
+        cache.clear()
+        self.org_user = User.objects.create_user(
+            email='org@test.com',
+            password='testpass123',
+            user_role='ORGANIZATION'
+        )
+        self.org = Org.objects.create(
+            user=self.org_user,
+            name='Test Organization',
+            email='org@test.com',
+            address='123 Test St'
+        )
+        self.consent = Consent.objects.create(name='Email')
+        self.citizen = User.objects.create_user(email='citizen@test.com', password='testpass123')
+        UserConsent.objects.create(user=self.citizen, consent=self.consent, access=True)
+        AccessRequest.objects.create(
+            organization=self.org,
+            user=self.citizen,
+            consent=self.consent,
+            status='APPROVED',
+            purpose='Account verification emails',
+        )
+        self.url = f'/api/organization/trust/score/{self.org.id}/'
+
+    def _calculations(self):
+        return mock.patch.object(
+            TrustScoreEngine, 'calculate_trust_score', wraps=TrustScoreEngine.calculate_trust_score
+        )
+
+    def test_repeat_reads_compute_once_and_persist(self):
+        """The first read computes and stores the score; later reads are served from cache"""
+        with self._calculations() as calculate:
+            first = self.client.get(self.url)
+            second = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(calculate.call_count, 1)
+        self.assertEqual(second.data, first.data)
+
+        self.org.refresh_from_db()
+        self.assertEqual(self.org.trust_score, first.data['trust_score'])
+        self.assertIsNotNone(self.org.trust_score_last_calculated)
+
+    def test_view_recompute_clears_dirty_mark(self):
+        """A score computed for a read is current, so the scheduler has nothing left to do"""
+        self.assertTrue(OrgTrustScoreDirty.objects.filter(organization=self.org).exists())
+        self.client.get(self.url)
+
+        self.assertFalse(OrgTrustScoreDirty.objects.filter(organization=self.org).exists())
+        with self._calculations() as calculate:
+            self.assertEqual(recompute_dirty(), 0)
+        calculate.assert_not_called()
+
+    def test_etag_returns_not_modified(self):
+        """A matching If-None-Match gets a bodiless 304 with the same ETag"""
+        response = self.client.get(self.url)
+        tag = response['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=tag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], tag)
+
+    def test_data_change_recomputes(self):
+        """Changing the organization's records moves to a new version and a new ETag"""
+        with self._calculations() as calculate:
+            tag = self.client.get(self.url)['ETag']
+            self.client.get(self.url)
+            AccessRequest.objects.filter(organization=self.org).first().delete()
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=tag)
+        self.assertEqual(calculate.call_count, 2)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], tag)
+
+    def test_detail_view_caches_score_and_integrity(self):
+        """The authenticated detail view reuses the cached score and integrity check, with ETags"""
+        client = APIClient()
+        client.force_authenticate(self.org_user)
+        verify = mock.patch.object(
+            DataIntegrityChecker, 'verify_organization_data_integrity',
+            wraps=DataIntegrityChecker.verify_organization_data_integrity,
+        )
+        with self._calculations() as calculate, verify as verify_integrity:
+            first = client.get('/api/organization/trust/score/')
+            second = client.get('/api/organization/trust/score/')
+            not_modified = client.get('/api/organization/trust/score/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(first.data['data_integrity']['total_requests'], 1)
+        self.assertEqual((calculate.call_count, verify_integrity.call_count), (1, 1))
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_concurrent_miss_serves_latest_entry(self):
+        """While another request holds the lock, a recent previous entry is served without computing"""
+        latest = self.client.get(self.url)
+        bump_data_version(self.org.id)
+        self.assertIsNotNone(cache.get(_latest_key(self.org.id)))
+        cache.add(_lock_key(self.org.id), 'other-request', 30)
+
+        with self._calculations() as calculate:
+            response = self.client.get(self.url)
+        calculate.assert_not_called()
+        self.assertEqual(response['ETag'], latest['ETag'])
+
+
+class TrustScoreHistoryTestCase(TestCase):
+    """Test trust score history rows, the trend endpoint and compaction"""
+
+    def setUp(self):
+        """Set up an organization without history"""
+        cache.clear()
+        self.org_user = User.objects.create_user(
+            email='org@test.com',
+            password='testpass123',
+            user_role='ORGANIZATION'
+        )
+        self.org = Org.objects.create(
+            user=self.org_user,
+            name='Test Organization',
+            email='org@test.com',
+            address='123 Test St'
+        )
+        self.now = timezone.now().replace(hour=12, minute=0, second=0, microsecond=0)
+
+    def _trust_data(self, score):
+        components = dict.fromkeys(TrustScoreHistory.SCORE_FIELDS[1:], score)
+        return {'overall_score': score, 'trust_level': TrustScoreEngine.get_trust_level(score), 'components': components}
+
+    def _sample(self, score, at):
+        TrustScoreHistory.from_trust_data(self.org, self._trust_data(score), at).save()
+
+    def test_history_written_only_on_change(self):
+        """Recomputing an unchanged score appends nothing; a change appends a centi-point row"""
+        self.org.update_trust_score(self._trust_data(80.25))
+        self.org.update_trust_score(self._trust_data(80.25))
+        self.org.update_trust_score(self._trust_data(61.5))
+
+        rows = list(TrustScoreHistory.objects.filter(organization=self.org).order_by('recorded_at', 'id'))
+        self.assertEqual([row.overall for row in rows], [8025, 6150])
+        self.assertEqual(rows[0].consent_respect, 8025)
+
+    def test_trend_buckets(self):
+        """Daily buckets average their samples; weekly buckets merge days"""
+        self._sample(80, self.now - timedelta(days=1, hours=1))
+        self._sample(90, self.now - timedelta(days=1))
+        self._sample(60, self.now)
+
+        response = self.client.get(f'/api/organization/trust/score/{self.org.id}/trend/', {'days': 7})
+        self.assertEqual(response.status_code, 200)
+        points = response.data['points']
+        self.assertEqual([p['trust_score'] for p in points], [85.0, 60.0])
+        self.assertEqual((points[0]['min_score'], points[0]['max_score'], points[0]['samples']), (80.0, 90.0, 2))
+        self.assertEqual(points[0]['components']['transparency'], 85.0)
+
+        response = self.client.get(f'/api/organization/trust/score/{self.org.id}/trend/', {'bucket': 'week', 'days': 7})
+        self.assertEqual(sum(p['samples'] for p in response.data['points']), 3)
+
+        response = self.client.get(f'/api/organization/trust/score/{self.org.id}/trend/', {'bucket': 'month'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_compaction_bounds_history(self):
+        """Old days collapse to their average row and rows past retention are deleted"""
+        old_day = self.now - timedelta(days=100)
+        for hours, score in [(0, 70), (1, 80), (2, 90)]:
+            self._sample(score, old_day + timedelta(hours=hours))
+        self._sample(50, self.now - timedelta(days=800))
+        self._sample(40, self.now)
+        self._sample(45, self.now + timedelta(minutes=5))
+
+        totals = compact_history(now=self.now + timedelta(hours=1), raw_days=90, retention_days=730)
+        self.assertEqual((totals['expired'], totals['compacted']), (1, 2))
+
+        rows = list(TrustScoreHistory.objects.filter(organization=self.org).order_by('recorded_at', 'id'))
+        self.assertEqual([row.overall for row in rows], [8000, 4000, 4500])
+        self.assertEqual(rows[0].recorded_at.date(), old_day.date())
+
+        totals = compact_history(now=self.now + timedelta(hours=1), raw_days=90, retention_days=730)
+        self.assertEqual((totals['expired'], totals['compacted']), (0, 0))
+
+    def test_recompaction_weights_by_samples(self):
+        """A day compacted twice averages its compacted row by the samples it stands for"""
+        old_day = self.now - timedelta(days=100)
+        for hours, score in [(0, 70), (1, 80), (2, 90)]:
+            self._sample(score, old_day + timedelta(hours=hours))
+        compact_history(now=self.now, raw_days=90)
+        self._sample(40, old_day + timedelta(hours=3))
+        compact_history(now=self.now, raw_days=90)
+
+        row = TrustScoreHistory.objects.get(organization=self.org)
+        self.assertEqual((row.overall, row.samples), (7000, 4))
 
-# Create your tests here.
+        response = self.client.get(f'/api/organization/trust/score/{self.org.id}/trend/', {'days': 120})
+        self.assertEqual(response.data['points'][0]['trust_score'], 70.0)
+        self.assertEqual(response.data['points'][0]['samples'], 4)
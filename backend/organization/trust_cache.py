@@ -0,0 +1,125 @@
+"""
+Read-through cache for public trust scores
+Entries are keyed by (organization, data version) so a data change is seen on
+the next read. On a miss one request computes while concurrent requests for
+the same organization serve the previous entry, if it is recent enough, or
+wait for the computing request to finish.
+"""
+import time
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from .models import Org
+from .trust_scheduler import clear_trust_dirty
+from .versioning import get_data_version
+
+
+LOCK_POLL_INTERVAL = 0.05
+
+
+def _entry_key(organization_id: int, version: int) -> str:
+    return f'trust:score:{organization_id}:v{version}'
+
+
+def _latest_key(organization_id: int) -> str:
+    return f'trust:score:{organization_id}:latest'
+
+
+def _integrity_key(organization_id: int, version: int) -> str:
+    return f'trust:integrity:{organization_id}:v{version}'
+
+
+def _lock_key(organization_id: int) -> str:
+    return f'trust:score:{organization_id}:lock'
+
+
+def _setting(name: str, default):
+    return getattr(settings, name, default)
+
+
+def etag(entry: dict) -> str:
+    """Entity tag of a cached trust score: its organization, data version and computation time"""
+    return f'"trust-{entry["organization_id"]}-v{entry["version"]}-{entry["computed_at"]}"'
+
+
+def _compute(organization: Org, version: int) -> dict:
+    from .trust_engine import TrustScoreEngine
+
+    started_at = timezone.now()
+    trust_data = TrustScoreEngine.calculate_trust_score(organization)
+    organization.update_trust_score(trust_data)
+    # The stored score is current, so the scheduler need not recompute it
+    clear_trust_dirty(organization.id, started_at)
+    return {
+        'organization_id': organization.id,
+        'version': version,
+        'computed_at': int(time.time()),
+        'data': trust_data,
+    }
+
+
+def _store(entry: dict):
+    timeout = _setting('TRUST_SCORE_CACHE_SECONDS', 300)
+    cache.set(_entry_key(entry['organization_id'], entry['version']), entry, timeout)
+    # The latest entry outlives version changes so it can stand in while a recompute runs
+    cache.set(_latest_key(entry['organization_id']), entry, timeout * 2)
+
+
+def _fresh_enough(entry: dict) -> bool:
+    return time.time() - entry['computed_at'] <= _setting('TRUST_SCORE_CACHE_SECONDS', 300)
+
+
+def get_trust_entry(organization: Org) -> dict:
+    """
+    Cached trust score entry for the organization's current data version.
+    At most one concurrent request per organization runs the calculation;
+    the rest get the previous entry while it is within the staleness window,
+    or wait for the new one up to TRUST_SCORE_CACHE_LOCK_SECONDS.
+    """
+    version = get_data_version(organization.id)
+    key = _entry_key(organization.id, version)
+    entry = cache.get(key)
+    if entry is not None:
+        return entry
+
+    lock_key = _lock_key(organization.id)
+    lock_seconds = _setting('TRUST_SCORE_CACHE_LOCK_SECONDS', 30)
+    token = uuid.uuid4().hex
+    if cache.add(lock_key, token, lock_seconds):
+        try:
+            entry = _compute(organization, version)
+            _store(entry)
+            return entry
+        finally:
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+    latest = cache.get(_latest_key(organization.id))
+    if latest is not None and _fresh_enough(latest):
+        return latest
+
+    deadline = time.monotonic() + lock_seconds
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+        if cache.get(lock_key) is None:
+            break
+    # The computing request failed or timed out; compute without waiting further
+    entry = _compute(organization, version)
+    _store(entry)
+    return entry
+
+
+def get_integrity_entry(organization: Org, entry: dict) -> dict:
+    """Data integrity check at the trust entry's data version, run once per version"""
+    from .integrity import DataIntegrityChecker
+
+    key = _integrity_key(organization.id, entry['version'])
+    integrity = cache.get(key)
+    if integrity is None:
+        integrity = DataIntegrityChecker.verify_organization_data_integrity(organization)
+        cache.set(key, integrity, _setting('TRUST_SCORE_CACHE_SECONDS', 300))
+    return integrity
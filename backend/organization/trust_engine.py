@@ -2,13 +2,32 @@
 Trust Score Calculation Engine for Organizations
 Calculates trust scores based on compliance, data handling, and user feedback
 """
-from django.utils import timezone
+import base64
+from collections import namedtuple
 from datetime import timedelta
+from django.db.models import Count, Exists, OuterRef, Q
+from django.db.models.functions import Length, Lower, Trim
+from django.utils import timezone
 from .models import Org, AccessRequest
-from compliance.models import ComplianceAudit, ViolationReport
+from .counters import get_counters, requests_in_window
+from .request_rate import get_rate_state
+from compliance.models import ViolationReport
 from consents.models import UserConsent
 
 
+# Everything the trust components read for one organization, gathered in a
+# fixed number of aggregate queries
+TrustBundle = namedtuple('TrustBundle', [
+    'total_requests',
+    'revoked_requests',
+    'consented_approvals',       # approved requests the user still consents to
+    'clear_purposes',            # requests with a specific purpose of 10+ characters
+    'recent_requests',           # requests in the last 30 daily buckets
+    'open_integrity_violations', # unresolved PRIVACY_BREACH / AUDIT_FAILURE reports
+    'rule_findings',             # findings per NDPR rule a scan would raise now
+])
+
+
 class TrustScoreEngine:
     """Engine for calculating organization trust scores"""
     
@@ -30,135 +49,145 @@ class TrustScoreEngine:
         'LOW': (0, 39),           # 0-39
     }
     
+    VAGUE_PURPOSES = ['general', 'testing', 'other']
+    RECENT_ACTIVITY_DAYS = 30
+
     @classmethod
-    def calculate_compliance_score(cls, organization: Org) -> float:
-        """Calculate compliance component (0-100)"""
+    def gather(cls, organization: Org, now=None) -> TrustBundle:
+        """
+        Collect every trust input for an organization in five queries: the
+        request counters, one aggregate over its access requests, the daily
+        rollups of recent activity, its open integrity violations and its
+        request rate state. The NDPR rule signals come from the same inputs,
+        so the compliance component reflects the current data whether or
+        not the organization has been scanned.
+        """
         from compliance.rules_engine import NDPRRulesEngine
-        
-        # Run compliance checks
-        scan_result = NDPRRulesEngine.run_all_checks(organization)
-        risk_score = scan_result.get('risk_score', 100)
-        
+
+        now = now or timezone.now()
+        counters = get_counters(organization)
+        active_consent = UserConsent.objects.filter(user=OuterRef('user'), consent=OuterRef('consent'), access=True)
+        clear_purpose = (
+            Q(purpose__isnull=False, purpose_length__gte=10)
+            & ~Q(purpose='')
+            & ~Q(purpose__in=cls.VAGUE_PURPOSES)
+        )
+        # Same test as NDPRRulesEngine.is_vague_purpose
+        vague_purpose = (
+            Q(purpose__isnull=True)
+            | Q(purpose_lower__in=NDPRRulesEngine.VAGUE_PURPOSES)
+            | Q(trimmed_purpose_length__lt=10)
+        )
+        requests = AccessRequest.objects.filter(organization=organization).annotate(
+            has_active_consent=Exists(active_consent),
+            purpose_length=Length('purpose'),
+            purpose_lower=Lower('purpose'),
+            trimmed_purpose_length=Length(Trim('purpose')),
+        ).aggregate(
+            consented_approvals=Count('id', filter=Q(status='APPROVED', has_active_consent=True)),
+            unconsented_approvals=Count('id', filter=Q(status='APPROVED', has_active_consent=False)),
+            clear_purposes=Count('id', filter=clear_purpose),
+            vague_purposes=Count('id', filter=vague_purpose),
+            missing_purposes=Count('id', filter=Q(purpose__isnull=True)),
+            retention_expired=Count('id', filter=Q(
+                status='APPROVED',
+                requested_at__lt=now - timedelta(days=NDPRRulesEngine.RETENTION_DAYS),
+            )),
+        )
+        open_integrity_violations = ViolationReport.objects.filter(
+            organization=organization,
+            violation_type__in=['PRIVACY_BREACH', 'AUDIT_FAILURE'],
+            resolved=False,
+        ).count()
+        rule_findings = NDPRRulesEngine.findings_from_signals(
+            counters,
+            unconsented=requests.pop('unconsented_approvals'),
+            vague_purposes=requests.pop('vague_purposes'),
+            missing_purposes=requests.pop('missing_purposes'),
+            retention_expired=requests.pop('retention_expired'),
+            rate_state=get_rate_state(organization.pk),
+            now=now,
+        )
+
+        return TrustBundle(
+            total_requests=counters.total_requests,
+            revoked_requests=counters.revoked_requests,
+            recent_requests=requests_in_window(organization.pk, cls.RECENT_ACTIVITY_DAYS, now=now),
+            open_integrity_violations=open_integrity_violations,
+            rule_findings=rule_findings,
+            **requests,
+        )
+
+    @classmethod
+    def calculate_compliance_score(cls, organization: Org, bundle: TrustBundle = None) -> float:
+        """Calculate compliance component (0-100) from the rule findings in the bundle"""
+        from compliance.rules_engine import NDPRRulesEngine
+
+        bundle = bundle or cls.gather(organization)
+        risk_score = NDPRRulesEngine.calculate_risk_score_from_findings(bundle.rule_findings)
+
         # Convert risk score (0-100, higher = worse) to trust score (0-100, higher = better)
-        compliance_score = max(0, 100 - risk_score)
-        
-        return compliance_score
-    
+        return max(0, 100 - risk_score)
+
     @classmethod
-    def calculate_data_integrity_score(cls, organization: Org) -> float:
+    def calculate_data_integrity_score(cls, organization: Org, bundle: TrustBundle = None) -> float:
         """Calculate data integrity component (0-100)"""
-        # Check for data integrity violations
-        # This will be enhanced with checksum verification
-        access_requests = AccessRequest.objects.filter(organization=organization)
-        
-        if not access_requests.exists():
+        bundle = bundle or cls.gather(organization)
+        if not bundle.total_requests:
             return 100  # No data access = perfect integrity
-        
-        # Check for missing integrity checks
-        total_requests = access_requests.count()
-        # For now, assume all have integrity (will be enhanced with checksums)
-        integrity_score = 100
-        
-        # Deduct points for violations
-        violations = ViolationReport.objects.filter(
-            organization=organization,
-            violation_type__in=['PRIVACY_BREACH', 'AUDIT_FAILURE'],
-            resolved=False
-        ).count()
-        
-        if violations > 0:
-            integrity_score = max(0, 100 - (violations * 10))
-        
-        return integrity_score
-    
+
+        # Deduct points for unresolved integrity violations
+        return max(0, 100 - (bundle.open_integrity_violations * 10))
+
     @classmethod
-    def calculate_consent_respect_score(cls, organization: Org) -> float:
+    def calculate_consent_respect_score(cls, organization: Org, bundle: TrustBundle = None) -> float:
         """Calculate how well organization respects user consent (0-100)"""
-        access_requests = AccessRequest.objects.filter(organization=organization)
-        
-        if not access_requests.exists():
-            return 100
-        
-        total_requests = access_requests.count()
-        approved_requests = access_requests.filter(status='APPROVED')
-        
-        # Check how many approved requests have valid consent
-        valid_consent_count = 0
-        for request in approved_requests:
-            user_consent = UserConsent.objects.filter(
-                user=request.user,
-                consent=request.consent,
-                access=True
-            ).first()
-            if user_consent:
-                valid_consent_count += 1
-        
-        if total_requests == 0:
+        bundle = bundle or cls.gather(organization)
+        total_requests = bundle.total_requests
+        if not total_requests:
             return 100
-        
-        # Calculate percentage of requests with valid consent
-        consent_respect_score = (valid_consent_count / total_requests) * 100
-        
+
+        # Percentage of requests that are approved with valid consent
+        consent_respect_score = (bundle.consented_approvals / total_requests) * 100
+
         # Penalize revoked access that was previously approved
-        revoked_after_approval = access_requests.filter(status='REVOKED').count()
-        if revoked_after_approval > 0:
-            penalty = min(20, (revoked_after_approval / total_requests) * 100)
+        if bundle.revoked_requests > 0:
+            penalty = min(20, (bundle.revoked_requests / total_requests) * 100)
             consent_respect_score = max(0, consent_respect_score - penalty)
-        
+
         return consent_respect_score
-    
+
     @classmethod
-    def calculate_transparency_score(cls, organization: Org) -> float:
+    def calculate_transparency_score(cls, organization: Org, bundle: TrustBundle = None) -> float:
         """Calculate transparency component (0-100)"""
-        access_requests = AccessRequest.objects.filter(organization=organization)
-        
-        if not access_requests.exists():
+        bundle = bundle or cls.gather(organization)
+        total = bundle.total_requests
+        if not total:
             return 100
-        
-        total = access_requests.count()
-        
-        # Check for requests with clear purposes
-        clear_purposes = access_requests.exclude(
-            purpose__isnull=True
-        ).exclude(
-            purpose=''
-        ).exclude(
-            purpose__in=['general', 'testing', 'other']
-        ).filter(
-            purpose__length__gte=10
-        ).count()
-        
-        # Check for recent activity (shows active transparency)
-        thirty_days_ago = timezone.now() - timedelta(days=30)
-        recent_activity = access_requests.filter(
-            requested_at__gte=thirty_days_ago
-        ).count()
-        
-        # Calculate transparency score
-        purpose_score = (clear_purposes / total) * 70 if total > 0 else 0
-        activity_score = min(30, (recent_activity / max(1, total)) * 30)
-        
-        transparency_score = purpose_score + activity_score
-        
-        return min(100, transparency_score)
-    
+
+        # Clear purposes, plus recent activity (shows active transparency)
+        purpose_score = (bundle.clear_purposes / total) * 70
+        activity_score = min(30, (bundle.recent_requests / max(1, total)) * 30)
+
+        return min(100, purpose_score + activity_score)
+
     @classmethod
-    def calculate_user_satisfaction_score(cls, organization: Org) -> float:
+    def calculate_user_satisfaction_score(cls, organization: Org, bundle: TrustBundle = None) -> float:
         """Calculate user satisfaction component (0-100) - placeholder for future"""
         # This will be implemented with user feedback/ratings
         # For now, return a default score
         return 85.0
-    
+
     @classmethod
     def calculate_trust_score(cls, organization: Org) -> dict:
-        """Calculate overall trust score for an organization"""
-        # Calculate each component
-        compliance_score = cls.calculate_compliance_score(organization)
-        integrity_score = cls.calculate_data_integrity_score(organization)
-        consent_score = cls.calculate_consent_respect_score(organization)
-        transparency_score = cls.calculate_transparency_score(organization)
-        satisfaction_score = cls.calculate_user_satisfaction_score(organization)
-        
+        """Calculate overall trust score for an organization from one gathered bundle"""
+        bundle = cls.gather(organization)
+        compliance_score = cls.calculate_compliance_score(organization, bundle)
+        integrity_score = cls.calculate_data_integrity_score(organization, bundle)
+        consent_score = cls.calculate_consent_respect_score(organization, bundle)
+        transparency_score = cls.calculate_transparency_score(organization, bundle)
+        satisfaction_score = cls.calculate_user_satisfaction_score(organization, bundle)
+
         # Calculate weighted average
         weights = cls.COMPONENT_WEIGHTS
         overall_score = (
@@ -196,26 +225,62 @@ class TrustScoreEngine:
                 return level
         return 'LOW'
     
+    @staticmethod
+    def encode_registry_cursor(trust_score: float, pk: int) -> str:
+        """Opaque cursor pointing just after the given registry row"""
+        raw = f'{trust_score!r}|{pk}'
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def decode_registry_cursor(cursor: str) -> tuple:
+        """Return (trust_score, pk) from a cursor; raises ValueError when malformed"""
+        try:
+            raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+            trust_score, pk = raw.rsplit('|', 1)
+            return float(trust_score), int(pk)
+        except (UnicodeError, ValueError, TypeError) as e:
+            raise ValueError('Invalid cursor') from e
+
     @classmethod
-    def get_organization_ranking(cls, limit: int = 10) -> list:
-        """Get ranked list of organizations by trust score"""
-        organizations = Org.objects.all()
-        rankings = []
-        
-        for org in organizations:
-            trust_data = cls.calculate_trust_score(org)
-            rankings.append({
+    def registry_page(cls, limit: int = 10, cursor: str = None, trust_level: str = None) -> tuple:
+        """
+        One page of the trust registry from the stored scores, ordered by
+        (-trust_score, id) and continuing after the cursor. Organizations not
+        scored yet are left out until recompute_trust_scores reaches them.
+        Returns (rankings, next_cursor) in a single indexed query.
+        """
+        organizations = Org.objects.filter(trust_score__isnull=False, trust_score_last_calculated__isnull=False)
+        if trust_level:
+            organizations = organizations.filter(trust_level=trust_level)
+        if cursor:
+            trust_score, pk = cls.decode_registry_cursor(cursor)
+            organizations = organizations.filter(Q(trust_score__lt=trust_score) | Q(trust_score=trust_score, id__gt=pk))
+        rows = list(
+            organizations.order_by('-trust_score', 'id').values(
+                'id', 'name', 'email', 'trust_score', 'trust_level', 'trust_score_last_calculated',
+            )[:limit + 1]
+        )
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = cls.encode_registry_cursor(rows[-1]['trust_score'], rows[-1]['id'])
+        rankings = [
+            {
                 'organization': {
-                    'id': org.id,
-                    'name': org.name,
-                    'email': org.email,
+                    'id': row['id'],
+                    'name': row['name'],
+                    'email': row['email'],
                 },
-                'trust_score': trust_data['overall_score'],
-                'trust_level': trust_data['trust_level'],
-            })
-        
-        # Sort by trust score (descending)
-        rankings.sort(key=lambda x: x['trust_score'], reverse=True)
-        
-        return rankings[:limit]
+                'trust_score': row['trust_score'],
+                'trust_level': row['trust_level'],
+                'last_calculated': row['trust_score_last_calculated'].isoformat(),
+            }
+            for row in rows
+        ]
+        return rankings, next_cursor
 
+    @classmethod
+    def get_organization_ranking(cls, limit: int = 10) -> list:
+        """Get ranked list of organizations by stored trust score"""
+        return cls.registry_page(limit=limit)[0]
@@ -0,0 +1,143 @@
+"""
+Trust score history
+Downsampled trend series read from TrustScoreHistory, and the compaction
+job that keeps the table bounded: rows past the raw horizon are averaged
+into one row per organization and day, rows past retention are dropped
+"""
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Sum
+from django.db.models.functions import TruncDay, TruncWeek
+from django.utils import timezone
+from .models import Org, TrustScoreHistory
+
+
+BUCKETS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+}
+COMPONENT_FIELDS = TrustScoreHistory.SCORE_FIELDS[1:]
+
+
+def history_raw_days() -> int:
+    return getattr(settings, 'TRUST_SCORE_HISTORY_RAW_DAYS', 90)
+
+
+def history_retention_days() -> int:
+    return getattr(settings, 'TRUST_SCORE_HISTORY_RETENTION_DAYS', 730)
+
+
+def _points(centi) -> float:
+    return round(centi / 100, 2) if centi is not None else None
+
+
+def _weighted_sums() -> dict:
+    """Aggregates of each score weighted by the samples its row stands for"""
+    return {field: Sum(F(field) * F('samples')) for field in TrustScoreHistory.SCORE_FIELDS}
+
+
+def trend(organization: Org, bucket: str = 'day', start=None, end=None) -> list:
+    """
+    Average trust score and components per day or week bucket, oldest first,
+    with the bucket's lowest and highest overall score and its sample count
+    """
+    rows = TrustScoreHistory.objects.filter(organization=organization)
+    if start is not None:
+        rows = rows.filter(recorded_at__gte=start)
+    if end is not None:
+        rows = rows.filter(recorded_at__lt=end)
+    rows = (
+        rows.annotate(period=BUCKETS[bucket]('recorded_at'))
+        .values('period')
+        .annotate(
+            total_samples=Sum('samples'),
+            min_overall=Min('overall'),
+            max_overall=Max('overall'),
+            **_weighted_sums(),
+        )
+        .order_by('period')
+    )
+    return [
+        {
+            'period': row['period'].date().isoformat(),
+            'trust_score': _points(row['overall'] / row['total_samples']),
+            'min_score': _points(row['min_overall']),
+            'max_score': _points(row['max_overall']),
+            'components': {field: _points(row[field] / row['total_samples']) for field in COMPONENT_FIELDS},
+            'samples': row['total_samples'],
+        }
+        for row in rows
+    ]
+
+
+def _compactable_days(cutoff, batch_size: int) -> list:
+    """(organization_id, day, weighted sums) for days before cutoff that still hold several rows"""
+    return list(
+        TrustScoreHistory.objects.filter(recorded_at__lt=cutoff)
+        .annotate(day=TruncDay('recorded_at'))
+        .values('organization_id', 'day')
+        .annotate(rows=Count('id'), total_samples=Sum('samples'), **_weighted_sums())
+        .filter(rows__gt=1)
+        .order_by('organization_id', 'day')[:batch_size]
+    )
+
+
+def compact_batch(cutoff, batch_size: int = 500) -> int:
+    """
+    Replace up to batch_size organization-days before cutoff by their average
+    row, weighted by samples so a day compacted again keeps its true mean.
+    Returns rows removed.
+    """
+    days = _compactable_days(cutoff, batch_size)
+    removed = 0
+    with transaction.atomic():
+        for day in days:
+            day_rows = TrustScoreHistory.objects.filter(
+                organization_id=day['organization_id'],
+                recorded_at__gte=day['day'],
+                recorded_at__lt=min(day['day'] + timedelta(days=1), cutoff),
+            )
+            removed += day_rows.delete()[0] - 1
+            TrustScoreHistory.objects.create(
+                organization_id=day['organization_id'],
+                recorded_at=day['day'],
+                samples=day['total_samples'],
+                **{field: int(round(day[field] / day['total_samples'])) for field in TrustScoreHistory.SCORE_FIELDS},
+            )
+    return removed
+
+
+def compact_history(now=None, raw_days: int = None, retention_days: int = None,
+                    batch_size: int = 500, pause: float = 0) -> dict:
+    """
+    Drop rows older than the retention horizon, then downsample rows older
+    than the raw horizon to one per organization and day, in short batches
+    """
+    now = now or timezone.now()
+    retention_cutoff = now - timedelta(days=history_retention_days() if retention_days is None else retention_days)
+    raw_cutoff = now - timedelta(days=history_raw_days() if raw_days is None else raw_days)
+    totals = {'expired': 0, 'compacted': 0, 'batches': 0}
+
+    while True:
+        ids = list(
+            TrustScoreHistory.objects.filter(recorded_at__lt=retention_cutoff)
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        totals['expired'] += TrustScoreHistory.objects.filter(pk__in=ids).delete()[0]
+        totals['batches'] += 1
+        if pause:
+            time.sleep(pause)
+
+    while True:
+        removed = compact_batch(raw_cutoff, batch_size)
+        if not removed:
+            break
+        totals['compacted'] += removed
+        totals['batches'] += 1
+        if pause:
+            time.sleep(pause)
+    return totals
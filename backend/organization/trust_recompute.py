@@ -0,0 +1,35 @@
+"""
+Background trust score recomputation
+Keeps the stored Org.trust_score, trust_level and trust_score_last_calculated
+columns fresh outside the request cycle, so the public registry only ever
+reads them
+"""
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import Org
+
+
+def trust_score_max_age() -> timedelta:
+    return timedelta(minutes=getattr(settings, 'TRUST_SCORE_MAX_AGE_MINUTES', 60))
+
+
+def stale_organizations(max_age: timedelta = None, now=None):
+    """Organizations never scored or scored longer ago than max_age, oldest first"""
+    cutoff = (now or timezone.now()) - (trust_score_max_age() if max_age is None else max_age)
+    return Org.objects.filter(
+        Q(trust_score_last_calculated__isnull=True) | Q(trust_score_last_calculated__lt=cutoff)
+    ).order_by(F('trust_score_last_calculated').asc(nulls_first=True), 'id')
+
+
+def recompute_trust_scores(organizations, batch_size: int = 50, pause: float = 0) -> int:
+    """Recalculate and store trust scores, pausing between batches. Returns the number recomputed."""
+    ids = list(organizations.values_list('pk', flat=True))
+    for start in range(0, len(ids), batch_size):
+        if start and pause:
+            time.sleep(pause)
+        for organization in Org.objects.filter(pk__in=ids[start:start + batch_size]):
+            organization.update_trust_score()
+    return len(ids)
@@ -0,0 +1,109 @@
+"""
+Dirty-flag driven trust score recomputation
+Changes to an organization's access requests, relevant user consents,
+violation reports or compliance audits mark it dirty; the scheduler
+recomputes only dirty organizations, oldest mark first, in rate-limited
+batches, so recompute cost follows activity rather than organization count
+"""
+import json
+import logging
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import F, Min, Q
+from django.utils import timezone
+from .models import Org, OrgTrustScoreDirty
+
+
+logger = logging.getLogger('organization.trust_scheduler')
+
+
+def mark_trust_dirty(*organization_ids):
+    """
+    Flag organizations for trust score recomputation.
+    Never call this for an organization being deleted: the mark would point
+    at a row that is gone when the transaction commits. Signal receivers
+    check deleted_with_organization before marking.
+    """
+    organization_ids = {pk for pk in organization_ids if pk is not None}
+    if not organization_ids:
+        return
+    now = timezone.now()
+    updated = OrgTrustScoreDirty.objects.filter(organization_id__in=organization_ids).update(
+        last_marked_at=now,
+        change_count=F('change_count') + 1,
+    )
+    if updated < len(organization_ids):
+        # First mark since the last recompute; rows that already existed were updated above
+        OrgTrustScoreDirty.objects.bulk_create(
+            [OrgTrustScoreDirty(organization_id=pk, first_marked_at=now, last_marked_at=now) for pk in organization_ids],
+            ignore_conflicts=True,
+        )
+
+
+def clear_trust_dirty(organization_id: int, marked_before) -> bool:
+    """
+    Clear an organization's mark after recomputing from data read after
+    marked_before. A mark that arrived later is left for the next pass.
+    """
+    return bool(OrgTrustScoreDirty.objects.filter(
+        organization_id=organization_id,
+        last_marked_at__lte=marked_before,
+    ).delete()[0])
+
+
+def staleness_sla() -> timedelta:
+    return timedelta(seconds=getattr(settings, 'TRUST_SCORE_STALENESS_SLA_SECONDS', 900))
+
+
+def due_marks(min_interval: timedelta, now=None):
+    """Dirty marks whose organization was not recomputed within min_interval, oldest mark first"""
+    cutoff = (now or timezone.now()) - min_interval
+    return OrgTrustScoreDirty.objects.filter(
+        Q(organization__trust_score_last_calculated__isnull=True)
+        | Q(organization__trust_score_last_calculated__lte=cutoff)
+    ).order_by('first_marked_at', '-change_count')
+
+
+def staleness_metrics(now=None) -> dict:
+    """How far behind the stored trust scores are, against the staleness SLA"""
+    now = now or timezone.now()
+    sla = staleness_sla()
+    stats = OrgTrustScoreDirty.objects.aggregate(oldest=Min('first_marked_at'))
+    oldest = stats['oldest']
+    return {
+        'dirty_organizations': OrgTrustScoreDirty.objects.count(),
+        'oldest_dirty_seconds': round((now - oldest).total_seconds(), 1) if oldest else 0,
+        'sla_seconds': sla.total_seconds(),
+        'sla_breaches': OrgTrustScoreDirty.objects.filter(first_marked_at__lt=now - sla).count(),
+    }
+
+
+def recompute_dirty(batch_size: int = 50, max_per_second: float = None, min_interval: timedelta = timedelta(0)) -> int:
+    """
+    Recompute one batch of due dirty organizations through Org.update_trust_score.
+    A mark is only cleared if no change arrived while its score was being
+    computed; otherwise it stays for the next batch. Returns the number recomputed.
+    """
+    marks = list(due_marks(min_interval).values_list('organization_id', 'last_marked_at')[:batch_size])
+    organizations = Org.objects.in_bulk([organization_id for organization_id, _ in marks])
+    spacing = 1 / max_per_second if max_per_second else 0
+    recomputed = 0
+    for organization_id, seen_marked_at in marks:
+        organization = organizations.get(organization_id)
+        if organization is None:
+            continue
+        if recomputed and spacing:
+            time.sleep(spacing)
+        organization.update_trust_score()
+        recomputed += 1
+        if not clear_trust_dirty(organization_id, seen_marked_at):
+            OrgTrustScoreDirty.objects.filter(organization_id=organization_id).update(first_marked_at=seen_marked_at)
+    return recomputed
+
+
+def log_metrics(**extra):
+    """Emit the staleness metrics as a single structured log line"""
+    metrics = staleness_metrics()
+    logger.info(json.dumps({'event': 'trust_score_staleness', **extra, **metrics}))
+    return metrics
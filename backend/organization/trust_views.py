@@ -9,27 +9,53 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from django.shortcuts import get_object_or_404
 from .models import Org
 from .trust_engine import TrustScoreEngine
+from .trust_cache import etag, get_integrity_entry, get_trust_entry
+from .trust_history import BUCKETS, trend
 from .integrity import DataIntegrityChecker
 from .serializers import OrganizationSerializer
 from django.db.models import Q
+from django.utils import timezone
+from datetime import timedelta
 
 
 class TrustRegistryView(APIView):
-    """Public API to get organization trust scores and rankings"""
+    """
+    Public API to get organization trust scores and rankings.
+    Served from the stored scores with keyset pagination (?cursor=) and an
+    optional ?trust_level= filter; recompute_trust_scores keeps them fresh.
+    """
     permission_classes = [AllowAny]  # Public access
     
     def get(self, request):
-        """Get ranked list of organizations by trust score"""
+        """Get ranked list of organizations by stored trust score"""
         try:
-            limit = int(request.query_params.get('limit', 10))
+            try:
+                limit = int(request.query_params.get('limit', 10))
+                if limit < 1:
+                    raise ValueError
+            except ValueError:
+                return Response({'error': 'limit must be a positive integer'}, status=status.HTTP_400_BAD_REQUEST)
             limit = min(limit, 100)  # Cap at 100
-            
-            # Get rankings
-            rankings = TrustScoreEngine.get_organization_ranking(limit=limit)
-            
+
+            trust_level = request.query_params.get('trust_level')
+            if trust_level and trust_level not in TrustScoreEngine.TRUST_LEVELS:
+                return Response({
+                    'error': f"trust_level must be one of {', '.join(TrustScoreEngine.TRUST_LEVELS)}"
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            try:
+                rankings, next_cursor = TrustScoreEngine.registry_page(
+                    limit=limit,
+                    cursor=request.query_params.get('cursor'),
+                    trust_level=trust_level,
+                )
+            except ValueError:
+                return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+
             return Response({
                 'count': len(rankings),
                 'results': rankings,
+                'next_cursor': next_cursor,
             }, status=status.HTTP_200_OK)
             
         except Exception as e:
@@ -38,6 +64,17 @@ class TrustRegistryView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def not_modified_response(request, entry):
+    """A 304 response when the client already holds this trust score entry"""
+    tag = etag(entry)
+    candidates = [value.strip() for value in request.headers.get('If-None-Match', '').split(',')]
+    if tag in candidates or '*' in candidates:
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        response['ETag'] = tag
+        return response
+    return None
+
+
 class OrganizationTrustScoreView(APIView):
     """Get trust score for a specific organization (public)"""
     permission_classes = [AllowAny]
@@ -57,13 +94,14 @@ class OrganizationTrustScoreView(APIView):
                         'error': 'Organization ID or name required'
                     }, status=status.HTTP_400_BAD_REQUEST)
             
-            # Calculate trust score
-            trust_data = TrustScoreEngine.calculate_trust_score(organization)
+            # Cached per data version; a miss computes and stores the score once
+            entry = get_trust_entry(organization)
+            not_modified = not_modified_response(request, entry)
+            if not_modified:
+                return not_modified
+            trust_data = entry['data']
             
-            # Update stored score
-            organization.update_trust_score()
-            
-            return Response({
+            response = Response({
                 'organization': {
                     'id': organization.id,
                     'name': organization.name,
@@ -77,6 +115,8 @@ class OrganizationTrustScoreView(APIView):
                 'certificate_issued_at': organization.trust_certificate_issued_at.isoformat() if organization.trust_certificate_issued_at else None,
                 'last_calculated': trust_data['last_calculated'],
             }, status=status.HTTP_200_OK)
+            response['ETag'] = etag(entry)
+            return response
             
         except Exception as e:
             return Response({
@@ -84,6 +124,49 @@ class OrganizationTrustScoreView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class OrganizationTrustScoreTrendView(APIView):
+    """
+    Public trust score trend for an organization from its score history.
+    ?bucket= is day or week (default day); ?days= is the look-back (default 90).
+    """
+    permission_classes = [AllowAny]
+    DEFAULT_DAYS = 90
+    MAX_DAYS = 730
+
+    def get(self, request, org_id):
+        try:
+            organization = get_object_or_404(Org, pk=org_id)
+            bucket = request.query_params.get('bucket', 'day')
+            if bucket not in BUCKETS:
+                return Response({
+                    'error': f"bucket must be one of {', '.join(BUCKETS)}"
+                }, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                days = int(request.query_params.get('days', self.DEFAULT_DAYS))
+            except ValueError:
+                days = 0
+            if not 1 <= days <= self.MAX_DAYS:
+                return Response({
+                    'error': f'days must be an integer between 1 and {self.MAX_DAYS}'
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            start = timezone.now() - timedelta(days=days)
+            return Response({
+                'organization': {
+                    'id': organization.id,
+                    'name': organization.name,
+                },
+                'bucket': bucket,
+                'days': days,
+                'points': trend(organization, bucket, start=start),
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            return Response({
+                'error': f'Failed to retrieve trust score trend: {str(e)}'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 class OrganizationTrustScoreDetailView(APIView):
     """Get detailed trust score for authenticated organization"""
     permission_classes = [IsAuthenticated]
@@ -100,16 +183,17 @@ class OrganizationTrustScoreDetailView(APIView):
             
             organization = get_object_or_404(Org, user=request.user)
             
-            # Calculate trust score
-            trust_data = TrustScoreEngine.calculate_trust_score(organization)
+            # Cached per data version; a miss computes and stores the score once
+            entry = get_trust_entry(organization)
+            not_modified = not_modified_response(request, entry)
+            if not_modified:
+                return not_modified
+            trust_data = entry['data']
             
-            # Get integrity check
-            integrity_data = DataIntegrityChecker.verify_organization_data_integrity(organization)
-            
-            # Update stored score
-            organization.update_trust_score()
+            # Integrity check, cached under the same data version
+            integrity_data = get_integrity_entry(organization, entry)
             
-            return Response({
+            response = Response({
                 'organization': {
                     'id': organization.id,
                     'name': organization.name,
@@ -122,6 +206,8 @@ class OrganizationTrustScoreDetailView(APIView):
                 'certificate_issued_at': organization.trust_certificate_issued_at.isoformat() if organization.trust_certificate_issued_at else None,
                 'last_calculated': trust_data['last_calculated'],
             }, status=status.HTTP_200_OK)
+            response['ETag'] = etag(entry)
+            return response
             
         except Exception as e:
             return Response({
@@ -1,6 +1,6 @@
 from django.urls import path 
 from .views import ConsentRequestView, RequestedConsentView, ConsentRevocationView, OrganizationAccessLog, OrganizationDetailView
-from .trust_views import TrustRegistryView, OrganizationTrustScoreView, OrganizationTrustScoreDetailView, DataIntegrityView
+from .trust_views import TrustRegistryView, OrganizationTrustScoreView, OrganizationTrustScoreDetailView, OrganizationTrustScoreTrendView, DataIntegrityView
 from .report_views import PublicTransparencyReportView
 #
 urlpatterns = [
@@ -13,6 +13,7 @@ urlpatterns = [
     path('trust/registry/', TrustRegistryView.as_view(), name='trust-registry'),
     path('trust/score/', OrganizationTrustScoreDetailView.as_view(), name='organization-trust-score'),
     path('trust/score/<int:org_id>/', OrganizationTrustScoreView.as_view(), name='organization-trust-score-detail'),
+    path('trust/score/<int:org_id>/trend/', OrganizationTrustScoreTrendView.as_view(), name='organization-trust-score-trend'),
     path('trust/integrity/', DataIntegrityView.as_view(), name='data-integrity'),
     # Transparency Reports
     path('reports/transparency/', PublicTransparencyReportView.as_view(), name='transparency-report'),
@@ -0,0 +1,27 @@
+"""
+Per-organization data versions
+Results derived from an organization's data are cached under its current
+version, so any change that bumps the version invalidates them
+"""
+from django.db.models import F
+from .models import OrgDataVersion
+
+
+def get_data_version(organization_id: int) -> int:
+    """Current data version of an organization (0 if never bumped)"""
+    version = OrgDataVersion.objects.filter(organization_id=organization_id).values_list('version', flat=True).first()
+    return version or 0
+
+
+def bump_data_version(*organization_ids):
+    """Increment the data version of one or more organizations"""
+    organization_ids = {pk for pk in organization_ids if pk is not None}
+    if not organization_ids:
+        return
+    updated = OrgDataVersion.objects.filter(organization_id__in=organization_ids).update(version=F('version') + 1)
+    if updated < len(organization_ids):
+        # First change for some organizations; existing rows were already bumped
+        OrgDataVersion.objects.bulk_create(
+            [OrgDataVersion(organization_id=pk, version=1) for pk in organization_ids],
+            ignore_conflicts=True,
+        )
@@ -174,6 +174,72 @@ SESSION_COOKIE_AGE = 30 * 24 * 60 * 60  # 30 days (matches refresh token lifetim
 SESSION_SAVE_EVERY_REQUEST = True
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False
 
+# --------------------------------------------------
+# CACHE
+# --------------------------------------------------
+# Local memory locally; Redis (configure maxmemory-policy allkeys-lru) in production.
+# Both evict least recently used entries once full.
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': REDIS_URL,
+            'OPTIONS': {'CLIENT_CLASS': 'django_redis.client.DefaultClient'},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 1000},
+        }
+    }
+
+# Cached compliance results are keyed by organization data version; the
+# timeout bounds staleness of rules over sliding time windows
+COMPLIANCE_RESULT_CACHE_TIMEOUT = 3600
+
+# Closed audits and resolved violation reports older than this move to the
+# archive tables (archive_compliance_records); report windows reaching
+# further back read the archive as well
+COMPLIANCE_ARCHIVE_HORIZON_DAYS = config('COMPLIANCE_ARCHIVE_HORIZON_DAYS', cast=int, default=180)
+
+# --------------------------------------------------
+# COMPLIANCE SCAN JOBS
+# --------------------------------------------------
+# Run queued scans inside the request instead of the run_scan_worker process
+COMPLIANCE_SCAN_JOBS_EAGER = config('COMPLIANCE_SCAN_JOBS_EAGER', cast=bool, default=False)
+
+# Profile every scan per rule and log it to the compliance.profile logger
+# (single scans can opt in with ?profile=1)
+COMPLIANCE_PROFILE_SCANS = config('COMPLIANCE_PROFILE_SCANS', cast=bool, default=False)
+
+# --------------------------------------------------
+# TRUST SCORES
+# --------------------------------------------------
+# The trust registry serves stored scores; recompute_trust_scores refreshes
+# scores older than this
+TRUST_SCORE_MAX_AGE_MINUTES = config('TRUST_SCORE_MAX_AGE_MINUTES', cast=int, default=60)
+
+# run_trust_scheduler recomputes organizations marked dirty by data changes,
+# at most once per minimum interval each; dirty marks older than the SLA are
+# reported as breaches in its staleness metrics
+TRUST_SCORE_MIN_INTERVAL_SECONDS = config('TRUST_SCORE_MIN_INTERVAL_SECONDS', cast=int, default=300)
+TRUST_SCORE_STALENESS_SLA_SECONDS = config('TRUST_SCORE_STALENESS_SLA_SECONDS', cast=int, default=900)
+
+# Trust score views cache each organization's score per data version; while
+# one request recomputes, others may serve the previous score up to the cache
+# age, or wait up to the lock timeout for the new one
+TRUST_SCORE_CACHE_SECONDS = config('TRUST_SCORE_CACHE_SECONDS', cast=int, default=300)
+TRUST_SCORE_CACHE_LOCK_SECONDS = config('TRUST_SCORE_CACHE_LOCK_SECONDS', cast=int, default=30)
+
+# compact_trust_history averages trust score history older than the raw
+# horizon into one row per organization and day, and deletes history older
+# than the retention horizon
+TRUST_SCORE_HISTORY_RAW_DAYS = config('TRUST_SCORE_HISTORY_RAW_DAYS', cast=int, default=90)
+TRUST_SCORE_HISTORY_RETENTION_DAYS = config('TRUST_SCORE_HISTORY_RETENTION_DAYS', cast=int, default=730)
+
 # --------------------------------------------------
 # DEFAULT AUTO FIELD
 # --------------------------------------------------
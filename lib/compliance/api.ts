@@ -23,14 +23,37 @@ export interface ComplianceAudit {
   recommendation: string
 }
 
+export interface ComplianceScanDiff {
+  id: number
+  incremental: boolean
+  created_at: string
+  risk_score: number
+  total_violations: number
+  new_count: number
+  persisting_count: number
+  resolved_count: number
+}
+
 export interface ComplianceScanResult {
   risk_score: number
   total_violations: number
   critical_count: number
   high_count: number
   medium_count: number
-  violations: ComplianceViolation[]
-  audit_records?: ComplianceAudit[]
+  diff?: ComplianceScanDiff
+}
+
+export interface ComplianceScanJob {
+  id: string
+  organization: number
+  status: "QUEUED" | "RUNNING" | "COMPLETED" | "FAILED"
+  incremental: boolean
+  profile: boolean
+  created_at: string
+  started_at?: string | null
+  finished_at?: string | null
+  result?: ComplianceScanResult | null
+  error: string
 }
 
 export interface ComplianceReport {
@@ -57,7 +80,7 @@ export interface ComplianceReport {
 export class ComplianceAPI {
   /**
    * Run compliance scan for organization
-   * POST /api/compliance/scan/
+   * POST /api/compliance/scan/ queues the scan; the job is polled until it finishes
    */
   static async runScan(): Promise<{ message: string; data: ComplianceScanResult }> {
     try {
@@ -88,12 +111,13 @@ export class ComplianceAPI {
       }
 
       // Update activity on successful API call
-      const data = await response.json()
+      const queued: { message: string; data: ComplianceScanJob } = await response.json()
       if (typeof window !== "undefined") {
         const now = Date.now()
         localStorage.setItem('last_activity', now.toString())
       }
-      return data
+      const job = await ComplianceAPI.waitForScanJob(queued.data)
+      return { message: "Compliance scan completed", data: job.result as ComplianceScanResult }
     } catch (error) {
       if (error instanceof TypeError && error.message.includes("fetch")) {
         throw new Error("Failed to connect to server. Please check your internet connection.")
@@ -102,11 +126,42 @@ export class ComplianceAPI {
     }
   }
 
+  /**
+   * Poll a queued compliance scan until it completes or fails
+   * GET /api/compliance/scan/jobs/{id}/
+   */
+  static async waitForScanJob(job: ComplianceScanJob, intervalMs = 1000, timeoutMs = 120000): Promise<ComplianceScanJob> {
+    const deadline = Date.now() + timeoutMs
+    while (job.status === "QUEUED" || job.status === "RUNNING") {
+      if (Date.now() > deadline) {
+        throw new Error("Compliance scan is taking longer than expected. Please check back later.")
+      }
+      await new Promise((resolve) => setTimeout(resolve, intervalMs))
+      const response = await fetch(`${API_BASE_URL}/compliance/scan/jobs/${job.id}/`, {
+        method: "GET",
+        headers: getApiHeaders(),
+        credentials: "include",
+      })
+      if (!response.ok) {
+        if (response.status === 401) {
+          await ApiInterceptor.handleSessionExpired()
+          throw new Error("Your session has expired. Please log in again.")
+        }
+        throw new Error(`Failed to check compliance scan: ${response.status}`)
+      }
+      job = await response.json()
+    }
+    if (job.status === "FAILED") {
+      throw new Error(job.error || "Compliance scan failed")
+    }
+    return job
+  }
+
   /**
    * Get latest compliance scan results
    * GET /api/compliance/scan/
    */
-  static async getScanResults(): Promise<ComplianceScanResult & { audits: ComplianceAudit[] }> {
+  static async getScanResults(): Promise<ComplianceScanResult & { audits: ComplianceAudit[]; violations: ComplianceReport["violations"] }> {
     try {
       const response = await fetch(`${API_BASE_URL}/compliance/scan/`, {
         method: "GET",